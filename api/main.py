@@ -5,16 +5,27 @@ from typing import Annotated
 from fastapi import Depends, FastAPI
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.routers import authentication, forecast, permissions, sensors, serverstats, users, websocket
-from api.utils.database import dispose_database, get_session
+from api.routers import authentication, device_keys, forecast, permissions, sensors, serverstats, users, websocket
+from api.utils.database import dispose_database, get_engine, get_session
+from api.utils.event_bus import get_event_bus
+from api.utils.ingest_buffer import get_ingest_buffer
 from api.utils.security import get_current_user
+from api.utils.sensor_utils import get_sensor_registry
 from api.utils.websocket_connection_handler import get_websocket_handler
 
 
 @asynccontextmanager
 async def lifespan(_app: FastAPI):
+    try:
+        async for session in get_session(await get_engine()):
+            await get_sensor_registry().load(session)
+    except Exception as exception:  # pragma: no cover: Sensors are loaded on first access instead
+        print(f"Could not warm the sensor registry: {exception}")
+    await get_event_bus().start()
     asyncio.get_event_loop().create_task(get_websocket_handler().event_loop())
     yield
+    await get_ingest_buffer().flush()
+    await get_event_bus().stop()
     await dispose_database()
 
 
@@ -25,6 +36,7 @@ app.include_router(sensors.sensors_router)
 app.include_router(users.users_router)
 app.include_router(forecast.forecast_router)
 app.include_router(permissions.permissions_router)
+app.include_router(device_keys.device_keys_router)
 app.include_router(serverstats.serverstats_router)
 app.include_router(websocket.websocket_router)
 
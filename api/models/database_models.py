@@ -1,6 +1,8 @@
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import Annotated
 
-from sqlalchemy import DateTime, UniqueConstraint
+from pydantic import AfterValidator, field_validator
+from sqlalchemy import DateTime, Index, UniqueConstraint
 from sqlmodel import Column, Enum, Field, SQLModel
 
 from api.models.enum_models import SensorTypeModel
@@ -9,6 +11,26 @@ from api.models.enum_models import SensorTypeModel
 # Then: https://stackoverflow.com/questions/74252768/missinggreenlet-greenlet-spawn-has-not-been-called
 
 
+def utc_now() -> datetime:
+    """
+    Returns the current time in UTC, used for all timestamps created by the API.
+    """
+    return datetime.now(timezone.utc)
+
+
+def to_utc(timestamp: datetime) -> datetime:
+    """
+    Converts a timestamp to UTC, timestamps without a timezone are interpreted as UTC.
+
+    Timestamps are normalized when they enter the API, so they never depend on the timezone of the host or database.
+    """
+    return timestamp.astimezone(timezone.utc) if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
+
+
+# A timestamp (e.g. a query parameter) that is converted to UTC by `to_utc` when it is validated.
+UTCDatetime = Annotated[datetime, AfterValidator(to_utc)]
+
+
 class DatabaseModelBase(SQLModel):
     """
     Base class for all database models.
@@ -69,16 +91,84 @@ class SensorDataCreate(SQLModel):
     voltage: float | None
 
 
+class SensorDataBatchCreate(SensorDataCreate):
+    """
+    Model used to create a new `SensorData` as part of a batch, with the timestamp supplied by the client.
+    """
+
+    timestamp: datetime
+
+    @field_validator("timestamp")
+    @classmethod
+    def timestamp_to_utc(cls, timestamp: datetime) -> datetime:
+        return to_utc(timestamp)
+
+
 class SensorData(SensorDataCreate, DatabaseModelBase, table=True):
     """
     Represents a SensorData from the database.
     """
 
-    timestamp: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False), default_factory=datetime.now)
+    __table_args__ = (
+        Index("ix_sensordata_sensor_id_id", "sensor_id", "id"),
+        Index("ix_sensordata_sensor_id_timestamp", "sensor_id", "timestamp"),
+        Index("ix_sensordata_timestamp_brin", "timestamp", postgresql_using="brin"),
+    )
+
+    timestamp: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False), default_factory=utc_now)
     sensor_id: int = Field(foreign_key="sensor.id")
     # sensor: Sensor = Relationship(back_populates="data")
 
 
+class SensorDataRollupBase(SQLModel):
+    """
+    Base class for tables holding pre-aggregated `SensorData` of a sensor for a period (e.g. a day).
+
+    Sums and counts are stored instead of averages, so new data can be merged incrementally.
+    """
+
+    sensor_id: int = Field(foreign_key="sensor.id", primary_key=True)
+    period_start: datetime = Field(sa_type=DateTime(timezone=True), primary_key=True)
+    count: int
+    temperature_min: float
+    temperature_max: float
+    temperature_sum: float
+    humidity_min: float
+    humidity_max: float
+    humidity_sum: float
+    pressure_min: float
+    pressure_max: float
+    pressure_sum: float
+    voltage_count: int
+    voltage_min: float | None
+    voltage_max: float | None
+    voltage_sum: float | None
+
+
+class SensorDataHourly(SensorDataRollupBase, table=True):
+    """
+    Represents the aggregated `SensorData` of a sensor for a single hour from the database.
+    """
+
+    __tablename__ = "sensordata_hourly"
+
+
+class SensorDataDaily(SensorDataRollupBase, table=True):
+    """
+    Represents the aggregated `SensorData` of a sensor for a single day (UTC) from the database.
+    """
+
+    __tablename__ = "sensordata_daily"
+
+
+class SensorDataMonthly(SensorDataRollupBase, table=True):
+    """
+    Represents the aggregated `SensorData` of a sensor for a single calendar month (UTC) from the database.
+    """
+
+    __tablename__ = "sensordata_monthly"
+
+
 class SensorStateCreate(SQLModel):
     """
     Model used to create a new "SensorState".
@@ -88,12 +178,31 @@ class SensorStateCreate(SQLModel):
     voltage: float | None
 
 
+class SensorStateBatchCreate(SensorStateCreate):
+    """
+    Model used to create a new `SensorState` as part of a batch, with the timestamp supplied by the client.
+    """
+
+    timestamp: datetime
+
+    @field_validator("timestamp")
+    @classmethod
+    def timestamp_to_utc(cls, timestamp: datetime) -> datetime:
+        return to_utc(timestamp)
+
+
 class SensorState(SensorStateCreate, DatabaseModelBase, table=True):
     """
     Represents a SensorState from the database.
     """
 
-    timestamp: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False), default_factory=datetime.now)
+    __table_args__ = (
+        Index("ix_sensorstate_sensor_id_id", "sensor_id", "id"),
+        Index("ix_sensorstate_sensor_id_timestamp", "sensor_id", "timestamp"),
+        Index("ix_sensorstate_timestamp_brin", "timestamp", postgresql_using="brin"),
+    )
+
+    timestamp: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False), default_factory=utc_now)
     sensor_id: int = Field(foreign_key="sensor.id")
 
 
@@ -122,3 +231,32 @@ class DBUser(User, DatabaseModelBase, table=True):
 
     hashed_password: str
     # sensors: list[Sensor] = Relationship(back_populates="users", link_model=SensorPermission)
+
+
+class DeviceKeyCreate(SQLModel):
+    """
+    Model used to create a new `DeviceKey`.
+    """
+
+    name: str
+    sensor_ids: list[int] = []
+
+
+class DeviceKey(DatabaseModelBase, table=True):
+    """
+    Represents a long-lived API key of a device from the database, only the HMAC digest of the key is stored.
+    """
+
+    name: str
+    user_id: int = Field(foreign_key="dbuser.id")
+    digest: str = Field(unique=True, index=True)
+    created_at: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False), default_factory=utc_now)
+
+
+class DeviceKeySensor(SQLModel, table=True):
+    """
+    Binds a `DeviceKey` to a sensor, keys without bound sensors may access all sensors of their user.
+    """
+
+    device_key_id: int = Field(foreign_key="devicekey.id", primary_key=True)
+    sensor_id: int = Field(foreign_key="sensor.id", primary_key=True)
@@ -8,3 +8,75 @@ class SensorTypeModel(str, enum.Enum):
 
     ENVIRONMENTAL = "environmental"
     STATE = "state"
+
+
+class ImportFormat(str, enum.Enum):
+    """
+    Enum for representing the file format of a bulk import.
+    """
+
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+class IngestMode(str, enum.Enum):
+    """
+    Enum for representing how new sensor data / states are written.
+
+    - `direct`: The row is committed immediately within the request.
+    - `buffered`: The row is group committed by the `IngestBuffer`, the request waits until it is durable.
+    - `accepted`: The row is group committed by the `IngestBuffer`, the request returns 202 immediately.
+    """
+
+    DIRECT = "direct"
+    BUFFERED = "buffered"
+    ACCEPTED = "accepted"
+
+
+class ExportFormat(str, enum.Enum):
+    """
+    Enum for representing the file format of an export.
+
+    - `csv` / `ndjson`: Text formats streamed row by row.
+    - `arrow` / `parquet`: Columnar formats for analytics (Arrow IPC stream / Parquet file).
+    """
+
+    CSV = "csv"
+    NDJSON = "ndjson"
+    ARROW = "arrow"
+    PARQUET = "parquet"
+
+
+class WebsocketOverflowPolicy(str, enum.Enum):
+    """
+    Enum for representing what happens when the outbound queue of a (slow) websocket connection is full.
+
+    - `drop_oldest`: The oldest queued message is dropped.
+    - `coalesce`: Only the latest message per sensor is kept, a full queue drops the oldest sensor.
+    - `disconnect`: The connection is closed, the client has to reconnect.
+    """
+
+    DROP_OLDEST = "drop_oldest"
+    COALESCE = "coalesce"
+    DISCONNECT = "disconnect"
+
+
+class WebsocketAction(str, enum.Enum):
+    """
+    Enum for representing the action of a message sent by a websocket client.
+    """
+
+    SUBSCRIBE = "subscribe"
+    UNSUBSCRIBE = "unsubscribe"
+
+
+class EventBusBackend(str, enum.Enum):
+    """
+    Enum for representing how new sensor data / states are distributed to the websockets of all workers.
+
+    - `memory`: Only within the own process (tests and single worker deployments).
+    - `postgres`: Via Postgres LISTEN / NOTIFY to all workers.
+    """
+
+    MEMORY = "memory"
+    POSTGRES = "postgres"
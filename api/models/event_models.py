@@ -0,0 +1,30 @@
+from pydantic import BaseModel
+
+
+class PermissionChanged(BaseModel):
+    """
+    Model describing a created / updated / deleted `SensorPermission`, sent on the `EventBus` so every worker
+    applies it to its caches and websocket subscriptions.
+    """
+
+    user_id: int
+    sensor_id: int
+    read: bool = False
+    write: bool = False
+    deleted: bool = False
+
+
+class DeviceKeyRevoked(BaseModel):
+    """
+    Model describing a deleted `DeviceKey`, sent on the `EventBus` so every worker drops it from its cache.
+    """
+
+    digest: str
+
+
+class EventBusReconnected(BaseModel):
+    """
+    Model describing that the `EventBus` reconnected after it was disconnected, only delivered to the own worker.
+
+    Events of other workers sent meanwhile were missed, so everything derived from them has to be reloaded.
+    """
@@ -1,4 +1,4 @@
-from datetime import date
+from datetime import date, datetime
 
 from pydantic import BaseModel
 
@@ -55,6 +55,39 @@ class DailySensorData(BaseModel):
     temperature: float
 
 
+class BulkImportResult(BaseModel):
+    """
+    Model describing the outcome of a bulk import.
+    """
+
+    rows: int
+    seconds: float
+    rows_per_second: float
+
+
+class AggregatedValue(BaseModel):
+    """
+    Model representing the minimum, average and maximum of a value over a time bucket.
+    """
+
+    min: float
+    avg: float
+    max: float
+
+
+class SensorDataBucket(BaseModel):
+    """
+    Model representing the aggregated `SensorData` of a single time bucket.
+    """
+
+    timestamp: datetime
+    count: int
+    temperature: AggregatedValue
+    humidity: AggregatedValue
+    pressure: AggregatedValue
+    voltage: AggregatedValue | None
+
+
 class UserSensor(BaseModel):
     """
     Represents a `Sensor` with the connected `SensorPermission` for a given `DBUser`.
@@ -66,3 +99,51 @@ class UserSensor(BaseModel):
     type: SensorTypeModel
     read: bool | None = True
     write: bool | None = True
+
+
+class CacheStats(BaseModel):
+    """
+    Model describing the size and the hit / miss / eviction counters of an in-memory cache.
+
+    `weight` and `max_weight` are only set for caches bounded by the approximate size of their entries (in bytes).
+    """
+
+    size: int
+    max_size: int
+    hits: int
+    misses: int
+    evictions: int
+    weight: int | None = None
+    max_weight: int | None = None
+
+
+class IngestBufferStats(BaseModel):
+    """
+    Model describing the state of the write-behind `IngestBuffer`.
+
+    `lost_rows` counts the rows that could not be written, even after retrying.
+    """
+
+    pending: int
+    written_rows: int
+    retries: int
+    lost_rows: int
+
+
+class DeviceKeyInfo(BaseModel):
+    """
+    Model describing a `DeviceKey` without its secret.
+    """
+
+    id: int
+    name: str
+    sensor_ids: list[int]
+    created_at: datetime
+
+
+class DeviceKeyCreated(DeviceKeyInfo):
+    """
+    Model describing a newly created `DeviceKey`, the key is only returned once.
+    """
+
+    key: str
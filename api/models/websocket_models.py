@@ -0,0 +1,42 @@
+from pydantic import BaseModel, Field
+
+from api.models.enum_models import SensorTypeModel, WebsocketAction
+
+
+class WebsocketSubscription(BaseModel):
+    """
+    Model describing a subscribe / unsubscribe message sent by a websocket client.
+
+    `min_interval` limits the updates to at most one per sensor and interval (in seconds), 0 removes the limit.
+    """
+
+    action: WebsocketAction
+    sensor_ids: list[int] = []
+    sensor_types: list[SensorTypeModel] = []
+    min_interval: float | None = Field(default=None, ge=0)
+
+
+class WebsocketSubscriptionState(BaseModel):
+    """
+    Model describing the current subscriptions of a websocket connection, sent after every subscription message.
+
+    `all_sensors` is true until the client subscribes to sensor ids / types, till then all readable sensors are sent.
+    """
+
+    all_sensors: bool
+    sensor_ids: list[int]
+    sensor_types: list[SensorTypeModel]
+    min_interval: float
+
+
+class WebsocketHello(BaseModel):
+    """
+    Model describing the first message sent to a websocket client.
+
+    `epoch` scopes the event ids, reconnecting clients pass it along with their `last_event_id`.
+    `resync` is true if missed events could not be replayed, so the client should reload the current sensor data.
+    """
+
+    message: str = "Hello World!"
+    epoch: str
+    resync: bool = False
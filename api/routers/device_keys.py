@@ -0,0 +1,124 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from api.models.database_models import DBUser, DeviceKey, DeviceKeyCreate, DeviceKeySensor
+from api.models.event_models import DeviceKeyRevoked
+from api.models.response_models import DeviceKeyCreated, DeviceKeyInfo, NotFoundError
+from api.utils.database import get_session
+from api.utils.device_keys import generate_device_key, get_device_key_digest
+from api.utils.event_bus import EventBus, get_event_bus
+from api.utils.http_exceptions import DEVICE_KEY_NOT_EXISTING
+from api.utils.permissions import get_user_write_permissions
+from api.utils.security import get_current_user
+from api.utils.sensor_utils import get_sensor_from_db
+
+device_keys_router = APIRouter(tags=["Device Keys"], prefix="/devices/keys")
+
+
+@device_keys_router.post("", response_model=DeviceKeyCreated, status_code=status.HTTP_201_CREATED)
+async def create_device_key(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    current_user: Annotated[DBUser, Depends(get_current_user)],
+    device_key: DeviceKeyCreate,
+):
+    """
+    Creates a new long-lived API key for a device of the current user.
+
+    The key can be sent as `X-API-Key` header instead of a bearer token to the sensor write endpoints and the
+    websocket. It is only returned once, as just its digest is stored.
+    Args:
+        session (AsyncSession): A database session.
+        current_user (DBUser): The user that is currently logged in.
+        device_key (DeviceKeyCreate): The name of the device and the sensors the key should be bound to.
+
+    Returns:
+        The created `DeviceKey` including the key.
+    """
+    sensor_ids: list[int] = sorted(set(device_key.sensor_ids))
+    for sensor_id in sensor_ids:
+        await get_sensor_from_db(session, sensor_id)
+        await get_user_write_permissions(session, current_user, sensor_id)
+
+    key: str = generate_device_key()
+    db_device_key: DeviceKey = DeviceKey(
+        name=device_key.name, user_id=current_user.id, digest=get_device_key_digest(key)
+    )
+    session.add(db_device_key)
+    await session.flush()
+    session.add_all([DeviceKeySensor(device_key_id=db_device_key.id, sensor_id=sensor_id) for sensor_id in sensor_ids])
+    await session.commit()
+    await session.refresh(db_device_key)
+    return DeviceKeyCreated(
+        id=db_device_key.id,
+        name=db_device_key.name,
+        sensor_ids=sensor_ids,
+        created_at=db_device_key.created_at,
+        key=key,
+    )
+
+
+@device_keys_router.get("", response_model=list[DeviceKeyInfo])
+async def get_device_keys(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    current_user: Annotated[DBUser, Depends(get_current_user)],
+):
+    """
+    Returns all device keys of the current user.
+    Args:
+        session (AsyncSession): A database session.
+        current_user (DBUser): The user that is currently logged in.
+
+    Returns:
+        A list of `DeviceKeyInfo`s.
+    """
+    result = await session.execute(select(DeviceKey).where(DeviceKey.user_id == current_user.id).order_by(DeviceKey.id))
+    device_keys: list[DeviceKey] = list(result.scalars().all())
+
+    result = await session.execute(
+        select(DeviceKeySensor).where(DeviceKeySensor.device_key_id.in_([key.id for key in device_keys]))
+    )
+    sensor_ids: dict[int, list[int]] = {}
+    for binding in result.scalars().all():
+        sensor_ids.setdefault(binding.device_key_id, []).append(binding.sensor_id)
+
+    return [
+        DeviceKeyInfo(
+            id=key.id, name=key.name, sensor_ids=sorted(sensor_ids.get(key.id, [])), created_at=key.created_at
+        )
+        for key in device_keys
+    ]
+
+
+@device_keys_router.delete(
+    "/{device_key_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={status.HTTP_404_NOT_FOUND: {"description": "Not found", "model": NotFoundError}},
+)
+async def delete_device_key(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    current_user: Annotated[DBUser, Depends(get_current_user)],
+    event_bus: Annotated[EventBus, Depends(get_event_bus)],
+    device_key_id: int,
+) -> None:
+    """
+    Revokes a device key of the current user (superusers can revoke all keys).
+    Args:
+        session (AsyncSession): A database session.
+        current_user (DBUser): The user that is currently logged in.
+        event_bus (EventBus): The bus the revocation is published on, so every worker drops the cached key.
+        device_key_id (int): The id of the key that should be revoked.
+    """
+    device_key: DeviceKey | None = await session.get(DeviceKey, device_key_id)
+    if not device_key or (device_key.user_id != current_user.id and not current_user.superuser):
+        raise DEVICE_KEY_NOT_EXISTING
+
+    result = await session.execute(select(DeviceKeySensor).where(DeviceKeySensor.device_key_id == device_key.id))
+    for binding in result.scalars().all():
+        await session.delete(binding)
+    await session.delete(device_key)
+    await session.commit()
+    await event_bus.publish([DeviceKeyRevoked(digest=device_key.digest)])
+    return None
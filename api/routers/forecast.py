@@ -6,28 +6,38 @@ from fastapi import APIRouter, Depends, status
 from api.models.database_models import User
 from api.models.forecast_models import Forecast
 from api.models.response_models import BadGateway
-from api.utils.forecast_buffer import ForecastBuffer
+from api.utils.forecast_buffer import get_forecast_buffer
 from api.utils.http_exceptions import NO_FORECAST_DATA
 from api.utils.security import get_current_user
+from api.utils.single_flight import SingleFlight
 from SECRETS import OPENWEATHERMAP_KEY
 
 forecast_router = APIRouter(tags=["Forecast"])
-buffer: ForecastBuffer = ForecastBuffer()
+_forecast_requests: SingleFlight[tuple[str, str], Forecast | None] = SingleFlight()
 
 BASE_URL = "https://api.openweathermap.org/data/3.0/onecall"
 
 
+async def fetch_forecast_data(*, lat: str, lon: str) -> Forecast | None:
+    url = BASE_URL + f"?lat={lat}&lon={lon}&units=metric&lang=de&appid={OPENWEATHERMAP_KEY}"
+    async with httpx.AsyncClient() as client:
+        response: httpx.Response = await client.get(url)
+        if response.status_code != 200:
+            return None
+        forecast: Forecast = Forecast(**response.json())
+        get_forecast_buffer().add(lat, lon, forecast)
+    return forecast
+
+
 async def get_forecast_data(*, lat: str, lon: str) -> Forecast | None:
-    forecast: Forecast | None = buffer.get(lat, lon)
-    if not forecast:
-        url = BASE_URL + f"?lat={lat}&lon={lon}&units=metric&lang=de&appid={OPENWEATHERMAP_KEY}"
-        async with httpx.AsyncClient() as client:
-            response: httpx.Response = await client.get(url)
-            if response.status_code != 200:
-                return None
-            forecast = Forecast(**response.json())
-            buffer.add(lat, lon, forecast)
+    """
+    Returns the cached forecast of a location, or fetches it from OpenWeatherMap.
 
+    Concurrent requests for a location that is not cached share a single upstream request.
+    """
+    forecast: Forecast | None = get_forecast_buffer().get(lat, lon)
+    if not forecast:
+        forecast = await _forecast_requests.do((lat, lon), lambda: fetch_forecast_data(lat=lat, lon=lon))
     return forecast
 
 
@@ -5,8 +5,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
 from api.models.database_models import SensorPermission, SensorPermissionCreate, User
+from api.models.event_models import PermissionChanged
 from api.models.response_models import NotFoundError
 from api.utils.database import get_session
+from api.utils.event_bus import EventBus, get_event_bus
 from api.utils.http_exceptions import PERMISSION_NOT_EXISTING
 from api.utils.security import get_current_superuser
 
@@ -21,6 +23,7 @@ permissions_router = APIRouter(tags=["Permissions"], prefix="/permissions")
 async def put_sensor_permission(
     session: Annotated[AsyncSession, Depends(get_session)],
     current_superuser: Annotated[User, Depends(get_current_superuser)],
+    event_bus: Annotated[EventBus, Depends(get_event_bus)],
     sensor_permission: SensorPermissionCreate,
 ):
     """
@@ -29,6 +32,8 @@ async def put_sensor_permission(
     Args:
         session (AsyncSession): A database session.
         current_superuser (User): The currently logged in superuser.
+        event_bus (EventBus): The bus the change is published on, so the caches and websockets of all workers
+            apply it.
         sensor_permission (SensorPermissionCreate): The permission that should be created / updated.
 
     Returns:
@@ -51,6 +56,16 @@ async def put_sensor_permission(
     session.add(sensor_permission)
     await session.commit()
     await session.refresh(sensor_permission)
+    await event_bus.publish(
+        [
+            PermissionChanged(
+                user_id=sensor_permission.user_id,
+                sensor_id=sensor_permission.sensor_id,
+                read=sensor_permission.read,
+                write=sensor_permission.write,
+            )
+        ]
+    )
     return sensor_permission
 
 
@@ -112,6 +127,7 @@ async def get_sensor_permission(
 async def delete_sensor_permission(
     session: Annotated[AsyncSession, Depends(get_session)],
     current_superuser: Annotated[User, Depends(get_current_superuser)],
+    event_bus: Annotated[EventBus, Depends(get_event_bus)],
     user_id: int,
     sensor_id: int,
 ) -> None:
@@ -121,6 +137,8 @@ async def delete_sensor_permission(
     Args:
         session (AsyncSession): A database session.
         current_superuser (User): The currently logged in superuser.
+        event_bus (EventBus): The bus the change is published on, so the caches and websockets of all workers
+            apply it.
         user_id (int): The user_id related to the `SensorPermission`.
         sensor_id (int): The sensor_id related to the `SensorPermission`.
     """
@@ -129,4 +147,5 @@ async def delete_sensor_permission(
         raise PERMISSION_NOT_EXISTING
     await session.delete(sensor_permission)
     await session.commit()
+    await event_bus.publish([PermissionChanged(user_id=user_id, sensor_id=sensor_id, deleted=True)])
     return None
@@ -1,31 +1,95 @@
+from datetime import datetime, timezone
 from typing import Annotated
 
-from fastapi import APIRouter, BackgroundTasks, Depends, status
+from fastapi import APIRouter, BackgroundTasks, Body, Depends, Query, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
 from sqlalchemy.ext.asyncio.session import AsyncSession
-from sqlalchemy.sql import func
-from sqlmodel import NUMERIC, cast, or_, select
+from sqlmodel import or_, select
 
 from api.models.database_models import (
     DBUser,
     Sensor,
     SensorCreate,
     SensorData,
+    SensorDataBatchCreate,
     SensorDataCreate,
+    SensorDataDaily,
     SensorPermission,
     SensorState,
     SensorStateCreate,
     User,
+    UTCDatetime,
 )
-from api.models.enum_models import SensorTypeModel
-from api.models.response_models import DailySensorData, NotFoundError, UserSensor
-from api.utils.database import get_session
+from api.models.enum_models import ExportFormat, ImportFormat, IngestMode, SensorTypeModel
+from api.models.response_models import (
+    BadRequest,
+    BulkImportResult,
+    DailySensorData,
+    NotFoundError,
+    SensorDataBucket,
+    UserSensor,
+)
+from api.utils.aggregation import BucketSize, aggregate_sensor_data, parse_bucket
+from api.utils.bulk_import import BulkImportError, bulk_import, iter_lines, parse_rows
+from api.utils.database import get_engine, get_session
+from api.utils.device_keys import get_current_writer
+from api.utils.downsampling import downsample_sensor_data
+from api.utils.export import export_response
+from api.utils.http_exceptions import INVALID_IMPORT_DATA
+from api.utils.ingest_buffer import IngestBuffer, get_ingest_buffer
+from api.utils.pagination import paginate
 from api.utils.permissions import get_user_read_permissions, get_user_write_permissions
+from api.utils.rollups import update_rollups
 from api.utils.security import get_current_superuser, get_current_user
-from api.utils.sensor_utils import get_is_valid_sensor_type, get_sensor_from_db
+from api.utils.sensor_utils import SensorRegistry, get_is_valid_sensor_type, get_sensor_from_db, get_sensor_registry
 from api.utils.websocket_connection_handler import WebsocketHandler, get_websocket_handler
 
 sensors_router = APIRouter(tags=["Sensors"], prefix="/sensor")
 
+MAX_BATCH_SIZE: int = 1000
+MAX_POINTS: int = 10000
+
+
+async def store_sensor_row(
+    session: AsyncSession,
+    ws_handler: WebsocketHandler,
+    background_tasks: BackgroundTasks,
+    ingest_buffer: IngestBuffer,
+    response: Response,
+    data: SensorData | SensorState,
+    mode: IngestMode,
+) -> SensorData | SensorState:
+    """
+    Writes a new `SensorData` / `SensorState` as requested by the `IngestMode`.
+    Args:
+        session (AsyncSession): A database session.
+        ws_handler (WebsocketHandler): The handler the new row is published to.
+        background_tasks (BackgroundTasks): The background tasks of the current request.
+        ingest_buffer (IngestBuffer): The buffer used to group commit the row.
+        response (Response): The response of the current request.
+        data (SensorData | SensorState): The row that should be written.
+        mode (IngestMode): How the row should be written.
+
+    Returns:
+        The written row, without an id if it was only accepted.
+    """
+    if mode is IngestMode.DIRECT:
+        session.add(data)
+        if isinstance(data, SensorData):
+            await update_rollups(session, [data.model_dump()])
+        await session.commit()
+        await session.refresh(data)
+        background_tasks.add_task(ws_handler.add_event, data)
+        return data
+
+    durable = ingest_buffer.add(data)
+    if mode is IngestMode.ACCEPTED:
+        response.status_code = status.HTTP_202_ACCEPTED
+        return data
+    return await durable
+
 
 @sensors_router.get("/list", response_model=list[UserSensor])
 async def get_sensors(
@@ -96,6 +160,7 @@ async def get_sensor(
 async def create_sensor(
     session: Annotated[AsyncSession, Depends(get_session)],
     current_superuser: Annotated[User, Depends(get_current_superuser)],
+    sensor_registry: Annotated[SensorRegistry, Depends(get_sensor_registry)],
     sensor: SensorCreate,
 ):
     """
@@ -103,6 +168,7 @@ async def create_sensor(
     Args:
         session (AsyncSession): A database session.
         current_superuser (User): The currently logged in superuser.
+        sensor_registry (SensorRegistry): The registry the new sensor is added to.
         sensor (SensorCreate): The sensor that should be created.
 
     Returns:
@@ -112,25 +178,69 @@ async def create_sensor(
     session.add(sensor)
     await session.commit()
     await session.refresh(sensor)
+    sensor_registry.add(sensor)
     return sensor
 
 
+@sensors_router.post(
+    "/{sensor_id}/import",
+    response_model=BulkImportResult,
+    status_code=status.HTTP_201_CREATED,
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"description": "BadRequest", "model": BadRequest},
+        status.HTTP_404_NOT_FOUND: {"description": "Not found", "model": NotFoundError},
+    },
+)
+async def import_sensor_history(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    current_superuser: Annotated[User, Depends(get_current_superuser)],
+    sensor_id: int,
+    file: UploadFile,
+    import_format: Annotated[ImportFormat, Query(alias="format")] = ImportFormat.CSV,
+):
+    """
+    Bulk imports historical `SensorData` or `SensorState` (depending on the sensor type) from a CSV or NDJSON file.
+
+    The file is streamed in chunks and written with COPY on PostgreSQL, so memory usage is independent of its size.
+    Args:
+        session (AsyncSession): A database session.
+        current_superuser (User): The currently logged in superuser.
+        sensor_id (int): The id of the sensor the history belongs to.
+        file (UploadFile): The file containing the rows, CSV files need a header line.
+        import_format (ImportFormat): The format of the file.
+
+    Returns:
+        The number of imported rows and the throughput.
+    """
+    sensor: Sensor = await get_sensor_from_db(session, sensor_id)
+    model = SensorData if sensor.type is SensorTypeModel.ENVIRONMENTAL else SensorState
+
+    try:
+        return await bulk_import(session, model, sensor.id, parse_rows(iter_lines(file.read), import_format, model))
+    except BulkImportError:
+        raise INVALID_IMPORT_DATA
+
+
 @sensors_router.post("/{sensor_id}/data", response_model=SensorData, status_code=status.HTTP_201_CREATED)
 async def create_sensor_data(
     session: Annotated[AsyncSession, Depends(get_session)],
     ws_handler: Annotated[WebsocketHandler, Depends(get_websocket_handler)],
+    ingest_buffer: Annotated[IngestBuffer, Depends(get_ingest_buffer)],
     background_tasks: BackgroundTasks,
-    current_user: Annotated[DBUser, Depends(get_current_user)],
+    response: Response,
+    current_user: Annotated[DBUser, Depends(get_current_writer)],
     sensor_id: int,
     data: SensorDataCreate,
+    mode: IngestMode = IngestMode.DIRECT,
 ):
     """
     Creates a new `SensorData`.
     Args:
         session (AsyncSession): A database session.
-        current_user (DBUser): The user that is currently logged in.
+        current_user (DBUser): The user that is currently logged in (or whose device key is used).
         sensor_id (int): The id of the sensor creating the data.
         data (SensorDataCreate): The sensordata that should be created
+        mode (IngestMode): Whether the sensordata is committed directly or group committed by the `IngestBuffer`.
 
     Returns:
         The created `SensorData`
@@ -140,29 +250,84 @@ async def create_sensor_data(
     await get_is_valid_sensor_type(SensorTypeModel.ENVIRONMENTAL, sensor)
 
     data: SensorData = SensorData(**dict(data), sensor_id=sensor.id)
-    session.add(data)
+    return await store_sensor_row(session, ws_handler, background_tasks, ingest_buffer, response, data, mode)
+
+
+@sensors_router.post("/{sensor_id}/data/batch", response_model=list[SensorData], status_code=status.HTTP_201_CREATED)
+async def create_sensor_data_batch(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    ws_handler: Annotated[WebsocketHandler, Depends(get_websocket_handler)],
+    background_tasks: BackgroundTasks,
+    current_user: Annotated[DBUser, Depends(get_current_writer)],
+    sensor_id: int,
+    data: Annotated[list[SensorDataBatchCreate], Body(max_length=MAX_BATCH_SIZE)],
+):
+    """
+    Creates multiple `SensorData` with client supplied timestamps, e.g. readings buffered by a device while offline.
+
+    All rows are written with a single multi-row INSERT and committed together.
+    Args:
+        session (AsyncSession): A database session.
+        current_user (DBUser): The user that is currently logged in (or whose device key is used).
+        sensor_id (int): The id of the sensor creating the data.
+        data (list[SensorDataBatchCreate]): The sensordata that should be created.
+
+    Returns:
+        The created `SensorData` in the order they were sent.
+    """
+    sensor: Sensor = await get_sensor_from_db(session, sensor_id)
+    await get_user_write_permissions(session, current_user, sensor.id)
+    await get_is_valid_sensor_type(SensorTypeModel.ENVIRONMENTAL, sensor)
+
+    if not data:
+        return []
+
+    rows: list[dict] = [dict(entry) | {"sensor_id": sensor.id} for entry in data]
+    result = await session.scalars(insert(SensorData).returning(SensorData, sort_by_parameter_order=True), rows)
+    created_data: list[SensorData] = list(result.all())
+    await update_rollups(session, rows)
     await session.commit()
-    await session.refresh(data)
 
-    background_tasks.add_task(ws_handler.add_event, data)
+    background_tasks.add_task(ws_handler.add_events, created_data)
 
-    return data
+    return created_data
 
 
-@sensors_router.get("/{sensor_id}/data", response_model=list[SensorData])
+@sensors_router.get(
+    "/{sensor_id}/data",
+    response_model=list[SensorData],
+    responses={status.HTTP_400_BAD_REQUEST: {"description": "BadRequest", "model": BadRequest}},
+)
 async def get_sensor_data(
     session: Annotated[AsyncSession, Depends(get_session)],
     current_user: Annotated[DBUser, Depends(get_current_user)],
+    response: Response,
     sensor_id: int,
     amount: int = 1,
+    start: UTCDatetime | None = None,
+    end: UTCDatetime | None = None,
+    points: Annotated[int | None, Query(ge=3, le=MAX_POINTS)] = None,
+    before_id: int | None = None,
+    after_id: int | None = None,
+    cursor: str | None = None,
 ):
     """
     Retrieves the last n `SensorData` objects from the database for a given sensor.
+
+    With `points` the whole time range is downsampled instead, keeping the visual peaks (LTTB on the temperature).
+    Older / newer pages are retrieved with `before_id` / `after_id` or the `X-Next-Cursor` of a full page.
     Args:
         session (AsyncSession): A database session.
         current_user (User): The user that is currently logged in.
+        response (Response): The response of the current request.
         sensor_id (int): The id of the sensor whose data should be retrieved.
         amount (int): The number of measurements that should be retrieved.
+        start (datetime | None): If set, only measurements at or after this time are retrieved.
+        end (datetime | None): If set, only measurements before this time are retrieved.
+        points (int | None): If set, at most this many measurements of the time range are picked by LTTB.
+        before_id (int | None): If set, the measurements directly before this id are retrieved.
+        after_id (int | None): If set, the measurements directly after this id are retrieved.
+        cursor (str | None): The `X-Next-Cursor` of a previous page.
 
     Returns:
         A list of `SensorData` objects.
@@ -171,11 +336,86 @@ async def get_sensor_data(
     await get_user_read_permissions(session, current_user, sensor.id)
     await get_is_valid_sensor_type(SensorTypeModel.ENVIRONMENTAL, sensor)
 
-    result = await session.execute(
-        select(SensorData).where(SensorData.sensor_id == sensor.id).order_by(SensorData.id.desc()).limit(amount)
-    )
-    sensors = result.scalars().all()
-    return sensors[::-1]
+    if points:
+        return await downsample_sensor_data(session, sensor.id, start, end, points)
+
+    query = select(SensorData).where(SensorData.sensor_id == sensor.id)
+    if start:
+        query = query.where(SensorData.timestamp >= start)
+    if end:
+        query = query.where(SensorData.timestamp < end)
+    return await paginate(session, query, SensorData, response, amount, before_id, after_id, cursor)
+
+
+@sensors_router.get("/{sensor_id}/data/export", response_class=StreamingResponse)
+async def export_sensor_data(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    engine: Annotated[AsyncEngine, Depends(get_engine)],
+    current_user: Annotated[DBUser, Depends(get_current_user)],
+    sensor_id: int,
+    export_format: Annotated[ExportFormat, Query(alias="format")] = ExportFormat.NDJSON,
+    start: UTCDatetime | None = None,
+    end: UTCDatetime | None = None,
+):
+    """
+    Streams the whole `SensorData` history of a given sensor as NDJSON, CSV, Arrow or Parquet file, ordered by id.
+
+    Rows are sent in batches while they are read from the database, so memory usage does not depend on the row count.
+    Args:
+        session (AsyncSession): A database session.
+        engine (AsyncEngine): The database engine the export is read with.
+        current_user (User): The user that is currently logged in.
+        sensor_id (int): The id of the sensor whose measurements should be exported.
+        export_format (ExportFormat): The format of the export.
+        start (datetime | None): If set, only measurements at or after this time are exported.
+        end (datetime | None): If set, only measurements before this time are exported.
+
+    Returns:
+        A `StreamingResponse` with the exported rows.
+    """
+    sensor: Sensor = await get_sensor_from_db(session, sensor_id)
+    await get_user_read_permissions(session, current_user, sensor.id)
+    await get_is_valid_sensor_type(SensorTypeModel.ENVIRONMENTAL, sensor)
+
+    return export_response(engine, SensorData, sensor.id, export_format, start, end)
+
+
+@sensors_router.get(
+    "/{sensor_id}/data/aggregated",
+    response_model=list[SensorDataBucket],
+    responses={status.HTTP_400_BAD_REQUEST: {"description": "BadRequest", "model": BadRequest}},
+)
+async def get_sensor_data_aggregated(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    current_user: Annotated[DBUser, Depends(get_current_user)],
+    sensor_id: int,
+    start: UTCDatetime,
+    end: UTCDatetime | None = None,
+    bucket: str = "1h",
+):
+    """
+    Returns the minimum, average and maximum of all values per time bucket for a given sensor and time range.
+
+    The grouping is done by the database, so the response size only depends on the number of buckets.
+    Aligned queries are answered from the coarsest fitting rollup tier (hourly, daily or monthly) instead of the raw data.
+
+    Args:
+        session (AsyncSession): A database session.
+        current_user (User): The user that is currently logged in.
+        sensor_id (int): The id of the sensor whose data should be retrieved.
+        start (datetime): The start of the time range.
+        end (datetime | None): The end of the time range, defaults to now.
+        bucket (str): The size of a bucket, e.g. `5m`, `1h`, `1d` or `1mo` (calendar months).
+
+    Returns:
+        A list of `SensorDataBucket`s, buckets without data are omitted.
+    """
+    bucket_size: BucketSize = parse_bucket(bucket)
+    sensor: Sensor = await get_sensor_from_db(session, sensor_id)
+    await get_user_read_permissions(session, current_user, sensor.id)
+    await get_is_valid_sensor_type(SensorTypeModel.ENVIRONMENTAL, sensor)
+
+    return await aggregate_sensor_data(session, sensor.id, start, end or datetime.now(timezone.utc), bucket_size)
 
 
 @sensors_router.get("/{sensor_id}/data/daily", response_model=list[DailySensorData])
@@ -186,7 +426,9 @@ async def get_sensor_data_daily(
     amount: int = 1,
 ):
     """
-    Returns the average temperature for the last n days for a given sensor.
+    Returns the average temperature for the last n days (UTC) for a given sensor.
+
+    The values are read from the `SensorDataDaily` rollup, so the cost only depends on the number of days.
     Args:
         session (AsyncSession): A database session.
         current_user (User): The user that is currently logged in.
@@ -201,34 +443,34 @@ async def get_sensor_data_daily(
     await get_is_valid_sensor_type(SensorTypeModel.ENVIRONMENTAL, sensor)
 
     result = await session.execute(
-        select(
-            func.date(SensorData.timestamp),
-            func.round(cast(func.AVG(SensorData.temperature), NUMERIC), 2),
-        )
-        .where(SensorData.sensor_id == sensor.id)
-        .group_by(func.date(SensorData.timestamp))
-        .order_by(func.date(SensorData.timestamp).desc())
+        select(SensorDataDaily.period_start, SensorDataDaily.temperature_sum / SensorDataDaily.count)
+        .where(SensorDataDaily.sensor_id == sensor.id)
+        .order_by(SensorDataDaily.period_start.desc())
         .limit(amount)
     )
-    return [DailySensorData(timestamp=data[0], temperature=data[1]) for data in result][::-1]
+    return [DailySensorData(timestamp=data[0].date(), temperature=round(data[1], 2)) for data in result][::-1]
 
 
 @sensors_router.post("/{sensor_id}/state", response_model=SensorState, status_code=status.HTTP_201_CREATED)
 async def create_sensor_state(
     session: Annotated[AsyncSession, Depends(get_session)],
     ws_handler: Annotated[WebsocketHandler, Depends(get_websocket_handler)],
+    ingest_buffer: Annotated[IngestBuffer, Depends(get_ingest_buffer)],
     background_tasks: BackgroundTasks,
-    current_user: Annotated[DBUser, Depends(get_current_user)],
+    response: Response,
+    current_user: Annotated[DBUser, Depends(get_current_writer)],
     sensor_id: int,
     data: SensorStateCreate,
+    mode: IngestMode = IngestMode.DIRECT,
 ):
     """
     Creates a new `SensorData`.
     Args:
         session (AsyncSession): A database session.
-        current_user (DBUser): The user that is currently logged in.
+        current_user (DBUser): The user that is currently logged in (or whose device key is used).
         sensor_id (int): The id of the sensor creating the data.
         data (SensorStateCreate): The sensor state that should be created
+        mode (IngestMode): Whether the sensor state is committed directly or group committed by the `IngestBuffer`.
 
     Returns:
         The created `SensorState`
@@ -238,29 +480,37 @@ async def create_sensor_state(
     await get_is_valid_sensor_type(SensorTypeModel.STATE, sensor)
 
     data: SensorState = SensorState(**dict(data), sensor_id=sensor.id)
-    session.add(data)
-    await session.commit()
-    await session.refresh(data)
-
-    background_tasks.add_task(ws_handler.add_event, data)
-
-    return data
+    return await store_sensor_row(session, ws_handler, background_tasks, ingest_buffer, response, data, mode)
 
 
-@sensors_router.get("/{sensor_id}/state", response_model=list[SensorState])
+@sensors_router.get(
+    "/{sensor_id}/state",
+    response_model=list[SensorState],
+    responses={status.HTTP_400_BAD_REQUEST: {"description": "BadRequest", "model": BadRequest}},
+)
 async def get_sensor_state(
     session: Annotated[AsyncSession, Depends(get_session)],
     current_user: Annotated[DBUser, Depends(get_current_user)],
+    response: Response,
     sensor_id: int,
     amount: int = 1,
+    before_id: int | None = None,
+    after_id: int | None = None,
+    cursor: str | None = None,
 ):
     """
     Retrieves the last n `SensorState` objects from the database for a given sensor.
+
+    Older / newer pages are retrieved with `before_id` / `after_id` or the `X-Next-Cursor` of a full page.
     Args:
         session (AsyncSession): A database session.
         current_user (User): The user that is currently logged in.
+        response (Response): The response of the current request.
         sensor_id (int): The id of the sensor whose data should be retrieved.
         amount (int): The number of states that should be retrieved.
+        before_id (int | None): If set, the states directly before this id are retrieved.
+        after_id (int | None): If set, the states directly after this id are retrieved.
+        cursor (str | None): The `X-Next-Cursor` of a previous page.
 
     Returns:
         A list of `SensorState` objects.
@@ -269,8 +519,38 @@ async def get_sensor_state(
     await get_user_read_permissions(session, current_user, sensor.id)
     await get_is_valid_sensor_type(SensorTypeModel.STATE, sensor)
 
-    result = await session.execute(
-        select(SensorState).where(SensorState.sensor_id == sensor.id).order_by(SensorState.id.desc()).limit(amount)
-    )
-    sensors = result.scalars().all()
-    return sensors[::-1]
+    query = select(SensorState).where(SensorState.sensor_id == sensor.id)
+    return await paginate(session, query, SensorState, response, amount, before_id, after_id, cursor)
+
+
+@sensors_router.get("/{sensor_id}/state/export", response_class=StreamingResponse)
+async def export_sensor_state(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    engine: Annotated[AsyncEngine, Depends(get_engine)],
+    current_user: Annotated[DBUser, Depends(get_current_user)],
+    sensor_id: int,
+    export_format: Annotated[ExportFormat, Query(alias="format")] = ExportFormat.NDJSON,
+    start: UTCDatetime | None = None,
+    end: UTCDatetime | None = None,
+):
+    """
+    Streams the whole `SensorState` history of a given sensor as NDJSON, CSV, Arrow or Parquet file, ordered by id.
+
+    Rows are sent in batches while they are read from the database, so memory usage does not depend on the row count.
+    Args:
+        session (AsyncSession): A database session.
+        engine (AsyncEngine): The database engine the export is read with.
+        current_user (User): The user that is currently logged in.
+        sensor_id (int): The id of the sensor whose states should be exported.
+        export_format (ExportFormat): The format of the export.
+        start (datetime | None): If set, only states at or after this time are exported.
+        end (datetime | None): If set, only states before this time are exported.
+
+    Returns:
+        A `StreamingResponse` with the exported rows.
+    """
+    sensor: Sensor = await get_sensor_from_db(session, sensor_id)
+    await get_user_read_permissions(session, current_user, sensor.id)
+    await get_is_valid_sensor_type(SensorTypeModel.STATE, sensor)
+
+    return export_response(engine, SensorState, sensor.id, export_format, start, end)
@@ -4,9 +4,15 @@ import httpx
 from fastapi import APIRouter, Depends
 
 from api.models.database_models import DBUser
+from api.models.response_models import CacheStats, IngestBufferStats
 from api.models.serverstats_models import HistoryData, LiveStats
+from api.utils.device_keys import get_device_key_cache
+from api.utils.forecast_buffer import get_forecast_buffer
 from api.utils.http_exceptions import NO_SERVERSTATS_DATA
-from api.utils.security import get_current_superuser, get_current_user
+from api.utils.ingest_buffer import get_ingest_buffer
+from api.utils.permissions import get_permission_index
+from api.utils.security import get_current_superuser, get_current_user, get_user_cache
+from api.utils.sensor_utils import get_sensor_registry
 from SECRETS import SERVERSTATS_SETTINGS
 
 serverstats_router = APIRouter(tags=["Serverstats"], prefix="/server/stats")
@@ -76,3 +82,35 @@ async def get_serverstats_history(
     if not history_stats:
         raise NO_SERVERSTATS_DATA
     return history_stats
+
+
+@serverstats_router.get("/caches", response_model=dict[str, CacheStats])
+async def get_cache_stats(current_superuser: Annotated[DBUser, Depends(get_current_superuser)]):
+    """
+    Returns the size and the hit / miss / eviction counters of the in-memory caches.
+    Args:
+        current_superuser (User): The currently logged in superuser.
+
+    Returns:
+        The `CacheStats` by cache name.
+    """
+    return {
+        "users": get_user_cache().stats,
+        "permissions": get_permission_index().stats,
+        "sensors": get_sensor_registry().stats,
+        "device_keys": get_device_key_cache().stats,
+        "forecasts": get_forecast_buffer().stats,
+    }
+
+
+@serverstats_router.get("/ingest", response_model=IngestBufferStats)
+async def get_ingest_stats(current_superuser: Annotated[DBUser, Depends(get_current_superuser)]):
+    """
+    Returns the number of pending, written and lost rows of the write-behind ingest buffer.
+    Args:
+        current_superuser (User): The currently logged in superuser.
+
+    Returns:
+        The `IngestBufferStats`.
+    """
+    return get_ingest_buffer().stats
@@ -9,7 +9,7 @@ from api.models.database_models import DBUser, User, UserCreate
 from api.models.response_models import BadRequest
 from api.utils.database import get_session
 from api.utils.http_exceptions import USER_ALREADY_EXISTS
-from api.utils.security import get_current_superuser, get_current_user, get_password_hash
+from api.utils.security import get_current_superuser, get_current_user, get_password_hash_async, invalidate_cached_user
 
 users_router = APIRouter(tags=["Users"], prefix="/users")
 
@@ -67,9 +67,11 @@ async def create_user(
         The created `User`.
     """
     try:
-        hashed_password: str = get_password_hash(user.password)
+        hashed_password: str = await get_password_hash_async(user.password)
         session.add(DBUser(username=user.username, hashed_password=hashed_password))
         await session.commit()
     except IntegrityError:
         raise USER_ALREADY_EXISTS
+    # Drop entries of a previous user with the same name, their tokens must not resolve to the new user.
+    invalidate_cached_user(user.username)
     return User(username=user.username)
@@ -1,10 +1,16 @@
-from typing import Annotated
+import json
+from typing import Annotated, Any
 
 from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, WebSocketException, status
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.models.database_models import DBUser
-from api.utils.security import get_current_user_ws
-from api.utils.websocket_connection_handler import WebsocketHandler, get_websocket_handler
+from api.models.websocket_models import WebsocketHello, WebsocketSubscription
+from api.utils.database import get_session
+from api.utils.device_keys import get_current_client_ws
+from api.utils.websocket_connection_handler import WebsocketConnection, WebsocketHandler, get_websocket_handler
+from api.utils.websocket_encoding import BINARY_SUBPROTOCOL
 
 websocket_router = APIRouter()
 
@@ -12,18 +18,56 @@ websocket_router = APIRouter()
 @websocket_router.websocket("/ws")
 async def websocket_endpoint(
     websocket: WebSocket,
-    current_user: Annotated[DBUser, Depends(get_current_user_ws)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    current_client: Annotated[tuple[DBUser, frozenset[int]], Depends(get_current_client_ws)],
     ws_handler: Annotated[WebsocketHandler, Depends(get_websocket_handler)],
+    last_event_id: int | None = None,
+    epoch: str | None = None,
 ):
-    if not ws_handler.add(current_user, websocket):
-        return await websocket.close(1008)
+    """
+    Sends the events of all sensors the client may read.
 
-    await websocket.accept()
-    await websocket.send_json({"message": "Hello World!"})
+    Clients can send `WebsocketSubscription` messages to only receive the events of some sensors / sensor types
+    and to limit the updates per sensor, every message is answered with the `WebsocketSubscriptionState`.
+    Reconnecting clients can pass the `event_id` of the last event they received as `last_event_id` and the `epoch`
+    of the `WebsocketHello` to get the events they missed meanwhile first, `resync` tells them if that was not
+    possible.
+    Clients offering the `BINARY_SUBPROTOCOL` receive the events as compact binary frames, all other messages
+    stay JSON. Binary messages of the client are not supported and close the connection with 1003.
+    """
+    current_user, sensor_ids = current_client
+    binary: bool = BINARY_SUBPROTOCOL in websocket.scope.get("subprotocols", [])
+    connection: WebsocketConnection | None = await ws_handler.add(
+        session, current_user, websocket, sensor_ids, last_event_id, binary, epoch
+    )
+    # The session is only needed to authenticate and subscribe, so its connection is not held as long as the socket.
+    await session.close()
+    if not connection:
+        return await websocket.close(1008)
 
-    print(f"Accepted connection with {current_user.username}")
     try:
+        await websocket.accept(subprotocol=BINARY_SUBPROTOCOL if binary else None)
+        await websocket.send_text(WebsocketHello(epoch=ws_handler.epoch, resync=connection.resync).model_dump_json())
+        connection.start()
+
+        print(f"Accepted connection with {current_user.username}")
         while True:
-            await websocket.receive_text()
+            message: dict[str, Any] = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("text") is None:
+                # Subscriptions are JSON text messages, also on connections receiving binary frames.
+                connection.stop()
+                await websocket.close(status.WS_1003_UNSUPPORTED_DATA)
+                break
+            try:
+                subscription: WebsocketSubscription = WebsocketSubscription.model_validate_json(message["text"])
+            except ValidationError as exception:
+                connection.reply(json.dumps({"detail": json.loads(exception.json(include_url=False))}))
+                continue
+            connection.reply(connection.update_subscription(subscription).model_dump_json())
     except WebSocketDisconnect:
-        ws_handler.remove(current_user)
+        pass
+    finally:
+        # Also free the slot of the user if the connection failed otherwise.
+        ws_handler.remove(connection)
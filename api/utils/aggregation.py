@@ -0,0 +1,208 @@
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Type
+
+from sqlalchemy.ext.asyncio.session import AsyncSession
+from sqlalchemy.sql import func
+from sqlmodel import select
+
+from api.models.database_models import SensorData, SensorDataRollupBase, to_utc
+from api.models.response_models import AggregatedValue, SensorDataBucket
+from api.utils.http_exceptions import INVALID_BUCKET, TOO_MANY_BUCKETS
+from api.utils.rollups import MONTHLY, TIERS, VALUES, RollupTier, month_start
+from api.utils.sql_functions import epoch
+
+MAX_BUCKETS: int = 10000
+
+_BUCKET_PATTERN = re.compile(r"^(\d+)(mo|[smhdw])$")
+_BUCKET_UNITS: dict[str, timedelta] = {
+    "s": timedelta(seconds=1),
+    "m": timedelta(minutes=1),
+    "h": timedelta(hours=1),
+    "d": timedelta(days=1),
+    "w": timedelta(weeks=1),
+}
+
+
+class BucketSize:
+    """
+    The size of an aggregation bucket, either a fixed duration or a number of calendar months.
+
+    Args:
+        duration (timedelta | None): The duration of a bucket, `None` for calendar months.
+        months (int): The number of calendar months of a bucket.
+    """
+
+    def __init__(self, duration: timedelta | None = None, months: int = 0) -> None:
+        self.duration: timedelta | None = duration
+        self.months: int = months
+
+    def count(self, start: datetime, end: datetime) -> float:
+        """
+        Returns the (approximate) number of buckets in the given time range.
+        """
+        if self.duration:
+            return (end - start) / self.duration
+        return ((end.year - start.year) * 12 + end.month - start.month) / self.months
+
+
+def parse_bucket(bucket: str) -> BucketSize:
+    """
+    Parses a bucket size like `5m`, `1h`, `1d` or `1mo`.
+
+    Args:
+        bucket (str): The bucket size as a number followed by a unit (s, m, h, d, w or mo).
+
+    Raises:
+        HTTPException - The bucket size is malformed.
+
+    Returns:
+        The bucket size.
+    """
+    match = _BUCKET_PATTERN.match(bucket)
+    if not match or int(match.group(1)) == 0:
+        raise INVALID_BUCKET
+    if match.group(2) == "mo":
+        return BucketSize(months=int(match.group(1)))
+    return BucketSize(duration=int(match.group(1)) * _BUCKET_UNITS[match.group(2)])
+
+
+def _is_aligned(timestamp: datetime, period: timedelta) -> bool:
+    return timestamp.timestamp() % period.total_seconds() == 0
+
+
+def select_tier(bucket: timedelta, start: datetime, end: datetime) -> RollupTier | None:
+    """
+    Selects the coarsest rollup tier that can answer a query for fixed size buckets exactly.
+
+    A tier can be used if its period divides the bucket size and the time range does not cut a period in half.
+    An `end` in the future is fine, as there is no data after now.
+
+    Args:
+        bucket (timedelta): The size of a bucket.
+        start (datetime): The start of the time range.
+        end (datetime): The end of the time range.
+
+    Returns:
+        The selected tier or `None` if the raw data has to be aggregated.
+    """
+    now: datetime = datetime.now(timezone.utc)
+    for tier in reversed(TIERS):
+        if tier.period is None or bucket % tier.period:
+            continue
+        if _is_aligned(start, tier.period) and (end >= now or _is_aligned(end, tier.period)):
+            return tier
+    return None
+
+
+def _aggregate_columns(source: Type[SensorData | SensorDataRollupBase]) -> list:
+    """
+    Returns the count, the voltage count and the minimum, sum and maximum of every value of a group.
+    """
+    if source is SensorData:
+        columns: list = [func.count(), func.count(SensorData.voltage)]
+        for name in (*VALUES, "voltage"):
+            value = getattr(SensorData, name)
+            columns += [func.min(value), func.sum(value), func.max(value)]
+        return columns
+
+    columns = [func.sum(source.count), func.sum(source.voltage_count)]
+    for name in (*VALUES, "voltage"):
+        columns += [
+            func.min(getattr(source, f"{name}_min")),
+            func.sum(getattr(source, f"{name}_sum")),
+            func.max(getattr(source, f"{name}_max")),
+        ]
+    return columns
+
+
+def _to_bucket(timestamp: datetime, aggregates: list) -> SensorDataBucket:
+    """
+    Creates a `SensorDataBucket` from the values returned for the `_aggregate_columns`.
+    """
+    count, voltage_count = aggregates[0], aggregates[1]
+    values: dict[str, AggregatedValue | None] = {}
+    for index, name in enumerate((*VALUES, "voltage")):
+        minimum, total, maximum = aggregates[2 + 3 * index : 5 + 3 * index]
+        values_count: int = voltage_count if name == "voltage" else count
+        values[name] = (
+            AggregatedValue(min=minimum, avg=round(total / values_count, 2), max=maximum) if values_count else None
+        )
+    return SensorDataBucket(timestamp=timestamp, count=count, **values)
+
+
+async def _aggregate_months(
+    session: AsyncSession, sensor_id: int, start: datetime, end: datetime, months: int
+) -> list[SensorDataBucket]:
+    """
+    Merges the monthly rollup into buckets of the given number of calendar months.
+    """
+    model: Type[SensorDataRollupBase] = MONTHLY.model
+    result = await session.execute(
+        select(model.period_start, *_aggregate_columns(model))
+        .where(model.sensor_id == sensor_id, model.period_start >= month_start(start), model.period_start < end)
+        .group_by(model.period_start)
+        .order_by(model.period_start)
+    )
+
+    buckets: dict[datetime, list] = {}
+    for period_start, *aggregates in result:
+        index: int = ((period_start.year * 12 + period_start.month - 1) // months) * months
+        bucket_start: datetime = datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+        merged: list | None = buckets.get(bucket_start)
+        if merged is None:
+            buckets[bucket_start] = list(aggregates)
+            continue
+        merged[0] += aggregates[0]
+        merged[1] += aggregates[1]
+        for offset in range(2, len(aggregates), 3):
+            minimums = [value for value in (merged[offset], aggregates[offset]) if value is not None]
+            maximums = [value for value in (merged[offset + 2], aggregates[offset + 2]) if value is not None]
+            merged[offset] = min(minimums, default=None)
+            merged[offset + 1] = (merged[offset + 1] or 0.0) + (aggregates[offset + 1] or 0.0)
+            merged[offset + 2] = max(maximums, default=None)
+    return [_to_bucket(bucket_start, aggregates) for bucket_start, aggregates in buckets.items()]
+
+
+async def aggregate_sensor_data(
+    session: AsyncSession, sensor_id: int, start: datetime, end: datetime, bucket: BucketSize
+) -> list[SensorDataBucket]:
+    """
+    Groups the `SensorData` of a sensor in the given time range into buckets of the given size in the database.
+
+    Fixed size buckets are aligned to the unix epoch (UTC) and read from the coarsest rollup tier that fits
+    (see `select_tier`), falling back to the raw data. Month buckets are always read from the monthly rollup and
+    cover whole calendar months. Empty buckets are omitted.
+
+    Args:
+        session (AsyncSession): A database session.
+        sensor_id (int): The id of the sensor whose data should be aggregated.
+        start (datetime): The start of the time range (inclusive).
+        end (datetime): The end of the time range (exclusive).
+        bucket (BucketSize): The size of a single bucket.
+
+    Raises:
+        HTTPException - The time range contains more than `MAX_BUCKETS` buckets.
+
+    Returns:
+        The minimum, average and maximum of every value per bucket, ordered by time.
+    """
+    start, end = to_utc(start), to_utc(end)
+    if bucket.count(start, end) > MAX_BUCKETS:
+        raise TOO_MANY_BUCKETS
+    if bucket.months:
+        return await _aggregate_months(session, sensor_id, start, end, bucket.months)
+
+    tier: RollupTier | None = select_tier(bucket.duration, start, end)
+    source: Type[SensorData | SensorDataRollupBase] = tier.model if tier else SensorData
+    timestamp = source.period_start if tier else SensorData.timestamp
+
+    bucket_seconds: int = int(bucket.duration.total_seconds())
+    bucket_start = epoch(timestamp) // bucket_seconds * bucket_seconds
+    result = await session.execute(
+        select(bucket_start, *_aggregate_columns(source))
+        .where(source.sensor_id == sensor_id, timestamp >= start, timestamp < end)
+        .group_by(bucket_start)
+        .order_by(bucket_start)
+    )
+    return [_to_bucket(datetime.fromtimestamp(row[0], timezone.utc), list(row[1:])) for row in result]
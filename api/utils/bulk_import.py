@@ -0,0 +1,147 @@
+import codecs
+import csv
+import json
+import time
+from typing import AsyncIterator, Awaitable, Callable, Type
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.ext.asyncio.session import AsyncSession
+
+from api.models.database_models import SensorData, SensorDataBatchCreate, SensorState, SensorStateBatchCreate
+from api.models.enum_models import ImportFormat
+from api.models.response_models import BulkImportResult
+from api.utils.rollups import update_rollups
+
+CHUNK_SIZE: int = 5000
+READ_SIZE: int = 64 * 1024
+
+_CREATE_MODELS: dict[Type[SensorData | SensorState], Type[SensorDataBatchCreate | SensorStateBatchCreate]] = {
+    SensorData: SensorDataBatchCreate,
+    SensorState: SensorStateBatchCreate,
+}
+
+
+class BulkImportError(ValueError):
+    """
+    Raised when a row of a bulk import can not be parsed.
+    """
+
+    pass
+
+
+async def iter_lines(read: Callable[[int], Awaitable[bytes]]) -> AsyncIterator[str]:
+    """
+    Reads a file in fixed size chunks and yields it line by line, so the whole file never has to be in memory.
+
+    Args:
+        read (Callable[[int], Awaitable[bytes]]): An async function returning the next (at most) n bytes of the file.
+
+    Yields:
+        The lines of the file without their line endings.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    remainder: str = ""
+    while chunk := await read(READ_SIZE):
+        *lines, remainder = (remainder + decoder.decode(chunk)).split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    remainder += decoder.decode(b"", final=True)
+    if remainder.strip():
+        yield remainder.rstrip("\r")
+
+
+async def parse_rows(
+    lines: AsyncIterator[str], import_format: ImportFormat, model: Type[SensorData | SensorState]
+) -> AsyncIterator[dict]:
+    """
+    Parses and validates the rows of a CSV (with header) or NDJSON file.
+
+    Args:
+        lines (AsyncIterator[str]): The lines of the file.
+        import_format (ImportFormat): The format of the file.
+        model (Type[SensorData | SensorState]): The model the rows should be imported to.
+
+    Raises:
+        BulkImportError - A row is malformed or contains invalid values.
+
+    Yields:
+        The validated rows as dicts.
+    """
+    create_model = _CREATE_MODELS[model]
+    header: list[str] | None = None
+    line_number: int = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            if import_format is ImportFormat.NDJSON:
+                raw_row: dict = json.loads(line)
+            elif header is None:
+                header = next(csv.reader([line]))
+                continue
+            else:
+                # Empty CSV fields are missing values, e.g. for the optional voltage.
+                raw_row = {key: value or None for key, value in zip(header, next(csv.reader([line])))}
+            yield dict(create_model.model_validate(raw_row))
+        except (ValueError, ValidationError) as exception:
+            raise BulkImportError(f"Invalid row in line {line_number}: {exception}") from exception
+
+
+async def _copy_chunk(
+    session: AsyncSession, connection: AsyncConnection, model: Type[SensorData | SensorState], chunk: list[dict]
+) -> None:
+    """
+    Writes a chunk of rows with asyncpg's COPY protocol or a multi-row INSERT for all other drivers.
+    """
+    if model is SensorData:
+        await update_rollups(session, chunk)
+    if connection.dialect.driver == "asyncpg":  # pragma: no cover: Real database access cannot be properly tested
+        columns: list[str] = list(chunk[0].keys())
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            model.__tablename__, records=[tuple(row[column] for column in columns) for row in chunk], columns=columns
+        )
+    else:
+        await connection.execute(insert(model), chunk)
+
+
+async def bulk_import(
+    session: AsyncSession,
+    model: Type[SensorData | SensorState],
+    sensor_id: int,
+    rows: AsyncIterator[dict],
+    chunk_size: int = CHUNK_SIZE,
+) -> BulkImportResult:
+    """
+    Imports the given rows for a sensor in chunks of `chunk_size` and commits them in a single transaction.
+
+    Args:
+        session (AsyncSession): A database session.
+        model (Type[SensorData | SensorState]): The model the rows should be imported to.
+        sensor_id (int): The id of the sensor the rows belong to.
+        rows (AsyncIterator[dict]): The rows that should be imported, e.g. from `parse_rows`.
+        chunk_size (int): The number of rows that are written at once.
+
+    Returns:
+        The number of imported rows and the throughput.
+    """
+    start: float = time.perf_counter()
+    connection: AsyncConnection = await session.connection()
+    imported: int = 0
+    chunk: list[dict] = []
+    async for row in rows:
+        chunk.append(row | {"sensor_id": sensor_id})
+        if len(chunk) >= chunk_size:
+            await _copy_chunk(session, connection, model, chunk)
+            imported += len(chunk)
+            chunk = []
+    if chunk:
+        await _copy_chunk(session, connection, model, chunk)
+        imported += len(chunk)
+    await session.commit()
+
+    seconds: float = time.perf_counter() - start
+    return BulkImportResult(rows=imported, seconds=seconds, rows_per_second=imported / seconds if seconds else 0.0)
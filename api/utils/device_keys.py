@@ -0,0 +1,175 @@
+import hashlib
+import hmac
+import secrets
+from datetime import timedelta
+from typing import Annotated
+
+from fastapi import Depends, Header, Security, WebSocketException, status
+from fastapi.security import APIKeyHeader, OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio.session import AsyncSession
+from sqlmodel import select
+
+from api.models.database_models import DBUser, DeviceKey, DeviceKeySensor
+from api.models.event_models import DeviceKeyRevoked, EventBusReconnected
+from api.utils.database import get_session
+from api.utils.event_bus import get_event_bus
+from api.utils.http_exceptions import INVALID_CREDENTIALS, MISSING_PRIVILEGES, NOT_AUTHENTICATED
+from api.utils.security import get_current_user_ws, get_user_from_token
+from api.utils.ttl_cache import TTLCache
+from SECRETS import SECRET_KEY
+
+API_KEY_HEADER: str = "X-API-Key"
+
+api_key_scheme = APIKeyHeader(name=API_KEY_HEADER, auto_error=False)
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+
+
+class DeviceKeyEntry:
+    """
+    A verified `DeviceKey` as kept in the cache.
+
+    Args:
+        user (DBUser): The user the key belongs to.
+        sensor_ids (frozenset[int]): The sensors the key is bound to, empty if it is not restricted.
+    """
+
+    def __init__(self, user: DBUser, sensor_ids: frozenset[int]) -> None:
+        self.user: DBUser = user
+        self.sensor_ids: frozenset[int] = sensor_ids
+
+    def allows(self, sensor_id: int) -> bool:
+        """
+        Returns whether the key may be used for the given sensor.
+        """
+        return not self.sensor_ids or sensor_id in self.sensor_ids
+
+
+_device_key_cache: TTLCache[str, DeviceKeyEntry] = TTLCache(max_size=4096, ttl=timedelta(minutes=5))
+
+
+def get_device_key_cache() -> TTLCache[str, DeviceKeyEntry]:
+    return _device_key_cache
+
+
+def generate_device_key() -> str:
+    """
+    Generates a new random device key.
+    """
+    return secrets.token_urlsafe(32)
+
+
+def get_device_key_digest(key: str) -> str:
+    """
+    Returns the HMAC-SHA256 digest of a device key, which is stored instead of the key.
+
+    The keys are random, so a single keyed hash is enough (unlike passwords, which need bcrypt).
+    """
+    return hmac.new(SECRET_KEY.encode(), key.encode(), hashlib.sha256).hexdigest()
+
+
+async def get_device_key_entry(session: AsyncSession, key: str) -> DeviceKeyEntry | None:
+    """
+    Verifies a device key, the database is only queried if the key is not cached.
+
+    The lookup is done by the digest, so the key itself is never compared and timing does not leak it.
+
+    Args:
+        session (AsyncSession): A database session.
+        key (str): The device key of the request.
+
+    Returns:
+        The `DeviceKeyEntry` if the key is valid.
+    """
+    digest: str = get_device_key_digest(key)
+    entry: DeviceKeyEntry | None = _device_key_cache.get(digest)
+    if entry is not None:
+        return entry
+
+    result = await session.execute(
+        select(DeviceKey, DBUser).join(DBUser, DBUser.id == DeviceKey.user_id).where(DeviceKey.digest == digest)
+    )
+    row = result.first()
+    if row is None:
+        return None
+    device_key, user = row
+    result = await session.execute(
+        select(DeviceKeySensor.sensor_id).where(DeviceKeySensor.device_key_id == device_key.id)
+    )
+    entry = DeviceKeyEntry(user, frozenset(result.scalars().all()))
+    _device_key_cache.set(digest, entry)
+    return entry
+
+
+def invalidate_device_key(digest: str) -> None:
+    """
+    Removes a (deleted) device key from the cache.
+    """
+    _device_key_cache.invalidate(lambda key: key == digest)
+
+
+def _on_device_key_revoked(event: DeviceKeyRevoked) -> None:
+    invalidate_device_key(event.digest)
+
+
+# Revoked keys are dropped by every worker, after a reconnect of the bus revocations may have been missed.
+get_event_bus().subscribe(_on_device_key_revoked, DeviceKeyRevoked)
+get_event_bus().subscribe(lambda _: _device_key_cache.clear(), EventBusReconnected)
+
+
+async def get_current_writer(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    sensor_id: int,
+    token: Annotated[str | None, Depends(optional_oauth2_scheme)] = None,
+    api_key: Annotated[str | None, Security(api_key_scheme)] = None,
+) -> DBUser:
+    """
+    Authenticates a request writing to a sensor either by a bearer token or by a device key.
+
+    A device key acts as its user, restricted to the sensors it is bound to.
+
+    Args:
+        session (AsyncSession): A database session.
+        sensor_id (int): The id of the sensor the request writes to.
+        token (str | None): The bearer token of the request.
+        api_key (str | None): The device key of the request.
+
+    Raises:
+        HTTPException - The request is not authenticated or the device key is not bound to the sensor.
+
+    Returns:
+        The user the request is made for.
+    """
+    if api_key is not None:
+        entry: DeviceKeyEntry | None = await get_device_key_entry(session, api_key)
+        if entry is None:
+            raise INVALID_CREDENTIALS
+        if not entry.allows(sensor_id):
+            raise MISSING_PRIVILEGES
+        return entry.user
+
+    if token is None:
+        raise NOT_AUTHENTICATED
+    user: DBUser | None = await get_user_from_token(token, session)
+    if user is None:
+        raise INVALID_CREDENTIALS
+    return user
+
+
+async def get_current_client_ws(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    authorization: Annotated[str | None, Header()] = None,
+    x_api_key: Annotated[str | None, Header()] = None,
+) -> tuple[DBUser, frozenset[int]]:
+    """
+    Authenticates a websocket connection either by a bearer token or by a device key.
+
+    Returns:
+        The user and the sensors the connection is restricted to (empty if it is not restricted).
+    """
+    if x_api_key is None:
+        return await get_current_user_ws(session, authorization), frozenset()
+
+    entry: DeviceKeyEntry | None = await get_device_key_entry(session, x_api_key)
+    if entry is None:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
+    return entry.user, entry.sensor_ids
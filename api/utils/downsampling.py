@@ -0,0 +1,93 @@
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy.ext.asyncio.session import AsyncSession
+from sqlmodel import select
+
+from api.models.database_models import SensorData
+
+_COLUMNS = (
+    SensorData.id,
+    SensorData.temperature,
+    SensorData.humidity,
+    SensorData.pressure,
+    SensorData.voltage,
+    SensorData.timestamp,
+    SensorData.sensor_id,
+)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Selects `threshold` points with the Largest-Triangle-Three-Buckets algorithm.
+
+    Unlike bucket averages, LTTB keeps the points that shape the chart, so short spikes stay visible.
+    The first and last point are always kept, every bucket in between contributes the point forming the largest
+    triangle with the previously selected point and the average of the next bucket.
+
+    Args:
+        x (np.ndarray): The x values (e.g. unix timestamps) in ascending order.
+        y (np.ndarray): The y values.
+        threshold (int): The maximum number of points that should be selected.
+
+    Returns:
+        The indices of the selected points in ascending order.
+    """
+    length: int = len(x)
+    if threshold >= length or threshold < 3:
+        return np.arange(length)
+
+    # Split the inner points into `threshold - 2` buckets, the last "next bucket" is the last point itself.
+    edges: np.ndarray = np.linspace(1, length - 1, threshold - 1).astype(np.intp)
+    next_edges: np.ndarray = np.append(edges[1:], length)
+    average_x: np.ndarray = np.add.reduceat(x, next_edges[:-1]) / np.diff(next_edges)
+    average_y: np.ndarray = np.add.reduceat(y, next_edges[:-1]) / np.diff(next_edges)
+
+    selected: np.ndarray = np.empty(threshold, dtype=np.intp)
+    selected[0], selected[-1] = 0, length - 1
+    previous: int = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        areas: np.ndarray = np.abs(
+            (x[previous] - average_x[bucket]) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (average_y[bucket] - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+async def downsample_sensor_data(
+    session: AsyncSession, sensor_id: int, start: datetime | None, end: datetime | None, points: int
+) -> list[dict]:
+    """
+    Returns at most `points` raw `SensorData` of a sensor in the given time range, picked by LTTB on the temperature.
+
+    The rows are fetched as plain tuples and processed column-wise, no `SensorData` instances are created.
+
+    Args:
+        session (AsyncSession): A database session.
+        sensor_id (int): The id of the sensor whose data should be retrieved.
+        start (datetime | None): If set, only measurements at or after this time are considered.
+        end (datetime | None): If set, only measurements before this time are considered.
+        points (int): The maximum number of measurements that should be returned.
+
+    Returns:
+        The selected measurements as dicts with the fields of `SensorData`, ordered by time.
+    """
+    query = select(*_COLUMNS).where(SensorData.sensor_id == sensor_id)
+    if start:
+        query = query.where(SensorData.timestamp >= start)
+    if end:
+        query = query.where(SensorData.timestamp < end)
+    result = await session.execute(query.order_by(SensorData.timestamp, SensorData.id))
+    rows = result.all()
+    if not rows:
+        return []
+
+    columns = list(zip(*rows))
+    timestamps = np.fromiter((timestamp.timestamp() for timestamp in columns[5]), dtype=np.float64, count=len(rows))
+    temperatures = np.asarray(columns[1], dtype=np.float64)
+
+    names: list[str] = [column.key for column in _COLUMNS]
+    return [dict(zip(names, rows[index])) for index in lttb(timestamps, temperatures, points)]
@@ -0,0 +1,256 @@
+import asyncio
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Callable
+
+import asyncpg
+from pydantic import BaseModel
+from sqlalchemy import make_url
+
+from api.models.database_models import SensorData, SensorState
+from api.models.enum_models import EventBusBackend
+from api.models.event_models import DeviceKeyRevoked, EventBusReconnected, PermissionChanged
+from SECRETS import PSQL_URL
+
+try:
+    from SECRETS import WEBSOCKET_EVENT_BUS
+except ImportError:  # pragma: no cover: Older SECRETS files do not contain the setting
+    WEBSOCKET_EVENT_BUS: str = EventBusBackend.MEMORY.value
+
+Event = SensorData | SensorState | PermissionChanged | DeviceKeyRevoked | EventBusReconnected
+EventCallback = Callable[[Event], None]
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more.
+MAX_NOTIFY_PAYLOAD: int = 7900
+
+# The events that are sent to other workers, `EventBusReconnected` is only delivered to the own worker.
+_EVENT_TYPES: dict[str, type[BaseModel]] = {
+    "data": SensorData,
+    "state": SensorState,
+    "permission": PermissionChanged,
+    "device_key": DeviceKeyRevoked,
+}
+_EVENT_NAMES: dict[type[BaseModel], str] = {event_type: name for name, event_type in _EVENT_TYPES.items()}
+
+
+class EventBus(ABC):
+    """
+    Delivers new `SensorData` / `SensorState`s and changes of cached data (e.g. `PermissionChanged`) to the
+    subscribers of every worker.
+
+    Subscribers are called with every published event, also with the events published by the own worker.
+    """
+
+    def __init__(self) -> None:
+        self._callbacks: list[tuple[EventCallback, tuple[type[Event], ...]]] = []
+
+    def subscribe(self, callback: EventCallback, *event_types: type[Event]) -> None:
+        """
+        Registers a callback that is called with every event of the given types, with all events if none are given.
+        """
+        self._callbacks.append((callback, event_types))
+
+    def _deliver(self, event: Event) -> None:
+        for callback, event_types in self._callbacks:
+            if not event_types or isinstance(event, event_types):
+                callback(event)
+
+    async def start(self) -> None:
+        """
+        Connects the bus, events published before are only delivered to the own worker.
+        """
+
+    async def stop(self) -> None:
+        """
+        Disconnects the bus.
+        """
+
+    @abstractmethod
+    async def publish(self, events: list[Event]) -> None:
+        """
+        Publishes events to the subscribers of all workers.
+        """
+
+
+class InProcessEventBus(EventBus):
+    """
+    An `EventBus` that only reaches the subscribers of the own process, for tests and single worker deployments.
+    """
+
+    async def publish(self, events: list[Event]) -> None:
+        for event in events:
+            self._deliver(event)
+
+
+def encode_events(events: list[Event]) -> list[str]:
+    """
+    Encodes events to as few NOTIFY payloads as possible, each below `MAX_NOTIFY_PAYLOAD` bytes.
+
+    Args:
+        events (list[Event]): The events that should be encoded.
+
+    Returns:
+        The JSON payloads.
+    """
+    payloads: list[str] = []
+    encoded: list[str] = []
+    size: int = 2
+    for event in events:
+        entry: str = json.dumps({"type": _EVENT_NAMES[type(event)], "event": event.model_dump(mode="json")})
+        if encoded and size + len(entry) + 1 > MAX_NOTIFY_PAYLOAD:
+            payloads.append(f"[{','.join(encoded)}]")
+            encoded, size = [], 2
+        encoded.append(entry)
+        size += len(entry) + 1
+    if encoded:
+        payloads.append(f"[{','.join(encoded)}]")
+    return payloads
+
+
+def decode_events(payload: str) -> list[Event]:
+    """
+    Decodes the events of a NOTIFY payload created by `encode_events`.
+    """
+    entries: list[dict[str, Any]] = json.loads(payload)
+    return [_EVENT_TYPES[entry["type"]].model_validate(entry["event"]) for entry in entries]
+
+
+class PostgresEventBus(EventBus):
+    """
+    An `EventBus` using Postgres LISTEN / NOTIFY, so the events reach the subscribers of all workers.
+
+    Every worker listens on `channel` with its own asyncpg connection, which is also used to publish.
+    Events are delivered to the own worker directly, its own notifications are skipped.
+    If the connection is lost, events are only delivered to the own worker until it is reestablished with an
+    exponential backoff, then `EventBusReconnected` is delivered, as the events of other workers were missed.
+
+    Args:
+        dsn (str): The Postgres connection string (without a SQLAlchemy driver).
+        channel (str): The channel the events are sent on.
+        min_backoff (float): The seconds before the first reconnect, doubled for every failed attempt.
+        max_backoff (float): The maximum seconds between two reconnects.
+        health_check_interval (float): The seconds between two checks whether the idle connection is still alive.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        channel: str = "sensor_events",
+        min_backoff: float = 1,
+        max_backoff: float = 30,
+        health_check_interval: float = 10,
+    ) -> None:
+        super().__init__()
+        self._dsn: str = dsn
+        self._channel: str = channel
+        self._min_backoff: float = min_backoff
+        self._max_backoff: float = max_backoff
+        self._health_check_interval: float = health_check_interval
+        self._connection: asyncpg.Connection | None = None
+        self._server_pid: int | None = None
+        self._supervisor: asyncio.Task | None = None
+        # An asyncpg connection can only run one query at a time.
+        self._lock: asyncio.Lock = asyncio.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self._connection is not None and not self._connection.is_closed()
+
+    async def start(self) -> None:
+        await self._connect()
+        self._supervisor = asyncio.create_task(self._supervise())
+
+    async def stop(self) -> None:
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            self._supervisor = None
+        connection, self._connection = self._connection, None
+        if connection is not None:  # pragma: no cover: Real database access cannot be properly tested
+            await connection.close()
+
+    async def _connect(self) -> bool:  # pragma: no cover: Real database access cannot be properly tested
+        try:
+            connection: asyncpg.Connection = await asyncpg.connect(self._dsn)
+            await connection.add_listener(self._channel, self._on_notification)
+        except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as exception:
+            print(f"Could not listen for events, they are only sent to this worker: {exception}")
+            return False
+        self._connection = connection
+        self._server_pid = connection.get_server_pid()
+        return True
+
+    def _disconnect(self) -> None:
+        # The connection may be broken, so it is not closed gracefully.
+        connection, self._connection = self._connection, None
+        if connection is not None:  # pragma: no cover: Real database access cannot be properly tested
+            connection.terminate()
+
+    async def _is_alive(self) -> bool:  # pragma: no cover: Real database access cannot be properly tested
+        connection: asyncpg.Connection | None = self._connection
+        if connection is None:
+            return False
+        try:
+            async with self._lock:
+                await connection.execute("SELECT 1")
+            return True
+        except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError):
+            return False
+
+    async def _supervise(self) -> None:
+        """
+        Checks the connection regularly and reconnects with an exponential backoff once it is lost.
+        """
+        delay: float = self._min_backoff
+        while True:
+            if self.connected:
+                await asyncio.sleep(self._health_check_interval)
+                if not await self._is_alive():
+                    print("Lost the event bus connection, events are only sent to this worker")
+                    self._disconnect()
+                continue
+
+            print(f"Event bus not connected, events are only sent to this worker, reconnecting in {delay}s")
+            await asyncio.sleep(delay)
+            if await self._connect():
+                print("Event bus reconnected")
+                delay = self._min_backoff
+                self._deliver(EventBusReconnected())
+            else:
+                delay = min(delay * 2, self._max_backoff)
+
+    def _on_notification(self, _connection, pid: int, _channel: str, payload: str) -> None:
+        if pid == self._server_pid:
+            return
+        for event in decode_events(payload):
+            self._deliver(event)
+
+    async def publish(self, events: list[Event]) -> None:
+        for event in events:
+            self._deliver(event)
+        if not self.connected:
+            return
+
+        try:  # pragma: no cover: Real database access cannot be properly tested
+            async with self._lock:
+                for payload in encode_events(events):
+                    await self._connection.execute("SELECT pg_notify($1, $2)", self._channel, payload)
+        except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as exception:  # pragma: no cover
+            print(f"Could not publish events, they are only sent to this worker: {exception}")
+            # The supervisor reconnects.
+            self._disconnect()
+
+
+def create_event_bus(backend: EventBusBackend) -> EventBus:
+    """
+    Creates the `EventBus` of the given backend.
+    """
+    if backend is EventBusBackend.POSTGRES:
+        return PostgresEventBus(make_url(PSQL_URL).set(drivername="postgresql").render_as_string(hide_password=False))
+    return InProcessEventBus()
+
+
+_event_bus: EventBus = create_event_bus(EventBusBackend(WEBSOCKET_EVENT_BUS))
+
+
+def get_event_bus() -> EventBus:
+    return _event_bus
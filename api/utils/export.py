@@ -0,0 +1,284 @@
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Type
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from fastapi.responses import StreamingResponse
+from sqlalchemy import BigInteger, Boolean, DateTime, Integer, Select, cast
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.sql import func
+from sqlmodel import select
+
+from api.models.database_models import SensorData, SensorState
+from api.models.enum_models import ExportFormat
+from api.utils.database import get_session
+
+EXPORT_BATCH_SIZE: int = 1000
+# Larger batches for the columnar formats, as every batch becomes a record batch / row group.
+COLUMNAR_BATCH_SIZE: int = 50000
+# The amount of COPY output (about 50000 rows) that is parsed into Arrow at once on Postgres.
+COPY_BATCH_BYTES: int = 4 * 1024 * 1024
+
+MEDIA_TYPES: dict[ExportFormat, str] = {
+    ExportFormat.CSV: "text/csv",
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.ARROW: "application/vnd.apache.arrow.stream",
+    ExportFormat.PARQUET: "application/vnd.apache.parquet",
+}
+
+
+def export_query(
+    model: Type[SensorData | SensorState], sensor_id: int, start: datetime | None, end: datetime | None
+) -> Select:
+    """
+    Builds the query selecting the plain columns of the history of a sensor in the given time range, ordered by id.
+
+    Args:
+        model (Type[SensorData | SensorState]): The model whose rows should be exported.
+        sensor_id (int): The id of the sensor whose history should be exported.
+        start (datetime | None): If set, only rows at or after this time are exported.
+        end (datetime | None): If set, only rows before this time are exported.
+
+    Returns:
+        The query.
+    """
+    query: Select = select(*model.__table__.columns).where(model.sensor_id == sensor_id)
+    if start:
+        query = query.where(model.timestamp >= start)
+    if end:
+        query = query.where(model.timestamp < end)
+    return query.order_by(model.id)
+
+
+def _serialize(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _encode(export_format: ExportFormat, columns: list[str], rows: list) -> str:
+    """
+    Encodes a batch of rows as NDJSON lines or CSV records.
+    """
+    if export_format is ExportFormat.NDJSON:
+        return "".join(
+            json.dumps({column: _serialize(value) for column, value in zip(columns, row)}) + "\n" for row in rows
+        )
+
+    buffer: io.StringIO = io.StringIO()
+    csv.writer(buffer).writerows([_serialize(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+class _ChunkSink:
+    """
+    A writable file object for pyarrow, that keeps the written bytes until they are taken to be streamed.
+    """
+
+    closed: bool = False
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+        self._position: int = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        data: bytes = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def arrow_schema(model: Type[SensorData | SensorState]) -> pa.Schema:
+    """
+    Maps the columns of a model to an Arrow schema, timestamps are exported as UTC.
+    """
+    fields: list[pa.Field] = []
+    for column in model.__table__.columns:
+        if isinstance(column.type, DateTime):
+            arrow_type: pa.DataType = pa.timestamp("us", tz="UTC")
+        elif isinstance(column.type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        else:
+            arrow_type = pa.float64()
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+
+def _record_batch(schema: pa.Schema, rows: list) -> pa.RecordBatch:
+    """
+    Transposes a batch of rows into one Arrow array per column.
+    """
+    return pa.RecordBatch.from_arrays(
+        [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)], schema=schema
+    )
+
+
+async def _read_batches(engine: AsyncEngine, query: Select, batch_size: int) -> AsyncIterator[list]:
+    """
+    Reads the result of a query with a server side cursor and yields its rows batch by batch.
+    """
+    async for session in get_session(engine):
+        result = await session.stream(query.execution_options(yield_per=batch_size))
+        async for rows in result.partitions():
+            yield rows
+
+
+def copy_query(model: Type[SensorData | SensorState], query: Select) -> Select:
+    """
+    Selects the columns of an export query as COPY CSV, that Arrow can parse without any conversion in Python.
+
+    Timestamps are selected as microseconds since the epoch, so they do not depend on the timezone of the session.
+    """
+    columns: list = [
+        (
+            cast(func.extract("epoch", column) * 1000000, BigInteger).label(column.name)
+            if isinstance(column.type, DateTime)
+            else column
+        )
+        for column in model.__table__.columns
+    ]
+    return query.with_only_columns(*columns, maintain_column_froms=True)
+
+
+def parse_copy_csv(schema: pa.Schema, data: bytes) -> pa.Table:
+    """
+    Parses the COPY CSV output of a `copy_query` column by column into an Arrow table with the given schema.
+    """
+    column_types: dict[str, pa.DataType] = {
+        field.name: pa.int64() if pa.types.is_timestamp(field.type) else field.type for field in schema
+    }
+    table: pa.Table = pa_csv.read_csv(
+        io.BytesIO(data),
+        read_options=pa_csv.ReadOptions(column_names=schema.names),
+        convert_options=pa_csv.ConvertOptions(column_types=column_types, true_values=["t"], false_values=["f"]),
+    )
+    return table.cast(schema)
+
+
+async def _copy_batches(
+    engine: AsyncEngine, model: Type[SensorData | SensorState], query: Select, schema: pa.Schema
+) -> AsyncIterator[pa.Table]:  # pragma: no cover: Real database access cannot be properly tested
+    """
+    Streams the result of a query with asyncpg's COPY protocol and parses it into Arrow tables of complete lines.
+    """
+    async with engine.connect() as connection:
+        compiled = copy_query(model, query).compile(dialect=connection.dialect)
+        raw_connection = await connection.get_raw_connection()
+        # A small queue applies backpressure to the COPY if the client reads slower than the database sends.
+        chunks: asyncio.Queue[bytes | None] = asyncio.Queue(maxsize=16)
+
+        async def copy() -> None:
+            try:
+                await raw_connection.driver_connection.copy_from_query(
+                    str(compiled),
+                    *(compiled.params[name] for name in compiled.positiontup),
+                    output=chunks.put,
+                    format="csv",
+                )
+            finally:
+                await chunks.put(None)
+
+        task: asyncio.Task = asyncio.create_task(copy())
+        try:
+            buffer: bytes = b""
+            while (chunk := await chunks.get()) is not None:
+                buffer += chunk
+                if len(buffer) >= COPY_BATCH_BYTES:
+                    lines, buffer = buffer.rsplit(b"\n", 1)
+                    yield parse_copy_csv(schema, lines + b"\n")
+            await task
+            if buffer:
+                yield parse_copy_csv(schema, buffer)
+        finally:
+            task.cancel()
+
+
+async def stream_export(
+    engine: AsyncEngine,
+    model: Type[SensorData | SensorState],
+    sensor_id: int,
+    export_format: ExportFormat,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> AsyncIterator[str | bytes]:
+    """
+    Streams the history of a sensor as NDJSON, CSV (with header), Arrow IPC stream or Parquet file.
+
+    The rows are read with a server side cursor and every batch is encoded and yielded as soon as it arrives, so
+    memory usage is independent of the number of exported rows. On Postgres the columnar formats are read with COPY and
+    parsed by Arrow column by column, no Python object is created per row. Other databases transpose the plain rows.
+    Each batch becomes an Arrow record batch / Parquet row group.
+    The generator opens its own session, as request dependencies are already closed when a response is streamed.
+
+    Args:
+        engine (AsyncEngine): The database engine.
+        model (Type[SensorData | SensorState]): The model whose rows should be exported.
+        sensor_id (int): The id of the sensor whose history should be exported.
+        export_format (ExportFormat): The format of the export.
+        start (datetime | None): If set, only rows at or after this time are exported.
+        end (datetime | None): If set, only rows before this time are exported.
+
+    Yields:
+        The encoded rows batch by batch.
+    """
+    query: Select = export_query(model, sensor_id, start, end)
+    if export_format in (ExportFormat.CSV, ExportFormat.NDJSON):
+        columns: list[str] = [column.name for column in model.__table__.columns]
+        if export_format is ExportFormat.CSV:
+            yield _encode(export_format, columns, [columns])
+        async for rows in _read_batches(engine, query, EXPORT_BATCH_SIZE):
+            yield _encode(export_format, columns, rows)
+        return
+
+    schema: pa.Schema = arrow_schema(model)
+    sink: _ChunkSink = _ChunkSink()
+    writer = pa.ipc.new_stream(sink, schema) if export_format is ExportFormat.ARROW else pq.ParquetWriter(sink, schema)
+    if engine.dialect.driver == "asyncpg":  # pragma: no cover: Real database access cannot be properly tested
+        async for table in _copy_batches(engine, model, query, schema):
+            writer.write_table(table)
+            yield sink.take()
+    else:
+        async for rows in _read_batches(engine, query, COLUMNAR_BATCH_SIZE):
+            writer.write_batch(_record_batch(schema, rows))
+            yield sink.take()
+    writer.close()
+    yield sink.take()
+
+
+def export_response(
+    engine: AsyncEngine,
+    model: Type[SensorData | SensorState],
+    sensor_id: int,
+    export_format: ExportFormat,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> StreamingResponse:
+    """
+    Creates a `StreamingResponse` downloading the history of a sensor, see `stream_export`.
+    """
+    return StreamingResponse(
+        stream_export(engine, model, sensor_id, export_format, start, end),
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{model.__tablename__}_{sensor_id}.{export_format.value}"'
+        },
+    )
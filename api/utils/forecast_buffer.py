@@ -1,66 +1,45 @@
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 from api.models.forecast_models import Forecast
+from api.models.response_models import CacheStats
+from api.utils.ttl_cache import TTLCache
 
 
-class ForecastBufferObject:
+def get_forecast_size(forecast: Forecast) -> int:
     """
-    An object that is stored in the `ForecastBuffer` to indentify the data.
-
-    Args:
-        lat (str): The latitude of the forecast location.
-        lon (str): The longitude of the forecast location.
-        data: (Forecast): The `Forecast` model that is getting cached.
-        time_until_expired (timedelta) The time the data will expire.
+    Returns the approximate size of a `Forecast` in bytes (the size of its JSON representation).
     """
-
-    def __init__(self, lat: str, lon: str, data: Forecast, time_until_expired: timedelta) -> None:
-        self.lat: str = lat
-        self.lon: str = lon
-        self.data: Forecast = data
-        self.valid_until: datetime = datetime.utcnow() + time_until_expired
-
-    def __eq__(self, other) -> bool:
-        return isinstance(other, ForecastBufferObject) and self.latlon == other.latlon or self.latlon == other
-
-    @property
-    def latlon(self) -> str:
-        """
-        Returns the latitude and the longitude as a `;` seperated string.
-
-        Returns:
-            The combined string.
-        """
-        return self.lat + ";" + self.lon
-
-    @property
-    def is_expired(self) -> bool:
-        """
-        Indicates whether the object is expired.
-        """
-        return self.valid_until < datetime.utcnow()
+    return len(forecast.model_dump_json())
 
 
 class ForecastBuffer:
     """
-    A ring buffer, that holds different `Forecast`s and caches them for a given time.
+    A least recently used cache, that holds the `Forecast`s of different locations for a given time.
 
     Args:
-        size (int): The size of the ring buffer.
-        time_until_expired (timedelta): The time after which an object should be discarded.
+        size (int): The maximum number of cached locations.
+        time_until_expired (timedelta): The time after which a forecast should be discarded.
+        max_bytes (int | None): The maximum approximate size of all cached forecasts, not bounded if `None`.
     """
 
-    def __init__(self, size: int = 5, time_until_expired: timedelta = timedelta(minutes=5)) -> None:
+    def __init__(
+        self, size: int = 4096, time_until_expired: timedelta = timedelta(minutes=5), max_bytes: int | None = None
+    ) -> None:
         self.max_size: int = size
         self.time_until_expired: timedelta = time_until_expired
-        self.cache: list[ForecastBufferObject] = []
+        self._cache: TTLCache[tuple[str, str], Forecast] = TTLCache(
+            max_size=size,
+            ttl=time_until_expired,
+            max_weight=max_bytes,
+            weigher=get_forecast_size if max_bytes is not None else None,
+        )
 
     def __len__(self) -> int:
-        return len(self.cache)
+        return len(self._cache)
 
     def get(self, lat: str, lon: str) -> Forecast | None:
         """
-        Searches for a matching entry by the given lat and long values in the buffer and returns it if existing.
+        Returns the cached forecast of the given location if existing and not expired.
 
         Args:
             lat (str): The latitude of the forecast location that should be fetched.
@@ -69,23 +48,32 @@ class ForecastBuffer:
         Returns:
             A matching `Forecast` object if existing.
         """
-        for item in self.cache:
-            if item == lat + ";" + lon:
-                if item.is_expired:
-                    self.cache.remove(item)
-                else:
-                    return item.data
+        return self._cache.get((lat, lon))
 
     def add(self, lat: str, lon: str, data: Forecast) -> None:
         """
-        Adds a new `Forecast` object to the buffer.
+        Adds a new `Forecast` object to the buffer, the least recently used one is evicted if the buffer is full.
 
         Args:
             lat (str): The latitude of the forecast location that should be cached.
             lon (str): The longitude of the forecast location that should be cached.
             data: (Forecast): The data that should be cached.
         """
-        if len(self) >= self.max_size:
-            self.cache.pop(0)
-        new_object: ForecastBufferObject = ForecastBufferObject(lat, lon, data, self.time_until_expired)
-        self.cache.append(new_object)
+        self._cache.set((lat, lon), data)
+
+    def clear(self) -> None:
+        """
+        Removes all forecasts from the buffer.
+        """
+        self._cache.clear()
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._cache.stats
+
+
+_forecast_buffer = ForecastBuffer()
+
+
+def get_forecast_buffer() -> ForecastBuffer:
+    return _forecast_buffer
@@ -45,3 +45,32 @@ USER_ALREADY_EXISTS = HTTPException(
 INVALID_SENSOR_TYPE = HTTPException(
     status_code=status.HTTP_400_BAD_REQUEST, detail="This sensor is of an unsupported type for this operation."
 )
+
+INVALID_IMPORT_DATA = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST, detail="The import file contains invalid or malformed rows."
+)
+
+INVALID_BUCKET = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Invalid bucket, use a number followed by a unit (s, m, h, d, w or mo), e.g. 5m, 1h, 1d or 1mo.",
+)
+
+TOO_MANY_BUCKETS = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST, detail="The requested time range contains too many buckets."
+)
+
+INVALID_CURSOR = HTTPException(
+    status_code=status.HTTP_400_BAD_REQUEST,
+    detail="Invalid pagination, use either a cursor, before_id or after_id.",
+)
+
+NOT_AUTHENTICATED = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Not authenticated",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+DEVICE_KEY_NOT_EXISTING = HTTPException(
+    status.HTTP_404_NOT_FOUND,
+    "This device key does not exist.",
+)
@@ -0,0 +1,158 @@
+import asyncio
+from datetime import timedelta
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from api.models.database_models import SensorData, SensorState
+from api.models.response_models import IngestBufferStats
+from api.utils.database import get_engine, get_session
+from api.utils.rollups import update_rollups
+from api.utils.websocket_connection_handler import get_websocket_handler
+
+try:
+    from SECRETS import INGEST_BUFFER_MAX_DELAY_MS, INGEST_BUFFER_MAX_ROWS
+except ImportError:  # pragma: no cover: Older SECRETS files do not contain the settings
+    INGEST_BUFFER_MAX_ROWS: int = 200
+    INGEST_BUFFER_MAX_DELAY_MS: int = 50
+
+
+class IngestBuffer:
+    """
+    A write-behind buffer, that collects new `SensorData` and `SensorState` rows and writes them in one transaction.
+
+    A flush is triggered as soon as `max_rows` rows are pending or `max_delay` has passed since the first pending row,
+    whichever comes first. This way a burst of writes only pays for a single commit.
+
+    A failed flush is retried `max_retries` times with an exponential backoff starting at `retry_delay`.
+    Rows that could not be written after that are counted as lost in the `stats`.
+
+    Args:
+        max_rows (int): The number of pending rows that triggers a flush.
+        max_delay (timedelta): The maximum time a row is kept before it is flushed.
+        max_retries (int): How often a failed flush is retried.
+        retry_delay (timedelta): The time before the first retry, doubled for every further one.
+    """
+
+    def __init__(
+        self,
+        max_rows: int = 200,
+        max_delay: timedelta = timedelta(milliseconds=50),
+        max_retries: int = 3,
+        retry_delay: timedelta = timedelta(milliseconds=100),
+    ) -> None:
+        self.max_rows: int = max_rows
+        self.max_delay: timedelta = max_delay
+        self.max_retries: int = max_retries
+        self.retry_delay: timedelta = retry_delay
+        self._pending: list[tuple[SensorData | SensorState, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._flushes: set[asyncio.Task] = set()
+        self._written_rows: int = 0
+        self._retries: int = 0
+        self._lost_rows: int = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, data: SensorData | SensorState) -> asyncio.Future:
+        """
+        Adds a new row to the buffer.
+
+        Args:
+            data (SensorData | SensorState): The row that should be written.
+
+        Returns:
+            A future, that resolves to the written row once it is committed.
+        """
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        self._pending.append((data, future))
+        if len(self._pending) >= self.max_rows:
+            self._schedule_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay.total_seconds(), self._schedule_flush)
+        return future
+
+    def _schedule_flush(self) -> None:
+        """
+        Hands all pending rows over to a new flush task.
+        """
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        task: asyncio.Task = asyncio.get_running_loop().create_task(self._flush(pending))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _write(self, rows: list[SensorData | SensorState]) -> None:
+        """
+        Writes the given rows in a single transaction, the transaction is retried if it fails.
+        """
+        delay: float = self.retry_delay.total_seconds()
+        for attempt in range(self.max_retries + 1):
+            try:
+                engine: AsyncEngine = await get_engine()
+                async for session in get_session(engine):
+                    session.add_all(rows)
+                    await update_rollups(session, [row.model_dump() for row in rows if isinstance(row, SensorData)])
+                    await session.commit()
+                return
+            except Exception as exception:
+                if attempt == self.max_retries:
+                    raise
+                print(f"Could not write {len(rows)} buffered rows, retrying in {delay}s: {exception}")
+                self._retries += 1
+                await asyncio.sleep(delay)
+                delay *= 2
+
+    async def _flush(self, pending: list[tuple[SensorData | SensorState, asyncio.Future]]) -> None:
+        """
+        Writes the given rows and resolves their futures.
+        """
+        rows: list[SensorData | SensorState] = [data for data, _ in pending]
+        try:
+            await self._write(rows)
+        except Exception as exception:
+            print(f"Could not write {len(rows)} buffered rows, they are lost: {exception}")
+            self._lost_rows += len(rows)
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(exception)
+                    # Nobody awaits the rows of requests answered with 202, so mark the exception as retrieved.
+                    future.exception()
+            return
+
+        self._written_rows += len(rows)
+        for data, future in pending:
+            if not future.done():
+                future.set_result(data)
+        await get_websocket_handler().add_events(rows)
+
+    async def flush(self) -> None:
+        """
+        Flushes all pending rows immediately and waits until every running flush is finished.
+        """
+        self._schedule_flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes)
+
+    @property
+    def stats(self) -> IngestBufferStats:
+        return IngestBufferStats(
+            pending=len(self._pending),
+            written_rows=self._written_rows,
+            retries=self._retries,
+            lost_rows=self._lost_rows,
+        )
+
+
+_ingest_buffer = IngestBuffer(
+    max_rows=INGEST_BUFFER_MAX_ROWS, max_delay=timedelta(milliseconds=INGEST_BUFFER_MAX_DELAY_MS)
+)
+
+
+def get_ingest_buffer() -> IngestBuffer:
+    return _ingest_buffer
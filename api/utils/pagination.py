@@ -0,0 +1,96 @@
+import base64
+import binascii
+from typing import Type
+
+from fastapi import Response
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio.session import AsyncSession
+
+from api.models.database_models import SensorData, SensorState
+from api.utils.http_exceptions import INVALID_CURSOR
+
+NEXT_CURSOR_HEADER: str = "X-Next-Cursor"
+
+_BEFORE: str = "b"
+_AFTER: str = "a"
+
+
+def encode_cursor(direction: str, last_id: int) -> str:
+    """
+    Encodes the position of a page boundary as an opaque cursor.
+    """
+    return base64.urlsafe_b64encode(f"{direction}:{last_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    """
+    Decodes a cursor created by `encode_cursor`.
+
+    Raises:
+        HTTPException - The cursor is malformed.
+
+    Returns:
+        The direction and the id of the page boundary.
+    """
+    try:
+        direction, last_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        if direction not in (_BEFORE, _AFTER):
+            raise ValueError
+        return direction, int(last_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise INVALID_CURSOR
+
+
+async def paginate(
+    session: AsyncSession,
+    query: Select,
+    model: Type[SensorData | SensorState],
+    response: Response,
+    amount: int,
+    before_id: int | None = None,
+    after_id: int | None = None,
+    cursor: str | None = None,
+) -> list[SensorData | SensorState]:
+    """
+    Returns a page of the rows matched by `query` using keyset pagination on the id.
+
+    Every page is a single range scan on the `(sensor_id, id)` index, so deep pages are as fast as the first one.
+    Without `before_id`, `after_id` or `cursor` the newest rows are returned. If the page is full, a cursor for the
+    next page in the same direction is set as `X-Next-Cursor` header.
+
+    Args:
+        session (AsyncSession): A database session.
+        query (Select): The query selecting the rows of a sensor, without ordering or limit.
+        model (Type[SensorData | SensorState]): The model the query selects.
+        response (Response): The response of the current request.
+        amount (int): The maximum number of rows of a page.
+        before_id (int | None): If set, the rows directly before this id are returned.
+        after_id (int | None): If set, the rows directly after this id are returned.
+        cursor (str | None): A cursor returned by a previous page.
+
+    Raises:
+        HTTPException - More than one of `before_id`, `after_id` and `cursor` is set or the cursor is malformed.
+
+    Returns:
+        The rows of the page, ordered by id.
+    """
+    if sum(value is not None for value in (before_id, after_id, cursor)) > 1:
+        raise INVALID_CURSOR
+    if cursor is not None:
+        direction, last_id = decode_cursor(cursor)
+        before_id, after_id = (last_id, None) if direction == _BEFORE else (None, last_id)
+
+    if after_id is not None:
+        result = await session.execute(query.where(model.id > after_id).order_by(model.id).limit(amount))
+        rows = list(result.scalars().all())
+    else:
+        if before_id is not None:
+            query = query.where(model.id < before_id)
+        result = await session.execute(query.order_by(model.id.desc()).limit(amount))
+        rows = list(result.scalars().all())[::-1]
+
+    if rows and len(rows) == amount:
+        response.headers[NEXT_CURSOR_HEADER] = (
+            encode_cursor(_AFTER, rows[-1].id) if after_id is not None else encode_cursor(_BEFORE, rows[0].id)
+        )
+    return rows
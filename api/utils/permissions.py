@@ -1,10 +1,15 @@
+from datetime import timedelta
 from enum import Enum
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
 from api.models.database_models import DBUser, SensorPermission
+from api.models.event_models import EventBusReconnected, PermissionChanged
+from api.models.response_models import CacheStats
+from api.utils.event_bus import EventBus, get_event_bus
 from api.utils.http_exceptions import MISSING_PRIVILEGES
+from api.utils.ttl_cache import TTLCache
 
 
 class PermissionType(Enum):
@@ -16,12 +21,118 @@ class PermissionType(Enum):
     READ = 1
 
 
+class PermissionIndex:
+    """
+    An in-process ACL index, that maps (user_id, sensor_id) to a bitmask of the granted `PermissionType`s.
+
+    The permissions of a user are loaded with a single query on the first check and then answered from memory.
+    Changes made through the permissions router are published as `PermissionChanged` on the `EventBus` and applied
+    by the index of every worker. If the bus reconnects, changes may have been missed, so all entries are dropped.
+    The TTL only bounds the staleness of changes made directly in the database.
+
+    Args:
+        max_users (int): The maximum number of users whose permissions are kept.
+        ttl (timedelta): The time after which the permissions of a user are reloaded.
+        event_bus (EventBus | None): The bus permission changes are received on.
+    """
+
+    def __init__(
+        self, max_users: int = 1024, ttl: timedelta = timedelta(seconds=30), event_bus: EventBus | None = None
+    ) -> None:
+        self._users: TTLCache[int, dict[int, int]] = TTLCache(max_size=max_users, ttl=ttl)
+        if event_bus is not None:
+            event_bus.subscribe(self.apply, PermissionChanged)
+            event_bus.subscribe(lambda _: self.clear(), EventBusReconnected)
+
+    @staticmethod
+    def to_mask(read: bool, write: bool) -> int:
+        """
+        Converts read / write flags to a permission bitmask.
+        """
+        return (1 << PermissionType.READ.value if read else 0) | (1 << PermissionType.WRITE.value if write else 0)
+
+    async def get_permissions(self, session: AsyncSession, user_id: int) -> dict[int, int]:
+        """
+        Returns the permission bitmasks of a user by sensor id, loading them if they are not cached.
+
+        Args:
+            session (AsyncSession): A database session.
+            user_id (int): The id of the user.
+
+        Returns:
+            The bitmasks of all sensors the user has a `SensorPermission` for.
+        """
+        permissions: dict[int, int] | None = self._users.get(user_id)
+        if permissions is None:
+            result = await session.execute(
+                select(SensorPermission.sensor_id, SensorPermission.read, SensorPermission.write).where(
+                    SensorPermission.user_id == user_id
+                )
+            )
+            permissions = {sensor_id: self.to_mask(read, write) for sensor_id, read, write in result}
+            self._users.set(user_id, permissions)
+        return permissions
+
+    async def has_permission(
+        self, session: AsyncSession, user_id: int, sensor_id: int, permission: PermissionType
+    ) -> bool:
+        """
+        Checks whether a user has the given permission for a sensor.
+        """
+        permissions: dict[int, int] = await self.get_permissions(session, user_id)
+        return bool(permissions.get(sensor_id, 0) & 1 << permission.value)
+
+    def update(self, user_id: int, sensor_id: int, read: bool, write: bool) -> None:
+        """
+        Applies a created / updated `SensorPermission` to the index.
+        """
+        permissions: dict[int, int] | None = self._users.get(user_id)
+        if permissions is not None:
+            permissions[sensor_id] = self.to_mask(read, write)
+
+    def remove(self, user_id: int, sensor_id: int) -> None:
+        """
+        Applies a deleted `SensorPermission` to the index.
+        """
+        permissions: dict[int, int] | None = self._users.get(user_id)
+        if permissions is not None:
+            permissions.pop(sensor_id, None)
+
+    def apply(self, change: PermissionChanged) -> None:
+        """
+        Applies a `PermissionChanged` received on the `EventBus` to the index.
+        """
+        if change.deleted:
+            self.remove(change.user_id, change.sensor_id)
+        else:
+            self.update(change.user_id, change.sensor_id, change.read, change.write)
+
+    def clear(self) -> None:
+        """
+        Drops all loaded permissions, they are reloaded on the next check.
+        """
+        self._users.clear()
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._users.stats
+
+
+_permission_index = PermissionIndex(event_bus=get_event_bus())
+
+
+def get_permission_index() -> PermissionIndex:
+    return _permission_index
+
+
 async def get_user_with_permission(
     session: AsyncSession, user: DBUser, sensor_id: int, permission: PermissionType
 ) -> bool:
     """
     Check whether a user has the given permissions for a specific sensor.
 
+    The check is answered by the `PermissionIndex`, so the database is only queried once per user and TTL.
+
     Args:
         session (AsyncSession): A database session.
         user (DBUser): The user that is currently logged in.
@@ -36,25 +147,7 @@ async def get_user_with_permission(
     """
     if user.superuser:
         return True
-    # ToDo Cleaner way to do this?
-    if permission == PermissionType.READ:
-        result = await session.execute(
-            select(SensorPermission).where(
-                SensorPermission.user_id == user.id,
-                SensorPermission.sensor_id == sensor_id,
-                SensorPermission.read == True,
-            )
-        )
-    else:
-        result = await session.execute(
-            select(SensorPermission).where(
-                SensorPermission.user_id == user.id,
-                SensorPermission.sensor_id == sensor_id,
-                SensorPermission.write == True,
-            )
-        )
-    sensor_permission: SensorPermission | None = result.scalars().first()
-    if not sensor_permission:
+    if not await _permission_index.has_permission(session, user.id, sensor_id, permission):
         raise MISSING_PRIVILEGES
     return True
 
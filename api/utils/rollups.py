@@ -0,0 +1,148 @@
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, Type
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio.session import AsyncSession
+from sqlalchemy.sql import func
+
+from api.models.database_models import (
+    SensorDataDaily,
+    SensorDataHourly,
+    SensorDataMonthly,
+    SensorDataRollupBase,
+    to_utc,
+)
+from api.utils.sql_functions import greatest, least
+
+VALUES: tuple[str, ...] = ("temperature", "humidity", "pressure")
+
+# A rollup row has 16 columns, asyncpg accepts at most 32767 bind parameters per statement.
+UPSERT_BATCH_SIZE: int = 2000
+
+
+def hour_start(timestamp: datetime) -> datetime:
+    """
+    Returns the start of the (UTC) hour of a timestamp.
+    """
+    return to_utc(timestamp).replace(minute=0, second=0, microsecond=0)
+
+
+def day_start(timestamp: datetime) -> datetime:
+    """
+    Returns the start of the (UTC) day of a timestamp.
+    """
+    return to_utc(timestamp).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def month_start(timestamp: datetime) -> datetime:
+    """
+    Returns the start of the (UTC) calendar month of a timestamp.
+    """
+    return to_utc(timestamp).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+class RollupTier:
+    """
+    A tier of pre-aggregated `SensorData`, e.g. all data per hour.
+
+    Args:
+        model (Type[SensorDataRollupBase]): The table holding the tier.
+        period (timedelta | None): The length of a period, `None` for calendar months.
+        period_start (Callable[[datetime], datetime]): Returns the start of the period containing a timestamp.
+    """
+
+    def __init__(
+        self,
+        model: Type[SensorDataRollupBase],
+        period: timedelta | None,
+        period_start: Callable[[datetime], datetime],
+    ) -> None:
+        self.model: Type[SensorDataRollupBase] = model
+        self.period: timedelta | None = period
+        self.period_start: Callable[[datetime], datetime] = period_start
+
+
+HOURLY: RollupTier = RollupTier(SensorDataHourly, timedelta(hours=1), hour_start)
+DAILY: RollupTier = RollupTier(SensorDataDaily, timedelta(days=1), day_start)
+MONTHLY: RollupTier = RollupTier(SensorDataMonthly, None, month_start)
+
+# Ordered from the finest to the coarsest tier.
+TIERS: tuple[RollupTier, ...] = (HOURLY, DAILY, MONTHLY)
+
+
+def aggregate_rows(rows: Iterable[dict], period_start: Callable[[datetime], datetime]) -> list[dict]:
+    """
+    Aggregates `SensorData` rows per sensor and period, so they can be merged into a rollup table.
+
+    Args:
+        rows (Iterable[dict]): The new `SensorData` rows as dicts.
+        period_start (Callable[[datetime], datetime]): Returns the start of the period containing a timestamp.
+
+    Returns:
+        The aggregated rows with the columns of the rollup tables, sorted by sensor and period.
+    """
+    periods: dict[tuple[int, datetime], dict] = {}
+    for row in rows:
+        key: tuple[int, datetime] = (row["sensor_id"], period_start(row["timestamp"]))
+        period: dict | None = periods.get(key)
+        if period is None:
+            period = periods[key] = {"sensor_id": key[0], "period_start": key[1], "count": 0, "voltage_count": 0}
+            for name in (*VALUES, "voltage"):
+                period[f"{name}_min"] = period[f"{name}_max"] = period[f"{name}_sum"] = None
+
+        period["count"] += 1
+        if row["voltage"] is not None:
+            period["voltage_count"] += 1
+        for name in (*VALUES, "voltage"):
+            value: float | None = row[name]
+            if value is None:
+                continue
+            period[f"{name}_min"] = value if period[f"{name}_min"] is None else min(period[f"{name}_min"], value)
+            period[f"{name}_max"] = value if period[f"{name}_max"] is None else max(period[f"{name}_max"], value)
+            period[f"{name}_sum"] = (period[f"{name}_sum"] or 0.0) + value
+    # Concurrent upserts lock the rows in the same order, so they cannot deadlock each other.
+    return [periods[key] for key in sorted(periods)]
+
+
+async def update_rollups(session: AsyncSession, rows: Iterable[dict]) -> None:
+    """
+    Merges new `SensorData` rows into every rollup tier within the current transaction.
+
+    Only the periods touched by the new rows are updated, the raw history is never read.
+    The periods are upserted in batches of `UPSERT_BATCH_SIZE`, so large imports stay below the bind parameter limit.
+
+    Args:
+        session (AsyncSession): A database session.
+        rows (Iterable[dict]): The new `SensorData` rows as dicts.
+    """
+    rows = list(rows)
+    if not rows:
+        return
+
+    dialect = postgresql if session.get_bind().dialect.name == "postgresql" else sqlite
+    for tier in TIERS:
+        periods: list[dict] = aggregate_rows(rows, tier.period_start)
+        for index in range(0, len(periods), UPSERT_BATCH_SIZE):
+            await _upsert_periods(session, dialect, tier, periods[index : index + UPSERT_BATCH_SIZE])
+
+
+async def _upsert_periods(session: AsyncSession, dialect, tier: RollupTier, periods: list[dict]) -> None:
+    statement = dialect.insert(tier.model).values(periods)
+    table, excluded = tier.model.__table__.c, statement.excluded
+    merged_columns: dict = {
+        "count": table.count + excluded.count,
+        "voltage_count": table.voltage_count + excluded.voltage_count,
+    }
+    for name in (*VALUES, "voltage"):
+        # `coalesce` keeps the existing value if one side is NULL (only possible for the voltage).
+        for column, merge in ((f"{name}_min", least), (f"{name}_max", greatest)):
+            merged_columns[column] = merge(
+                func.coalesce(table[column], excluded[column]), func.coalesce(excluded[column], table[column])
+            )
+        merged_columns[f"{name}_sum"] = func.coalesce(table[f"{name}_sum"], 0.0) + func.coalesce(
+            excluded[f"{name}_sum"], 0.0
+        )
+
+    await session.execute(
+        statement.on_conflict_do_update(index_elements=[table.sensor_id, table.period_start], set_=merged_columns)
+    )
@@ -1,3 +1,5 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Annotated
 
@@ -11,8 +13,14 @@ from sqlmodel import select
 from api.models.database_models import DBUser
 from api.utils.database import get_session
 from api.utils.http_exceptions import INVALID_CREDENTIALS, MISSING_PRIVILEGES
+from api.utils.ttl_cache import TTLCache
 from SECRETS import SECRET_KEY
 
+try:
+    from SECRETS import PASSWORD_HASHING_WORKERS
+except ImportError:  # pragma: no cover: Older SECRETS files do not contain the setting
+    PASSWORD_HASHING_WORKERS: int = 2
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -43,6 +51,28 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+# bcrypt is slow on purpose, so it runs in a bounded thread pool instead of blocking the event loop.
+_password_executor: ThreadPoolExecutor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASHING_WORKERS, thread_name_prefix="password-hashing"
+)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verifies whether a password is correct without blocking the event loop, see `verify_password`.
+    """
+    return await asyncio.get_running_loop().run_in_executor(
+        _password_executor, verify_password, plain_password, hashed_password
+    )
+
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    Returns the hash of a given password without blocking the event loop, see `get_password_hash`.
+    """
+    return await asyncio.get_running_loop().run_in_executor(_password_executor, get_password_hash, password)
+
+
 async def get_user(username: str, session: AsyncSession) -> DBUser | None:
     """
     Fetches the user associated to the username from the database.
@@ -73,7 +103,7 @@ async def authenticate_user(
     user: DBUser | None = await get_user(form_data.username, session)
     if not user:
         return None
-    if not verify_password(form_data.password, user.hashed_password):
+    if not await verify_password_async(form_data.password, user.hashed_password):
         return None
     return user
 
@@ -89,18 +119,58 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     return encoded_jwt
 
 
+_user_cache: TTLCache[tuple[str, int], DBUser] = TTLCache(max_size=1024, ttl=timedelta(minutes=1))
+
+
+def get_user_cache() -> TTLCache[tuple[str, int], DBUser]:
+    return _user_cache
+
+
+def invalidate_cached_user(username: str) -> None:
+    """
+    Removes all cached entries of a user, e.g. after the user was changed.
+
+    Args:
+        username (str): The username of the user.
+    """
+    _user_cache.invalidate(lambda key: key[0] == username)
+
+
+async def get_user_from_token(token: str, session: AsyncSession) -> DBUser | None:
+    """
+    Validates a token and returns the user it was issued for.
+
+    Users are cached by username and token expiry, so repeated requests with the same token skip the database.
+
+    Args:
+        token (str): The JWT of the request.
+        session (AsyncSession): A database session.
+
+    Returns:
+        The user if the token is valid and the user exists.
+    """
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+    except JWTError:
+        return None
+    username: str | None = payload.get("sub")
+    if username is None:
+        return None
+
+    key: tuple[str, int] = (username, payload.get("exp"))
+    user: DBUser | None = _user_cache.get(key)
+    if user is None:
+        user = await get_user(username, session)
+        if user is not None:
+            _user_cache.set(key, user)
+    return user
+
+
 async def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)], session: Annotated[AsyncSession, Depends(get_session)]
 ) -> DBUser:
     # ToDo Handle expired token somehow
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-        username: str = payload.get("sub")
-        if username is None:
-            raise INVALID_CREDENTIALS
-    except JWTError:
-        raise INVALID_CREDENTIALS
-    user = await get_user(username, session)
+    user = await get_user_from_token(token, session)
     if user is None:
         raise INVALID_CREDENTIALS
     return user
@@ -116,14 +186,7 @@ async def get_current_user_ws(
         raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
 
     token = authorization.split(" ")[1]
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-        username: str = payload.get("sub")
-        if username is None:
-            raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
-    except JWTError:
-        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
-    user = await get_user(username, session)
+    user = await get_user_from_token(token, session)
     if user is None:
         raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
     return user
@@ -1,11 +1,84 @@
+from datetime import timedelta
+
 from sqlalchemy.ext.asyncio.session import AsyncSession
+from sqlmodel import select
 
 from api.models.database_models import Sensor, SensorTypeModel
+from api.models.response_models import CacheStats
 from api.utils.http_exceptions import INVALID_SENSOR_TYPE, NO_SENSOR_WITH_THIS_ID
+from api.utils.ttl_cache import TTLCache
+
+
+class SensorRegistry:
+    """
+    A process wide cache of all `Sensor`s, as sensors are read by every request but almost never change.
+
+    The registry is warmed at startup and updated when a sensor is created. Sensors that are not known
+    (e.g. created by another worker) are loaded from the database on the first access.
+
+    Args:
+        max_size (int): The maximum number of cached sensors.
+        ttl (timedelta): The time after which a sensor is reloaded from the database.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: timedelta = timedelta(days=1)) -> None:
+        self._sensors: TTLCache[int, Sensor] = TTLCache(max_size=max_size, ttl=ttl)
+
+    async def load(self, session: AsyncSession) -> None:
+        """
+        Loads all sensors from the database.
+
+        Args:
+            session (AsyncSession): A database session.
+        """
+        result = await session.execute(select(Sensor))
+        for sensor in result.scalars().all():
+            self.add(sensor)
+
+    def add(self, sensor: Sensor) -> None:
+        """
+        Adds a new or changed sensor to the registry.
+        """
+        self._sensors.set(sensor.id, sensor)
+
+    async def get(self, session: AsyncSession, sensor_id: int) -> Sensor | None:
+        """
+        Returns the sensor with the given id, the database is only queried if the sensor is not cached.
+
+        Args:
+            session (AsyncSession): A database session.
+            sensor_id (int): The id of the sensor.
+
+        Returns:
+            The sensor if existing.
+        """
+        sensor: Sensor | None = self._sensors.get(sensor_id)
+        if sensor is None:
+            sensor = await session.get(Sensor, sensor_id)
+            if sensor is not None:
+                self.add(sensor)
+        return sensor
+
+    def clear(self) -> None:
+        """
+        Removes all sensors from the registry.
+        """
+        self._sensors.clear()
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._sensors.stats
+
+
+_sensor_registry = SensorRegistry()
+
+
+def get_sensor_registry() -> SensorRegistry:
+    return _sensor_registry
 
 
 async def get_sensor_from_db(session: AsyncSession, sensor_id: int) -> Sensor:
-    sensor: Sensor | None = await session.get(Sensor, sensor_id)
+    sensor: Sensor | None = await _sensor_registry.get(session, sensor_id)
     if not sensor:
         raise NO_SENSOR_WITH_THIS_ID
     return sensor
@@ -0,0 +1,45 @@
+import asyncio
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class SingleFlight(Generic[K, V]):
+    """
+    Coalesces concurrent calls for the same key, so only the first one does the work and all others await its result.
+
+    The call runs in its own task, so it is not cancelled when a caller is (e.g. the client disconnected).
+    Once it finished, the next call for the key does the work again.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[K, asyncio.Task[V]] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: K, function: Callable[[], Awaitable[V]]) -> V:
+        """
+        Awaits the call in flight for the key or starts a new one.
+
+        Args:
+            key (K): Identifies calls that have the same result.
+            function (Callable[[], Awaitable[V]]): Does the work if no call is in flight for the key.
+
+        Raises:
+            Exception - The exception raised by the call, it is raised for all callers.
+
+        Returns:
+            The result of the call.
+        """
+        task: asyncio.Task[V] | None = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(function())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._forget(key, task))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: K, task: asyncio.Task[V]) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
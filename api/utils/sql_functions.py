@@ -0,0 +1,63 @@
+from sqlalchemy import BigInteger
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+class epoch(FunctionElement):
+    """
+    The whole seconds since the unix epoch of a timestamp.
+
+    PostgreSQL and SQLite (used by the tests) have no common function for this, so it is compiled per dialect.
+    """
+
+    type = BigInteger()
+    name = "epoch"
+    inherit_cache = True
+
+
+@compiles(epoch)
+def _compile_epoch(element: epoch, compiler, **kwargs) -> str:  # pragma: no cover: Only used with PostgreSQL
+    return f"CAST(FLOOR(EXTRACT(EPOCH FROM {compiler.process(element.clauses, **kwargs)})) AS BIGINT)"
+
+
+@compiles(epoch, "sqlite")
+def _compile_epoch_sqlite(element: epoch, compiler, **kwargs) -> str:
+    return f"CAST(strftime('%s', {compiler.process(element.clauses, **kwargs)}) AS INTEGER)"
+
+
+class least(FunctionElement):
+    """
+    The smallest of the given values, `MIN` is used as scalar function on SQLite.
+    """
+
+    name = "least"
+    inherit_cache = True
+
+
+class greatest(FunctionElement):
+    """
+    The largest of the given values, `MAX` is used as scalar function on SQLite.
+    """
+
+    name = "greatest"
+    inherit_cache = True
+
+
+@compiles(least)
+def _compile_least(element: least, compiler, **kwargs) -> str:  # pragma: no cover: Only used with PostgreSQL
+    return f"LEAST({compiler.process(element.clauses, **kwargs)})"
+
+
+@compiles(least, "sqlite")
+def _compile_least_sqlite(element: least, compiler, **kwargs) -> str:
+    return f"MIN({compiler.process(element.clauses, **kwargs)})"
+
+
+@compiles(greatest)
+def _compile_greatest(element: greatest, compiler, **kwargs) -> str:  # pragma: no cover: Only used with PostgreSQL
+    return f"GREATEST({compiler.process(element.clauses, **kwargs)})"
+
+
+@compiles(greatest, "sqlite")
+def _compile_greatest_sqlite(element: greatest, compiler, **kwargs) -> str:
+    return f"MAX({compiler.process(element.clauses, **kwargs)})"
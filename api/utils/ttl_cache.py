@@ -0,0 +1,120 @@
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Callable, Generic, Hashable, TypeVar
+
+from api.models.response_models import CacheStats
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    A least recently used cache, whose entries additionally expire after a given time.
+
+    The cache can additionally be bounded by the summed weight (e.g. the approximate size in bytes) of its entries.
+
+    Args:
+        max_size (int): The maximum number of entries, the least recently used entry is evicted first.
+        ttl (timedelta): The time after which an entry expires.
+        max_weight (int | None): The maximum summed weight of all entries, not bounded if `None`.
+        weigher (Callable[[V], int] | None): Returns the weight of a value, needed if `max_weight` is set.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: timedelta = timedelta(minutes=5),
+        max_weight: int | None = None,
+        weigher: Callable[[V], int] | None = None,
+    ) -> None:
+        if max_weight is not None and weigher is None:
+            raise ValueError("A weigher is needed to bound the cache by weight.")
+        self.max_size: int = max_size
+        self.ttl: timedelta = ttl
+        self.max_weight: int | None = max_weight
+        self._weigher: Callable[[V], int] | None = weigher
+        # The expiry time, the value and the weight of each entry.
+        self._entries: OrderedDict[K, tuple[float, V, int]] = OrderedDict()
+        self.weight: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> V | None:
+        """
+        Returns the cached value for a key if existing and not expired.
+
+        Args:
+            key (K): The key of the entry.
+
+        Returns:
+            The cached value or `None`.
+        """
+        entry: tuple[float, V, int] | None = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: K, value: V) -> None:
+        """
+        Adds or replaces an entry and evicts the least recently used entry if the cache is full.
+
+        Args:
+            key (K): The key of the entry.
+            value (V): The value that should be cached.
+        """
+        if key in self._entries:
+            self._remove(key)
+        weight: int = self._weigher(value) if self._weigher is not None else 0
+        self._entries[key] = (time.monotonic() + self.ttl.total_seconds(), value, weight)
+        self.weight += weight
+        while self._entries and (
+            len(self._entries) > self.max_size or (self.max_weight is not None and self.weight > self.max_weight)
+        ):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: K) -> None:
+        self.weight -= self._entries.pop(key)[2]
+
+    def invalidate(self, predicate: Callable[[K], bool]) -> None:
+        """
+        Removes all entries whose key matches the given predicate.
+
+        Args:
+            predicate (Callable[[K], bool]): Returns whether an entry should be removed.
+        """
+        for key in [key for key in self._entries if predicate(key)]:
+            self._remove(key)
+
+    def clear(self) -> None:
+        """
+        Removes all entries.
+        """
+        self._entries.clear()
+        self.weight = 0
+
+    @property
+    def stats(self) -> CacheStats:
+        """
+        Returns the size and the hit / miss / eviction counters of the cache.
+        """
+        return CacheStats(
+            size=len(self),
+            max_size=self.max_size,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            weight=self.weight if self.max_weight is not None else None,
+            max_weight=self.max_weight,
+        )
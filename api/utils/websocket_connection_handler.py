@@ -1,52 +1,478 @@
 import asyncio
+import secrets
+import time
+from collections import OrderedDict, deque
 
-from fastapi import HTTPException, WebSocket
-from sqlalchemy.ext.asyncio import AsyncEngine
+from fastapi import WebSocket, status
+from sqlalchemy.ext.asyncio.session import AsyncSession
 
 from api.models.database_models import DBUser, SensorData, SensorState
-from api.utils.database import get_engine, get_session
-from api.utils.permissions import get_user_read_permissions
+from api.models.enum_models import SensorTypeModel, WebsocketAction, WebsocketOverflowPolicy
+from api.models.event_models import EventBusReconnected, PermissionChanged
+from api.models.websocket_models import WebsocketSubscription, WebsocketSubscriptionState
+from api.utils.event_bus import EventBus, InProcessEventBus, get_event_bus
+from api.utils.permissions import PermissionType, get_permission_index
+from api.utils.websocket_encoding import encode_event
+
+try:
+    from SECRETS import WEBSOCKET_OVERFLOW_POLICY, WEBSOCKET_QUEUE_SIZE
+except ImportError:  # pragma: no cover: Older SECRETS files do not contain the settings
+    WEBSOCKET_QUEUE_SIZE: int = 100
+    WEBSOCKET_OVERFLOW_POLICY: str = WebsocketOverflowPolicy.DROP_OLDEST.value
+
+try:
+    from SECRETS import WEBSOCKET_MAX_CONNECTIONS_PER_USER
+except ImportError:  # pragma: no cover: Older SECRETS files do not contain the setting
+    WEBSOCKET_MAX_CONNECTIONS_PER_USER: int = 5
+
+
+class WebsocketConnection:
+    """
+    A websocket connection with its own bounded outbound queue, which is drained by a sender task.
+
+    Queueing a message never waits for the client, so a slow client only delays itself. What happens if its
+    queue is full is decided by the `WebsocketOverflowPolicy`.
+
+    Clients can narrow the events they receive by subscribing to sensor ids / types and limit the updates per
+    sensor to one per `min_interval` seconds.
+
+    Args:
+        user (DBUser): The user of the connection.
+        websocket (WebSocket): The websocket of the connection.
+        sensor_ids (frozenset[int]): The sensors the connection is restricted to (by a device key),
+            empty if it is not restricted.
+        max_queue_size (int): The maximum number of queued messages.
+        overflow_policy (WebsocketOverflowPolicy): What happens when the queue is full.
+        binary (bool): Whether events are sent as binary frames (see `websocket_encoding`) instead of JSON.
+    """
+
+    def __init__(
+        self,
+        user: DBUser,
+        websocket: WebSocket,
+        sensor_ids: frozenset[int],
+        max_queue_size: int,
+        overflow_policy: WebsocketOverflowPolicy,
+        binary: bool = False,
+    ) -> None:
+        self.user: DBUser = user
+        self.websocket: WebSocket = websocket
+        self.sensor_ids: frozenset[int] = sensor_ids
+        self.binary: bool = binary
+        self._max_queue_size: int = max_queue_size
+        self._overflow_policy: WebsocketOverflowPolicy = overflow_policy
+        # With `coalesce` the queue holds the latest message by sensor id, otherwise all messages in order.
+        self._queue: deque[str | bytes] = deque()
+        self._latest: OrderedDict[int, str | bytes] = OrderedDict()
+        # Replayed events are sent before all others and are not bounded by the queue size.
+        self._replayed: deque[str | bytes] = deque()
+        # Whether the client missed events, that could not be replayed.
+        self.resync: bool = False
+        self._ready: asyncio.Event = asyncio.Event()
+        self._sender: asyncio.Task | None = None
+        self._closed: bool = False
+        self.dropped: int = 0
+        self._all_sensors: bool = True
+        self._sensor_ids: set[int] = set()
+        self._sensor_types: set[SensorTypeModel] = set()
+        self._min_interval: float = 0
+        self._last_sent: dict[int, float] = {}
+
+    def start(self) -> None:
+        """
+        Starts the sender task.
+        """
+        self._sender = asyncio.create_task(self._send_loop())
+
+    def stop(self) -> None:
+        """
+        Stops the sender task, queued messages are discarded.
+        """
+        if self._sender is not None:
+            self._sender.cancel()
+
+    @property
+    def queued(self) -> int:
+        return len(self._replayed) + len(self._latest) + len(self._queue)
+
+    def update_subscription(self, subscription: WebsocketSubscription) -> WebsocketSubscriptionState:
+        """
+        Applies a subscribe / unsubscribe message of the client.
+
+        The first subscription to sensor ids / types ends the default of receiving the events of all readable
+        sensors, unsubscribing only removes what was subscribed before.
+
+        Args:
+            subscription (WebsocketSubscription): The message of the client.
+
+        Returns:
+            The subscriptions after the change.
+        """
+        if subscription.action is WebsocketAction.SUBSCRIBE:
+            self._all_sensors = self._all_sensors and not (subscription.sensor_ids or subscription.sensor_types)
+            self._sensor_ids.update(subscription.sensor_ids)
+            self._sensor_types.update(subscription.sensor_types)
+        else:
+            self._sensor_ids.difference_update(subscription.sensor_ids)
+            self._sensor_types.difference_update(subscription.sensor_types)
+        if subscription.min_interval is not None:
+            self._min_interval = subscription.min_interval
+            self._last_sent.clear()
+
+        return WebsocketSubscriptionState(
+            all_sensors=self._all_sensors,
+            sensor_ids=sorted(self._sensor_ids),
+            sensor_types=sorted(self._sensor_types),
+            min_interval=self._min_interval,
+        )
+
+    def wants(self, sensor_id: int, sensor_type: SensorTypeModel) -> bool:
+        """
+        Checks whether the client subscribed to an event of a sensor and it is not rate limited.
+
+        Args:
+            sensor_id (int): The sensor of the event.
+            sensor_type (SensorTypeModel): The type of the sensor.
+
+        Returns:
+            True if the event should be sent, the rate limit then counts it as sent.
+        """
+        if not self._all_sensors and sensor_id not in self._sensor_ids and sensor_type not in self._sensor_types:
+            return False
+        if self._min_interval:
+            now: float = time.monotonic()
+            last_sent: float | None = self._last_sent.get(sensor_id)
+            if last_sent is not None and now - last_sent < self._min_interval:
+                return False
+            self._last_sent[sensor_id] = now
+        return True
+
+    def reply(self, message: str) -> None:
+        """
+        Queues a reply to a message of the client, it is sent in order with the events.
+        """
+        if self._closed:
+            return
+        if len(self._queue) >= self._max_queue_size:
+            self._queue.popleft()
+            self.dropped += 1
+        self._queue.append(message)
+        self._ready.set()
+
+    def replay(self, messages: list[str | bytes]) -> None:
+        """
+        Queues the missed events of a reconnecting client ahead of all new messages.
+
+        They bypass the queue size and overflow policy, so the client receives every missed event still kept
+        instead of being disconnected or losing the start of the gap.
+        """
+        if self._closed or not messages:
+            return
+        self._replayed.extend(messages)
+        self._ready.set()
+
+    def send(self, sensor_id: int, message: str | bytes) -> None:
+        """
+        Queues a message without waiting for the client.
+
+        Args:
+            sensor_id (int): The sensor the message is about.
+            message (str | bytes): The serialized message, bytes are sent as binary frame.
+        """
+        if self._closed:
+            return
+        if self._overflow_policy is WebsocketOverflowPolicy.COALESCE:
+            if sensor_id in self._latest:
+                self._latest[sensor_id] = message
+                return
+            if len(self._latest) >= self._max_queue_size:
+                self._latest.popitem(last=False)
+                self.dropped += 1
+            self._latest[sensor_id] = message
+        else:
+            if len(self._queue) >= self._max_queue_size:
+                if self._overflow_policy is WebsocketOverflowPolicy.DISCONNECT:
+                    self._disconnect()
+                    return
+                self._queue.popleft()
+                self.dropped += 1
+            self._queue.append(message)
+        self._ready.set()
+
+    def _disconnect(self) -> None:
+        print(f"Closing websocket of {self.user.username} as it can not keep up")
+        self.close(status.WS_1013_TRY_AGAIN_LATER)
+
+    def close(self, code: int) -> None:
+        """
+        Discards the queued messages and closes the websocket with the given code.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self.stop()
+        self._queue.clear()
+        self._latest.clear()
+        self._replayed.clear()
+        asyncio.create_task(self.websocket.close(code))
+
+    def _next(self) -> str | bytes:
+        if self._replayed:
+            return self._replayed.popleft()
+        if self._latest:
+            return self._latest.popitem(last=False)[1]
+        return self._queue.popleft()
+
+    async def _send_loop(self) -> None:
+        while True:
+            await self._ready.wait()
+            message: str | bytes = self._next()
+            if not self.queued:
+                self._ready.clear()
+            try:
+                if isinstance(message, bytes):
+                    await self.websocket.send_bytes(message)
+                else:
+                    await self.websocket.send_text(message)
+            except Exception:  # The client is gone, the connection is removed once the endpoint notices it.
+                return
 
 
 class WebsocketHandler:
-    def __init__(self):
-        self._connections: dict[int, tuple[DBUser, WebSocket]] = {}
+    """
+    Keeps the open websocket connections and sends them the events of the sensors they may read.
+
+    Which connections receive the events of a sensor is kept in an index that is built when a connection is added
+    and updated when a permission changes, so sending an event needs no permission checks.
+    Permission changes are received on the `EventBus`, so they are applied by every worker. If the bus reconnects,
+    changes may have been missed, so all connections are closed and have to reconnect with their current permissions.
+    Every event is serialized once and then queued to the `WebsocketConnection`s, which send it on their own.
+
+    New events are published on the `EventBus`, so they also reach the connections held by other workers.
+
+    Every event gets a sequential `event_id` and the latest `replay_size` events of each sensor are kept,
+    so clients reconnecting with the id of the last event they received get the events they missed.
+    The ids are counted by each worker and only valid within its `epoch`, which is sent to the clients. A new epoch
+    starts with every start of a worker and whenever the `EventBus` reconnected (events of other workers were missed).
+    Clients reconnecting with another epoch, or that missed events no longer kept, are told to `resync`.
+
+    Args:
+        max_queue_size (int): The maximum number of queued messages per connection.
+        overflow_policy (WebsocketOverflowPolicy): What happens when the queue of a connection is full.
+        event_bus (EventBus | None): The bus events are exchanged on, an `InProcessEventBus` if not given.
+        replay_size (int): The number of events kept per sensor for reconnecting clients.
+        max_connections_per_user (int): The number of connections a user can have open at the same time.
+    """
+
+    def __init__(
+        self,
+        max_queue_size: int = WEBSOCKET_QUEUE_SIZE,
+        overflow_policy: WebsocketOverflowPolicy = WebsocketOverflowPolicy(WEBSOCKET_OVERFLOW_POLICY),
+        event_bus: EventBus | None = None,
+        replay_size: int = 100,
+        max_connections_per_user: int = WEBSOCKET_MAX_CONNECTIONS_PER_USER,
+    ):
+        self._max_queue_size: int = max_queue_size
+        self._overflow_policy: WebsocketOverflowPolicy = overflow_policy
+        self._max_connections_per_user: int = max_connections_per_user
+        # The open connections by user id.
+        self._connections: dict[int, list[WebsocketConnection]] = {}
+        # The connections by the sensors they are allowed to read.
+        self._subscribers: dict[int, set[WebsocketConnection]] = {}
+        # Superusers (not restricted by a device key) receive the events of all sensors, also of new ones.
+        self._global_subscribers: set[WebsocketConnection] = set()
         self._message_queue: asyncio.Queue[SensorState | SensorData] = asyncio.Queue()
+        self._event_bus: EventBus = event_bus or InProcessEventBus()
+        self._replay_size: int = replay_size
+        self.epoch: str = secrets.token_hex(8)
+        self._last_event_id: int = 0
+        # The latest events (with their id and JSON message) by sensor id.
+        self._history: dict[int, deque[tuple[int, SensorState | SensorData, str]]] = {}
+        # The id of the latest event by sensor id, that was removed from the history.
+        self._evicted: dict[int, int] = {}
+        self._event_bus.subscribe(self._message_queue.put_nowait, SensorData, SensorState)
+        self._event_bus.subscribe(self._on_permission_changed, PermissionChanged)
+        self._event_bus.subscribe(self._on_event_bus_reconnected, EventBusReconnected)
+
+    async def add(
+        self,
+        session: AsyncSession,
+        user: DBUser,
+        websocket: WebSocket,
+        sensor_ids: frozenset[int] = frozenset(),
+        last_event_id: int | None = None,
+        binary: bool = False,
+        epoch: str | None = None,
+    ) -> WebsocketConnection | None:
+        """
+        Adds a connection and subscribes it to all sensors the user may read.
+
+        Events are queued for the connection right away, they are sent once the connection is started.
 
-    def add(self, user: DBUser, websocket: WebSocket) -> bool:
+        Args:
+            session (AsyncSession): A database session, used to load the permissions of the user.
+            user (DBUser): The user of the connection.
+            websocket (WebSocket): The websocket of the connection.
+            sensor_ids (frozenset[int]): The sensors the connection is restricted to (by a device key),
+                empty if it is not restricted.
+            last_event_id (int | None): The id of the last event a reconnecting client received,
+                the newer events still kept in the replay buffer are queued first.
+            binary (bool): Whether events are sent as binary frames instead of JSON.
+            epoch (str | None): The `epoch` the `last_event_id` belongs to, the connection is marked to `resync`
+                instead of replaying if it does not match.
+
+        Returns:
+            The added `WebsocketConnection`, None if the user already has the maximum number of connections.
+        """
         if not user.id:
-            return False  # pragma: no cover: Just for type safety, can not really happen (Should we remove the check?)
-        if self._connections.get(user.id):
-            return False
+            return None  # pragma: no cover: Just for type safety, can not really happen (Should we remove the check?)
+        if len(self._connections.get(user.id, [])) >= self._max_connections_per_user:
+            return None
+
+        readable_sensor_ids: set[int] = set(sensor_ids)
+        if not user.superuser:
+            permissions: dict[int, int] = await get_permission_index().get_permissions(session, user.id)
+            readable_sensor_ids = {
+                sensor_id
+                for sensor_id, mask in permissions.items()
+                if mask & 1 << PermissionType.READ.value and (not sensor_ids or sensor_id in sensor_ids)
+            }
 
-        self._connections[user.id] = (user, websocket)
+        # Nothing is awaited from here on, so no event can be missed or replayed twice.
+        if len(self._connections.get(user.id, [])) >= self._max_connections_per_user:
+            return None  # pragma: no cover: The user opened several connections at the same time
+        # Connections authenticated by a device key only receive events of the sensors the key is bound to.
+        connection: WebsocketConnection = WebsocketConnection(
+            user, websocket, sensor_ids, self._max_queue_size, self._overflow_policy, binary
+        )
+        self._connections.setdefault(user.id, []).append(connection)
+        if user.superuser and not sensor_ids:
+            self._global_subscribers.add(connection)
+            readable_sensor_ids = set(self._history)
+        else:
+            for sensor_id in readable_sensor_ids:
+                self._subscribers.setdefault(sensor_id, set()).add(connection)
+
+        if last_event_id is not None:
+            if epoch == self.epoch:
+                self._replay(connection, readable_sensor_ids, last_event_id)
+            else:
+                # The ids belong to another worker or were counted before a restart / reconnect of the bus.
+                connection.resync = True
+        return connection
+
+    def _replay(self, connection: WebsocketConnection, sensor_ids: set[int], last_event_id: int) -> None:
+        missed: list[tuple[int, SensorState | SensorData, str]] = [
+            entry for sensor_id in sensor_ids for entry in self._history.get(sensor_id, ()) if entry[0] > last_event_id
+        ]
+        connection.replay(
+            [
+                encode_event(event_id, event) if connection.binary else message
+                for event_id, event, message in sorted(missed, key=lambda entry: entry[0])
+            ]
+        )
+        # The start of the gap is no longer kept for some sensors.
+        connection.resync = any(self._evicted.get(sensor_id, 0) > last_event_id for sensor_id in sensor_ids)
+
+    def remove(self, connection: WebsocketConnection) -> bool:
+        connections: list[WebsocketConnection] = self._connections.get(connection.user.id, [])
+        if connection not in connections:
+            return False  # pragma: no cover: Just for type safety, shouldn't happen
+        connection.stop()
+        connections.remove(connection)
+        if not connections:
+            del self._connections[connection.user.id]
+
+        self._global_subscribers.discard(connection)
+        for sensor_id, subscribers in list(self._subscribers.items()):
+            subscribers.discard(connection)
+            if not subscribers:
+                del self._subscribers[sensor_id]
         return True
 
-    def remove(self, user: DBUser) -> bool:
-        if not user.id:
-            return False  # pragma: no cover: Just for type safety, can not really happen (Should we remove the check?)
-        if self._connections.pop(user.id, None):
-            return True
-        return False  # pragma: no cover: Just for type safety, shouldn't happen
+    def update_permission(self, user_id: int, sensor_id: int, read: bool) -> None:
+        """
+        Applies a created / updated / deleted `SensorPermission` to the subscriptions of the connections of a user.
+
+        Args:
+            user_id (int): The user of the permission.
+            sensor_id (int): The sensor of the permission.
+            read (bool): Whether the user may read the sensor now.
+        """
+        for connection in self._connections.get(user_id, []):
+            if connection.user.superuser or (connection.sensor_ids and sensor_id not in connection.sensor_ids):
+                continue
+
+            if read:
+                self._subscribers.setdefault(sensor_id, set()).add(connection)
+            elif sensor_id in self._subscribers:
+                self._subscribers[sensor_id].discard(connection)
+                if not self._subscribers[sensor_id]:
+                    del self._subscribers[sensor_id]
+
+    def _on_permission_changed(self, change: PermissionChanged) -> None:
+        self.update_permission(change.user_id, change.sensor_id, change.read and not change.deleted)
+
+    def _on_event_bus_reconnected(self, _event: EventBusReconnected) -> None:
+        # Events of other workers were missed, so the kept events can not be replayed as a complete gap anymore.
+        self.epoch = secrets.token_hex(8)
+        connections: list[WebsocketConnection] = [
+            connection for connections in self._connections.values() for connection in connections
+        ]
+        print(f"Closing {len(connections)} websockets, as permission changes may have been missed")
+        for connection in connections:
+            connection.close(status.WS_1012_SERVICE_RESTART)
+
+    def get_subscribers(self, sensor_id: int) -> set[WebsocketConnection]:
+        """
+        Returns the connections that receive the events of a sensor.
+        """
+        return self._global_subscribers | self._subscribers.get(sensor_id, set())
+
+    def _dispatch(self, event: SensorState | SensorData) -> None:
+        sensor_type: SensorTypeModel = (
+            SensorTypeModel.STATE if isinstance(event, SensorState) else SensorTypeModel.ENVIRONMENTAL
+        )
+        self._last_event_id += 1
+        # Adds the event id to the serialized event, without dumping the event to a dict first.
+        message: str = f'{{"event_id":{self._last_event_id},{event.model_dump_json()[1:]}'
+        history: deque[tuple[int, SensorState | SensorData, str]] | None = self._history.get(event.sensor_id)
+        if history is None:
+            history = self._history[event.sensor_id] = deque(maxlen=self._replay_size)
+        if len(history) == history.maxlen:
+            # Without a replay buffer the event itself is never kept.
+            self._evicted[event.sensor_id] = history[0][0] if history else self._last_event_id
+        history.append((self._last_event_id, event, message))
+
+        # The binary frame is only encoded (once) if a connection wants it.
+        frame: bytes | None = None
+        for connection in self.get_subscribers(event.sensor_id):
+            if connection.wants(event.sensor_id, sensor_type):
+                if connection.binary:
+                    frame = frame or encode_event(self._last_event_id, event)
+                    connection.send(event.sensor_id, frame)
+                else:
+                    connection.send(event.sensor_id, message)
 
     async def event_loop(self):
-        engine: AsyncEngine = await get_engine()
         while True:
             event = await self._message_queue.get()
-            async for session in get_session(engine):
-                for user, websocket in self._connections.values():
-                    try:
-                        await get_user_read_permissions(session, user, event.sensor_id)
-                        await websocket.send_text(event.model_dump_json())
-                    except HTTPException:  # pragma: no cover: For now no tests, permission handling is tested elsewhere
-                        pass
+            try:
+                self._dispatch(event)
+            except Exception as exception:
+                # One bad event must not stop the events of all connections.
+                print(f"Could not send event of sensor {event.sensor_id}: {exception}")
+            finally:
                 self._message_queue.task_done()
 
     async def add_event(self, data: SensorState | SensorData):
-        await self._message_queue.put(data)
+        await self._event_bus.publish([data])
+
+    async def add_events(self, data: list[SensorState | SensorData]):
+        await self._event_bus.publish(data)
 
 
-_websocket_handler = WebsocketHandler()
+_websocket_handler = WebsocketHandler(event_bus=get_event_bus())
 
 
 def get_websocket_handler() -> WebsocketHandler:
@@ -0,0 +1,86 @@
+import math
+import struct
+from datetime import datetime, timezone
+
+from api.models.database_models import SensorData, SensorState, to_utc
+
+# Clients that offer this subprotocol receive events as compact binary frames instead of JSON text frames.
+BINARY_SUBPROTOCOL: str = "weatherapi.binary.v1"
+
+SENSOR_DATA_TYPE: int = 1
+SENSOR_STATE_TYPE: int = 2
+
+# Little endian: type, event_id, id, sensor_id, timestamp (ms since epoch) and the values (voltage is NaN if missing).
+# The values are 64-bit floats, as the API accepts values beyond the range of 32-bit ones.
+SENSOR_DATA_STRUCT: struct.Struct = struct.Struct("<BQQIqdddd")
+SENSOR_STATE_STRUCT: struct.Struct = struct.Struct("<BQQIq?d")
+
+
+def _to_milliseconds(timestamp: datetime) -> int:
+    return round(to_utc(timestamp).timestamp() * 1000)
+
+
+def _from_milliseconds(milliseconds: int) -> datetime:
+    return datetime.fromtimestamp(milliseconds / 1000, tz=timezone.utc)
+
+
+def _optional(value: float) -> float | None:
+    return None if math.isnan(value) else value
+
+
+def encode_event(event_id: int, event: SensorData | SensorState) -> bytes:
+    """
+    Encodes an event to a binary frame of the `BINARY_SUBPROTOCOL` (61 bytes for `SensorData`, 38 for `SensorState`).
+
+    Args:
+        event_id (int): The id of the event.
+        event (SensorData | SensorState): The event that should be encoded.
+
+    Returns:
+        The encoded event.
+    """
+    voltage: float = math.nan if event.voltage is None else event.voltage
+    timestamp: int = _to_milliseconds(event.timestamp)
+    if isinstance(event, SensorState):
+        return SENSOR_STATE_STRUCT.pack(
+            SENSOR_STATE_TYPE, event_id, event.id, event.sensor_id, timestamp, event.state, voltage
+        )
+    return SENSOR_DATA_STRUCT.pack(
+        SENSOR_DATA_TYPE,
+        event_id,
+        event.id,
+        event.sensor_id,
+        timestamp,
+        event.temperature,
+        event.humidity,
+        event.pressure,
+        voltage,
+    )
+
+
+def decode_event(frame: bytes) -> tuple[int, SensorData | SensorState]:
+    """
+    Decodes a binary frame created by `encode_event`, as a reference for clients.
+
+    Args:
+        frame (bytes): The binary frame.
+
+    Returns:
+        The id of the event and the event.
+    """
+    if frame[0] == SENSOR_STATE_TYPE:
+        _, event_id, id, sensor_id, timestamp, state, voltage = SENSOR_STATE_STRUCT.unpack(frame)
+        return event_id, SensorState(
+            id=id, sensor_id=sensor_id, timestamp=_from_milliseconds(timestamp), state=state, voltage=_optional(voltage)
+        )
+
+    _, event_id, id, sensor_id, timestamp, temperature, humidity, pressure, voltage = SENSOR_DATA_STRUCT.unpack(frame)
+    return event_id, SensorData(
+        id=id,
+        sensor_id=sensor_id,
+        timestamp=_from_milliseconds(timestamp),
+        temperature=temperature,
+        humidity=humidity,
+        pressure=pressure,
+        voltage=_optional(voltage),
+    )
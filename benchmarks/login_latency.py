@@ -0,0 +1,85 @@
+"""
+Measures the latency of `/sensor/{id}/data` while `/token` is hammered with logins.
+
+bcrypt blocks for ~200ms per login, so if it ran on the event loop every other request would stall behind it.
+Run it against a running server with a user that has read permissions for the sensor:
+
+    python -m benchmarks.login_latency --url http://localhost:8000 --username user --password password --sensor-id 1
+"""
+
+import asyncio
+import statistics
+import time
+from argparse import ArgumentParser
+
+import httpx
+
+
+async def hammer_logins(client: httpx.AsyncClient, username: str, password: str, stop: asyncio.Event) -> int:
+    """
+    Logs in repeatedly until `stop` is set.
+
+    Returns:
+        The number of logins.
+    """
+    logins: int = 0
+    while not stop.is_set():
+        await client.post("/token", data={"username": username, "password": password})
+        logins += 1
+    return logins
+
+
+async def measure_reads(client: httpx.AsyncClient, sensor_id: int, token: str, requests: int) -> list[float]:
+    """
+    Reads the latest sensor data sequentially.
+
+    Returns:
+        The latency of every request in milliseconds.
+    """
+    latencies: list[float] = []
+    for _ in range(requests):
+        start: float = time.perf_counter()
+        response: httpx.Response = await client.get(
+            f"/sensor/{sensor_id}/data", headers={"Authorization": f"Bearer {token}"}
+        )
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def percentile(latencies: list[float], percent: int) -> float:
+    return statistics.quantiles(latencies, n=100)[percent - 1]
+
+
+async def main(url: str, username: str, password: str, sensor_id: int, logins: int, requests: int):
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        response: httpx.Response = await client.post("/token", data={"username": username, "password": password})
+        response.raise_for_status()
+        token: str = response.json()["access_token"]
+
+        idle: list[float] = await measure_reads(client, sensor_id, token, requests)
+
+        stop: asyncio.Event = asyncio.Event()
+        hammers = [asyncio.create_task(hammer_logins(client, username, password, stop)) for _ in range(logins)]
+        loaded: list[float] = await measure_reads(client, sensor_id, token, requests)
+        stop.set()
+        total_logins: int = sum(await asyncio.gather(*hammers))
+
+    print(f"{'':<24}{'p50':>12}{'p99':>12}")
+    for name, latencies in (("idle", idle), (f"{logins} concurrent logins", loaded)):
+        print(f"{name:<24}{f'{percentile(latencies, 50):.1f}ms':>12}{f'{percentile(latencies, 99):.1f}ms':>12}")
+    print(f"{total_logins} logins during the measurement")
+
+
+if __name__ == "__main__":
+    parser: ArgumentParser = ArgumentParser(description="Measure the read latency while logins are hammered.")
+    parser.add_argument("--url", default="http://localhost:8000", help="The base url of the api.")
+    parser.add_argument("--username", required=True, help="A user with read permissions for the sensor.")
+    parser.add_argument("--password", required=True, help="The password of the user.")
+    parser.add_argument("--sensor-id", required=True, type=int, help="The sensor whose data should be read.")
+    parser.add_argument("--logins", type=int, default=16, help="The number of concurrent login loops.")
+    parser.add_argument("--requests", type=int, default=200, help="The number of measured reads.")
+
+    args = parser.parse_args()
+
+    asyncio.run(main(args.url, args.username, args.password, args.sensor_id, args.logins, args.requests))
@@ -0,0 +1,140 @@
+"""
+Compares the query plans of the sensor history queries with and without the indexes of revision `3a9c5e2b7d41`.
+
+The indexes are dropped with `DROP INDEX CONCURRENTLY` and recreated afterwards, so no long lived lock is taken,
+but the queries of the api are slow while they are missing. Only run it against a scratch copy of the database
+with realistic data after `alembic upgrade head`:
+
+    python -m benchmarks.query_plans --sensor-id 1 --amount 100 --scratch
+
+Every query runs `--runs` times per configuration, the first run (cold cache) and the median of the others (warm cache)
+are reported, so both configurations are measured in the same cold -> warm order.
+"""
+
+import asyncio
+import json
+import statistics
+from argparse import ArgumentParser
+
+from sqlalchemy import Select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.sql import func
+from sqlmodel import NUMERIC, cast, select
+
+from api.models.database_models import SensorData, SensorState
+from api.utils.database import base_engine, dispose_database
+
+INDEXES: list[str] = [
+    "ix_sensordata_sensor_id_id",
+    "ix_sensordata_sensor_id_timestamp",
+    "ix_sensordata_timestamp_brin",
+    "ix_sensorstate_sensor_id_id",
+    "ix_sensorstate_sensor_id_timestamp",
+    "ix_sensorstate_timestamp_brin",
+]
+
+
+def get_queries(sensor_id: int, amount: int) -> dict[str, Select]:
+    """
+    Builds the queries used by the sensor routes.
+    """
+    return {
+        "get_sensor_data": select(SensorData)
+        .where(SensorData.sensor_id == sensor_id)
+        .order_by(SensorData.id.desc())
+        .limit(amount),
+        "get_sensor_state": select(SensorState)
+        .where(SensorState.sensor_id == sensor_id)
+        .order_by(SensorState.id.desc())
+        .limit(amount),
+        "get_sensor_data_daily": select(
+            func.date(SensorData.timestamp), func.round(cast(func.AVG(SensorData.temperature), NUMERIC), 2)
+        )
+        .where(SensorData.sensor_id == sensor_id)
+        .group_by(func.date(SensorData.timestamp))
+        .order_by(func.date(SensorData.timestamp).desc())
+        .limit(amount),
+    }
+
+
+async def explain(connection: AsyncConnection, query: Select) -> tuple[float, str]:
+    """
+    Runs `EXPLAIN ANALYZE` for the given query.
+
+    Returns:
+        The execution time in milliseconds and the type of the top level scan node.
+    """
+    sql: str = str(query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    result = await connection.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"))
+    plan = result.scalar_one()
+    plan = plan if isinstance(plan, list) else json.loads(plan)
+
+    node: dict = plan[0]["Plan"]
+    while node.get("Plans") and "Scan" not in node["Node Type"]:
+        node = node["Plans"][0]
+    return plan[0]["Execution Time"], node["Node Type"]
+
+
+async def measure(
+    connection: AsyncConnection, queries: dict[str, Select], runs: int
+) -> dict[str, tuple[float, float, str]]:
+    """
+    Runs every query `runs` times.
+
+    Returns:
+        The cold execution time, the median warm execution time and the scan type by query name.
+    """
+    results: dict[str, tuple[float, float, str]] = {}
+    for name, query in queries.items():
+        timings: list[tuple[float, str]] = [await explain(connection, query) for _ in range(runs)]
+        results[name] = (timings[0][0], statistics.median(timing for timing, _ in timings[1:]), timings[-1][1])
+    return results
+
+
+async def main(sensor_id: int, amount: int, runs: int):
+    queries: dict[str, Select] = get_queries(sensor_id, amount)
+    # Concurrent index operations can not run inside a transaction.
+    async with base_engine.connect() as connection:
+        connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+        result = await connection.execute(
+            text("SELECT indexname, indexdef FROM pg_indexes WHERE indexname = ANY(:indexes)"), {"indexes": INDEXES}
+        )
+        definitions: dict[str, str] = dict(result.tuples().all())
+
+        for index in definitions:
+            await connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index}"))
+        try:
+            before: dict[str, tuple[float, float, str]] = await measure(connection, queries, runs)
+        finally:
+            for definition in definitions.values():
+                await connection.execute(text(definition.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1)))
+        after: dict[str, tuple[float, float, str]] = await measure(connection, queries, runs)
+    await dispose_database()
+
+    print(f"{'query':<24}{'before (cold / warm)':>40}{'after (cold / warm)':>40}")
+    for name in queries:
+        print(
+            f"{name:<24}{f'{before[name][0]:.2f}ms / {before[name][1]:.2f}ms ({before[name][2]})':>40}"
+            f"{f'{after[name][0]:.2f}ms / {after[name][1]:.2f}ms ({after[name][2]})':>40}"
+        )
+
+
+if __name__ == "__main__":
+    parser: ArgumentParser = ArgumentParser(description="Compare the sensor query plans with and without indexes.")
+    parser.add_argument("--sensor-id", required=True, type=int, help="The sensor whose history should be queried.")
+    parser.add_argument("--amount", type=int, default=100, help="The number of rows / days that should be queried.")
+    parser.add_argument("--runs", type=int, default=5, help="How often every query runs per configuration.")
+    parser.add_argument(
+        "--scratch",
+        action="store_true",
+        help="Confirms that the database is a scratch copy, whose indexes may be dropped.",
+    )
+
+    args = parser.parse_args()
+    if not args.scratch:
+        parser.error("the indexes are dropped temporarily, run it against a scratch copy and pass --scratch")
+    if args.runs < 2:
+        parser.error("--runs must be at least 2 to measure a cold and a warm run")
+
+    asyncio.run(main(args.sensor_id, args.amount, args.runs))
@@ -0,0 +1,64 @@
+import asyncio
+from argparse import ArgumentParser
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from api.models.database_models import Sensor, SensorData, SensorState
+from api.models.enum_models import ImportFormat, SensorTypeModel
+from api.models.response_models import BulkImportResult
+from api.utils.bulk_import import CHUNK_SIZE, BulkImportError, bulk_import, iter_lines, parse_rows
+from api.utils.database import dispose_database, get_engine, get_session
+
+
+async def import_history(sensor_id: int, path: Path, import_format: ImportFormat, chunk_size: int):
+    engine: AsyncEngine = await get_engine()
+    session: AsyncSession
+    async for session in get_session(engine):
+        sensor: Sensor | None = await session.get(Sensor, sensor_id)
+        if not sensor:
+            print(f"No sensor with the id {sensor_id} exists.")
+            break
+        model = SensorData if sensor.type is SensorTypeModel.ENVIRONMENTAL else SensorState
+
+        with path.open("rb") as file:
+
+            async def read(size: int) -> bytes:
+                return file.read(size)
+
+            try:
+                result: BulkImportResult = await bulk_import(
+                    session, model, sensor.id, parse_rows(iter_lines(read), import_format, model), chunk_size
+                )
+            except BulkImportError as exception:
+                print(f"Nothing was imported. {exception}")
+            else:
+                print(
+                    f"Imported {result.rows} rows into {model.__tablename__} in {result.seconds:.2f}s "
+                    f"({result.rows_per_second:.0f} rows/s)."
+                )
+    await dispose_database()
+
+
+if __name__ == "__main__":
+    parser: ArgumentParser = ArgumentParser(
+        description="Bulk import the history of a sensor from a CSV or NDJSON file, e.g. when migrating a station."
+    )
+    parser.add_argument("--sensor-id", required=True, type=int, help="The id of the sensor the history belongs to.")
+    parser.add_argument("--file", required=True, type=Path, help="The CSV (with header) or NDJSON file to import.")
+    parser.add_argument(
+        "--format",
+        choices=[import_format.value for import_format in ImportFormat],
+        help="The format of the file. Defaults to the file extension.",
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=CHUNK_SIZE, help="The number of rows that are written at once."
+    )
+
+    args = parser.parse_args()
+
+    asyncio.run(
+        import_history(
+            args.sensor_id, args.file, ImportFormat(args.format or args.file.suffix.lstrip(".")), args.chunk_size
+        )
+    )
@@ -0,0 +1,239 @@
+from typing import Any
+
+import httpx
+import pytest
+from fastapi import WebSocketDisconnect
+from sqlmodel import delete, select
+
+from api.models.database_models import DeviceKey, DeviceKeySensor, Sensor, SensorData
+from api.utils.device_keys import API_KEY_HEADER, get_device_key_cache, get_device_key_digest
+from api.utils.http_exceptions import (
+    DEVICE_KEY_NOT_EXISTING,
+    INVALID_CREDENTIALS,
+    MISSING_PRIVILEGES,
+    NO_SENSOR_WITH_THIS_ID,
+)
+from tests.utils.assertions import assert_HTTPException_EQ
+from tests.utils.authentication_tests import _TestDeleteAuthentication, _TestGetAuthentication, _TestPostAuthentication
+from tests.utils.fake_db import async_fake_session_maker
+from tests.utils.fixtures import superuser_token, token
+from tests.utils.sensor_utils import create_sensor_permission, create_sensors
+
+SENSOR_DATA: dict[str, Any] = {"temperature": 32.1, "humidity": 56.78, "pressure": 123.45, "voltage": 3.45}
+
+
+async def clear_device_keys():
+    """
+    Clears all `DeviceKey`s from the testing database and the device key cache.
+    """
+    async with async_fake_session_maker() as session:
+        await session.execute(delete(DeviceKeySensor))
+        await session.execute(delete(DeviceKey))
+        await session.commit()
+    get_device_key_cache().clear()
+
+
+def create_device_key(client, token: str, sensor_ids: list[int]) -> dict[str, Any]:
+    """
+    Creates a new device key via the api.
+    Args:
+        client (TestClient): The client used for the request.
+        token (str): The token of the user the key is created for.
+        sensor_ids (list[int]): The sensors the key should be bound to.
+
+    Returns:
+        The json of the created key.
+    """
+    response: httpx.Response = client.post(
+        "/devices/keys",
+        headers={"Authorization": f"Bearer {token}"},
+        json={"name": "Weather station", "sensor_ids": sensor_ids},
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+class TestCreateDeviceKey(_TestPostAuthentication):
+
+    async def _get_path(self) -> str:
+        return "/devices/keys"
+
+    @pytest.mark.asyncio
+    async def test_create_device_key(self, token: str):
+        """
+        Asserts a key is returned once and only its digest is stored.
+        """
+        await clear_device_keys()
+        sensors: list[Sensor] = await create_sensors()
+        await create_sensor_permission(token, sensors[0], write=True)
+
+        device_key: dict[str, Any] = create_device_key(self.client, token, [sensors[0].id])
+        assert device_key["name"] == "Weather station"
+        assert device_key["sensor_ids"] == [sensors[0].id]
+
+        async with async_fake_session_maker() as session:
+            result = await session.execute(select(DeviceKey).where(DeviceKey.id == device_key["id"]))
+            db_device_key: DeviceKey = result.scalars().one()
+        assert db_device_key.digest == get_device_key_digest(device_key["key"])
+        assert db_device_key.digest != device_key["key"]
+
+    @pytest.mark.asyncio
+    async def test_create_device_key_missing_privileges(self, token: str):
+        """
+        Asserts a key can only be bound to sensors the user may write to.
+        """
+        sensors: list[Sensor] = await create_sensors()
+        await create_sensor_permission(token, sensors[0], read=True)
+
+        response: httpx.Response = self.client.post(
+            await self._get_path(),
+            headers={"Authorization": f"Bearer {token}"},
+            json={"name": "Weather station", "sensor_ids": [sensors[0].id]},
+        )
+        assert_HTTPException_EQ(response, MISSING_PRIVILEGES)
+
+    @pytest.mark.asyncio
+    async def test_create_device_key_no_sensor(self, token: str):
+        """
+        Asserts a key can not be bound to a sensor that does not exist.
+        """
+        sensors: list[Sensor] = await create_sensors()
+
+        response: httpx.Response = self.client.post(
+            await self._get_path(),
+            headers={"Authorization": f"Bearer {token}"},
+            json={"name": "Weather station", "sensor_ids": [sensors[-1].id + 1]},
+        )
+        assert_HTTPException_EQ(response, NO_SENSOR_WITH_THIS_ID)
+
+
+class TestGetDeviceKeys(_TestGetAuthentication):
+
+    async def _get_path(self) -> str:
+        return "/devices/keys"
+
+    @pytest.mark.asyncio
+    async def test_get_device_keys(self, token: str, superuser_token: str):
+        """
+        Asserts only the keys of the current user are returned, without the key itself.
+        """
+        await clear_device_keys()
+        sensors: list[Sensor] = await create_sensors()
+        await create_sensor_permission(token, sensors[0], write=True)
+        device_key: dict[str, Any] = create_device_key(self.client, token, [sensors[0].id])
+        create_device_key(self.client, superuser_token, [])
+
+        response: httpx.Response = self.client.get(await self._get_path(), headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+        assert response.json() == [
+            {
+                "id": device_key["id"],
+                "name": device_key["name"],
+                "sensor_ids": device_key["sensor_ids"],
+                "created_at": device_key["created_at"],
+            }
+        ]
+
+
+class TestDeleteDeviceKey(_TestDeleteAuthentication):
+
+    async def _get_path(self) -> str:
+        return "/devices/keys/1"
+
+    @pytest.mark.asyncio
+    async def test_delete_device_key(self, token: str):
+        """
+        Asserts a deleted key is no longer accepted, even if it was cached.
+        """
+        await clear_device_keys()
+        sensors: list[Sensor] = await create_sensors()
+        await create_sensor_permission(token, sensors[0], write=True)
+        device_key: dict[str, Any] = create_device_key(self.client, token, [sensors[0].id])
+
+        path: str = f"/sensor/{sensors[0].id}/data"
+        response: httpx.Response = self.client.post(path, headers={API_KEY_HEADER: device_key["key"]}, json=SENSOR_DATA)
+        assert response.status_code == 201
+
+        response = self.client.delete(f"/devices/keys/{device_key['id']}", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 204
+
+        response = self.client.post(path, headers={API_KEY_HEADER: device_key["key"]}, json=SENSOR_DATA)
+        assert_HTTPException_EQ(response, INVALID_CREDENTIALS)
+
+    @pytest.mark.asyncio
+    async def test_delete_device_key_of_other_user(self, token: str, superuser_token: str):
+        """
+        Asserts a user can not delete the keys of other users.
+        """
+        await clear_device_keys()
+        device_key: dict[str, Any] = create_device_key(self.client, superuser_token, [])
+
+        response: httpx.Response = self.client.delete(
+            f"/devices/keys/{device_key['id']}", headers={"Authorization": f"Bearer {token}"}
+        )
+        assert_HTTPException_EQ(response, DEVICE_KEY_NOT_EXISTING)
+
+
+class TestDeviceKeyAuthentication(_TestPostAuthentication):
+
+    async def _get_path(self) -> str:
+        sensors: list[Sensor] = await create_sensors()
+        return f"/sensor/{sensors[0].id}/data"
+
+    @pytest.mark.asyncio
+    async def test_write_with_device_key(self, token: str):
+        """
+        Asserts sensor data can be written with a device key instead of a bearer token.
+        """
+        await clear_device_keys()
+        sensors: list[Sensor] = await create_sensors()
+        await create_sensor_permission(token, sensors[0], write=True)
+        device_key: dict[str, Any] = create_device_key(self.client, token, [sensors[0].id])
+
+        response: httpx.Response = self.client.post(
+            f"/sensor/{sensors[0].id}/data", headers={API_KEY_HEADER: device_key["key"]}, json=SENSOR_DATA
+        )
+        assert response.status_code == 201
+
+        async with async_fake_session_maker() as session:
+            result = await session.execute(select(SensorData).where(SensorData.id == response.json()["id"]))
+            assert result.scalars().first() is not None
+
+    @pytest.mark.asyncio
+    async def test_write_with_device_key_other_sensor(self, token: str, superuser_token: str):
+        """
+        Asserts a key bound to a sensor can not write to other sensors, even if its user could.
+        """
+        await clear_device_keys()
+        sensors: list[Sensor] = await create_sensors()
+        device_key: dict[str, Any] = create_device_key(self.client, superuser_token, [sensors[0].id])
+
+        response: httpx.Response = self.client.post(
+            f"/sensor/{sensors[1].id}/data", headers={API_KEY_HEADER: device_key["key"]}, json=SENSOR_DATA
+        )
+        assert_HTTPException_EQ(response, MISSING_PRIVILEGES)
+
+    @pytest.mark.asyncio
+    async def test_write_with_invalid_device_key(self):
+        """
+        Asserts an unknown key is rejected.
+        """
+        sensors: list[Sensor] = await create_sensors()
+
+        response: httpx.Response = self.client.post(
+            f"/sensor/{sensors[0].id}/data", headers={API_KEY_HEADER: "invalid"}, json=SENSOR_DATA
+        )
+        assert_HTTPException_EQ(response, INVALID_CREDENTIALS)
+
+    def test_ws_connect_with_device_key(self, superuser_token: str):
+        """
+        Asserts a websocket is rejected with an unknown key and can be opened with a device key.
+        """
+        with pytest.raises(WebSocketDisconnect) as exception:
+            with self.client.websocket_connect("/ws", headers={API_KEY_HEADER: "invalid"}) as _:
+                pass
+        assert exception.value.code == 1008
+
+        device_key: dict[str, Any] = create_device_key(self.client, superuser_token, [])
+        with self.client.websocket_connect("/ws", headers={API_KEY_HEADER: device_key["key"]}) as websocket:
+            assert websocket.receive_json()["message"] == "Hello World!"
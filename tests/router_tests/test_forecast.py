@@ -1,7 +1,12 @@
+import asyncio
+
 import httpx
 import pytest
 from pytest_httpx import HTTPXMock
 
+from api.models.forecast_models import Forecast
+from api.routers.forecast import get_forecast_data
+from api.utils.forecast_buffer import get_forecast_buffer
 from api.utils.http_exceptions import NO_FORECAST_DATA
 from tests.utils.assertions import assert_HTTPException_EQ
 from tests.utils.authentication_tests import _TestGetAuthentication
@@ -33,3 +38,22 @@ class TestForecast(_TestGetAuthentication):
         assert data["current"]
         assert data["hourly"]
         assert data["daily"]
+
+
+@pytest.mark.asyncio
+async def test_get_forecast_data_single_flight(httpx_mock: HTTPXMock):
+    """
+    Asserts concurrent requests for a location that is not cached share a single upstream request.
+    """
+    get_forecast_buffer().clear()
+    httpx_mock.add_response(json=forecast_json_dump)
+
+    forecasts: list[Forecast | None] = await asyncio.gather(
+        *(get_forecast_data(lat="20", lon="20") for _ in range(100))
+    )
+
+    assert len(httpx_mock.get_requests()) == 1
+    assert all(forecast == Forecast(**forecast_json_dump) for forecast in forecasts)
+    # The fetched forecast is cached, so later requests do not reach OpenWeatherMap either.
+    assert await get_forecast_data(lat="20", lon="20") == forecasts[0]
+    assert len(httpx_mock.get_requests()) == 1
@@ -1,19 +1,51 @@
+import csv
+import io
+import json
 import random
+from datetime import datetime, timedelta
 from typing import Any, Type
 
 import httpx
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pytest
+from pytest_mock import MockerFixture
 from sqlmodel import delete, select
 
-from api.models.database_models import DatabaseModelBase, Sensor, SensorData, SensorState
+from api.models.database_models import (
+    DatabaseModelBase,
+    Sensor,
+    SensorData,
+    SensorDataDaily,
+    SensorDataHourly,
+    SensorDataMonthly,
+    SensorPermission,
+    SensorState,
+)
 from api.models.enum_models import SensorTypeModel
-from api.utils.http_exceptions import MISSING_PRIVILEGES, NO_SENSOR_WITH_THIS_ID
+from api.routers.sensors import MAX_BATCH_SIZE
+from api.utils.http_exceptions import (
+    INVALID_BUCKET,
+    INVALID_CURSOR,
+    INVALID_IMPORT_DATA,
+    MISSING_PRIVILEGES,
+    NO_SENSOR_WITH_THIS_ID,
+    TOO_MANY_BUCKETS,
+)
+from api.utils.pagination import NEXT_CURSOR_HEADER
+from api.utils.rollups import update_rollups
 from tests.utils.assertions import assert_HTTPException_EQ
 from tests.utils.authentication_tests import _TestGetAuthentication, _TestPostAuthentication
 from tests.utils.fake_db import async_fake_session_maker
 from tests.utils.fixtures import superuser_token, token
-from tests.utils.sensor_base_tests import _TestCreateSensorBase, _TestGetSensorBase
-from tests.utils.sensor_utils import clear_sensors, create_sensor, create_sensor_permission, create_sensors
+from tests.utils.sensor_base_tests import _TestCreateSensorBase, _TestGetSensorBase, _TestSensorMixin
+from tests.utils.sensor_utils import (
+    clear_sensor_permissions,
+    clear_sensors,
+    create_sensor,
+    create_sensor_permission,
+    create_sensors,
+)
 
 # ToDo Create Test: Check response with created data and the database result or only one of both?
 
@@ -166,6 +198,199 @@ class TestCreateSensorData(_TestCreateSensorBase):
         return SensorData
 
 
+class TestCreateSensorDataBatch(_TestPostAuthentication, _TestSensorMixin):
+
+    @property
+    def _get_sensor_type(self) -> SensorTypeModel:
+        return SensorTypeModel.ENVIRONMENTAL
+
+    @property
+    def _get_sensor_endpoint(self) -> str:
+        return "data/batch"
+
+    async def _get_path(self) -> str:
+        return await self._base_get_path()
+
+    @staticmethod
+    def _get_batch(size: int) -> list[dict[str, Any]]:
+        start: datetime = datetime(2024, 1, 1, 12, 0)
+        return [
+            {
+                "temperature": 20.0 + index,
+                "humidity": 50.0,
+                "pressure": 1013.25,
+                "voltage": 3.3,
+                "timestamp": (start + timedelta(minutes=index)).isoformat(),
+            }
+            for index in range(size)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_create_sensor_data_batch_no_permissions(self, token: str):
+        """
+        Asserts that the creation fails if the user has no write permissions for the sensor.
+        """
+        await clear_sensor_permissions()
+
+        response: httpx.Response = self.client.post(
+            await self._get_path(), headers={"Authorization": f"Bearer {token}"}, json=self._get_batch(2)
+        )
+        assert_HTTPException_EQ(response, MISSING_PRIVILEGES)
+
+    @pytest.mark.asyncio
+    async def test_create_sensor_data_batch(self, token: str):
+        """
+        Asserts that all entries of the batch are created in the given order with the client supplied timestamps.
+        """
+        sensor: Sensor = await self._get_sensor()
+        await create_sensor_permission(token, sensor, write=True)
+        async with async_fake_session_maker() as session:
+            await session.execute(delete(SensorData))
+            await session.commit()
+
+        batch: list[dict[str, Any]] = self._get_batch(3)
+        response: httpx.Response = self.client.post(
+            await self._get_path(), headers={"Authorization": f"Bearer {token}"}, json=batch
+        )
+        assert response.status_code == 201
+        assert [data["temperature"] for data in response.json()] == [data["temperature"] for data in batch]
+
+        async with async_fake_session_maker() as session:
+            result = await session.execute(select(SensorData).order_by(SensorData.id))
+            sensor_data: list[SensorData] = list(result.scalars().all())
+        assert response.json() == [data.model_dump(mode="json") for data in sensor_data]
+        assert [data.timestamp for data in sensor_data] == [datetime.fromisoformat(data["timestamp"]) for data in batch]
+
+    @pytest.mark.asyncio
+    async def test_create_sensor_data_batch_empty(self, token: str):
+        """
+        Asserts that an empty batch is accepted and creates nothing.
+        """
+        await create_sensor_permission(token, await self._get_sensor(), write=True)
+
+        response: httpx.Response = self.client.post(
+            await self._get_path(), headers={"Authorization": f"Bearer {token}"}, json=[]
+        )
+        assert response.status_code == 201
+        assert response.json() == []
+
+    @pytest.mark.asyncio
+    async def test_create_sensor_data_batch_too_large(self, token: str):
+        """
+        Asserts that batches larger than the allowed maximum are rejected.
+        """
+        await create_sensor_permission(token, await self._get_sensor(), write=True)
+
+        response: httpx.Response = self.client.post(
+            await self._get_path(),
+            headers={"Authorization": f"Bearer {token}"},
+            json=self._get_batch(MAX_BATCH_SIZE + 1),
+        )
+        assert response.status_code == 422
+
+
+class TestImportSensorHistory(_TestPostAuthentication):
+
+    async def _get_path(self) -> str:
+        return "/sensor/0/import"
+
+    @pytest.mark.asyncio
+    async def test_import_normal_user(self, token: str):
+        """
+        Asserts the api is returning an error when a non superuser tries to import data.
+        """
+        sensor: Sensor = await create_sensor()
+        response: httpx.Response = self.client.post(
+            f"/sensor/{sensor.id}/import",
+            headers={"Authorization": f"Bearer {token}"},
+            files={"file": ("data.csv", b"", "text/csv")},
+        )
+        assert_HTTPException_EQ(response, MISSING_PRIVILEGES)
+
+    @pytest.mark.asyncio
+    async def test_import_sensor_data_csv(self, superuser_token: str):
+        """
+        Asserts that all rows of a CSV file are imported as `SensorData` for an environmental sensor.
+        """
+        sensor: Sensor = await create_sensor()
+        async with async_fake_session_maker() as session:
+            await session.execute(delete(SensorData))
+            await session.commit()
+
+        content: bytes = (
+            b"timestamp,temperature,humidity,pressure,voltage\r\n"
+            b"2024-01-01T00:00:00,1.5,50,1000,3.3\r\n"
+            b"2024-01-01T00:01:00,2.5,51,1001,\r\n"
+            b"2024-01-01T00:02:00,3.5,52,1002,3.1"
+        )
+        response: httpx.Response = self.client.post(
+            f"/sensor/{sensor.id}/import",
+            headers={"Authorization": f"Bearer {superuser_token}"},
+            files={"file": ("data.csv", content, "text/csv")},
+        )
+        assert response.status_code == 201
+        assert response.json()["rows"] == 3
+
+        async with async_fake_session_maker() as session:
+            result = await session.execute(select(SensorData).order_by(SensorData.timestamp))
+            sensor_data: list[SensorData] = list(result.scalars().all())
+        assert [data.temperature for data in sensor_data] == [1.5, 2.5, 3.5]
+        assert [data.voltage for data in sensor_data] == [3.3, None, 3.1]
+        assert all(data.sensor_id == sensor.id for data in sensor_data)
+
+    @pytest.mark.asyncio
+    async def test_import_sensor_state_ndjson(self, superuser_token: str):
+        """
+        Asserts that all rows of a NDJSON file are imported as `SensorState` for a state sensor.
+        """
+        sensor: Sensor = await create_sensor(sensor_type=SensorTypeModel.STATE)
+        async with async_fake_session_maker() as session:
+            await session.execute(delete(SensorState))
+            await session.commit()
+
+        content: bytes = (
+            b'{"timestamp": "2024-01-01T00:00:00", "state": true, "voltage": 3.3}\n'
+            b'{"timestamp": "2024-01-01T00:01:00", "state": false, "voltage": null}\n'
+        )
+        response: httpx.Response = self.client.post(
+            f"/sensor/{sensor.id}/import?format=ndjson",
+            headers={"Authorization": f"Bearer {superuser_token}"},
+            files={"file": ("data.ndjson", content, "application/x-ndjson")},
+        )
+        assert response.status_code == 201
+        assert response.json()["rows"] == 2
+
+        async with async_fake_session_maker() as session:
+            result = await session.execute(select(SensorState).order_by(SensorState.timestamp))
+            assert [data.state for data in result.scalars().all()] == [True, False]
+
+    @pytest.mark.asyncio
+    async def test_import_invalid_row(self, superuser_token: str):
+        """
+        Asserts that nothing is imported if the file contains an invalid row.
+        """
+        sensor: Sensor = await create_sensor()
+        async with async_fake_session_maker() as session:
+            await session.execute(delete(SensorData))
+            await session.commit()
+
+        content: bytes = (
+            b"timestamp,temperature,humidity,pressure,voltage\n"
+            b"2024-01-01T00:00:00,1.5,50,1000,3.3\n"
+            b"2024-01-01T00:01:00,warm,51,1001,3.3\n"
+        )
+        response: httpx.Response = self.client.post(
+            f"/sensor/{sensor.id}/import",
+            headers={"Authorization": f"Bearer {superuser_token}"},
+            files={"file": ("data.csv", content, "text/csv")},
+        )
+        assert_HTTPException_EQ(response, INVALID_IMPORT_DATA)
+
+        async with async_fake_session_maker() as session:
+            result = await session.execute(select(SensorData))
+            assert result.scalars().first() is None
+
+
 class TestGetSensorData(_TestGetSensorBase):
 
     @property
@@ -184,6 +409,399 @@ class TestGetSensorData(_TestGetSensorBase):
         ]
 
 
+class TestGetSensorDataTimeRange(_TestGetSensorBase):
+
+    @property
+    def _get_sensor_endpoint(self) -> str:
+        return "data?amount=10&start=2024-01-01T00:00:00&end=2024-01-02T00:00:00"
+
+    @property
+    def _get_sensor_type(self) -> SensorTypeModel:
+        return SensorTypeModel.ENVIRONMENTAL
+
+    async def _get_data(self) -> list[DatabaseModelBase]:
+        async with async_fake_session_maker() as session:
+            await session.execute(delete(SensorData))
+            await session.commit()
+
+        sensor_id: int = (await self._get_sensor()).id
+        async with async_fake_session_maker() as session:
+            # Data outside the requested time range should not be returned.
+            for timestamp in [datetime(2023, 12, 31, 23, 59), datetime(2024, 1, 2)]:
+                session.add(
+                    SensorData(
+                        sensor_id=sensor_id, temperature=0, humidity=0, pressure=0, voltage=0, timestamp=timestamp
+                    )
+                )
+            await session.commit()
+
+        return [
+            SensorData(
+                sensor_id=sensor_id,
+                temperature=1.23,
+                humidity=54.32,
+                pressure=1234,
+                voltage=3.21,
+                timestamp=datetime(2024, 1, 1, 12),
+            ),
+        ]
+
+
+class TestGetSensorDataTimeRangeOffset(_TestGetSensorBase):
+
+    @property
+    def _get_sensor_endpoint(self) -> str:
+        # A start with an offset (00:00 UTC) and a naive end, which is read as UTC as well.
+        return "data?amount=10&start=2024-01-01T02:00:00%2B02:00&end=2024-01-01T02:00:00"
+
+    @property
+    def _get_sensor_type(self) -> SensorTypeModel:
+        return SensorTypeModel.ENVIRONMENTAL
+
+    async def _get_data(self) -> list[DatabaseModelBase]:
+        async with async_fake_session_maker() as session:
+            await session.execute(delete(SensorData))
+            await session.commit()
+
+        sensor_id: int = (await self._get_sensor()).id
+        async with async_fake_session_maker() as session:
+            # Data outside the requested time range (in UTC) should not be returned.
+            for timestamp in [datetime(2023, 12, 31, 23, 59), datetime(2024, 1, 1, 2)]:
+                session.add(
+                    SensorData(
+                        sensor_id=sensor_id, temperature=0, humidity=0, pressure=0, voltage=0, timestamp=timestamp
+                    )
+                )
+            await session.commit()
+
+        return [
+            SensorData(
+                sensor_id=sensor_id,
+                temperature=1.23,
+                humidity=54.32,
+                pressure=1234,
+                voltage=3.21,
+                timestamp=datetime(2024, 1, 1, 0, 30),
+            ),
+        ]
+
+
+class TestGetSensorDataDownsampled(_TestGetSensorBase):
+
+    @property
+    def _get_sensor_endpoint(self) -> str:
+        return "data?points=5"
+
+    @property
+    def _get_sensor_type(self) -> SensorTypeModel:
+        return SensorTypeModel.ENVIRONMENTAL
+
+    @property
+    def _run_get(self) -> bool:
+        # We have a custom get command here
+        return False
+
+    @pytest.mark.asyncio
+    async def test_get_sensor_data_downsampled(self, token: str):
+        """
+        Asserts the api is returning at most the requested number of points, including the spike.
+        """
+        async with async_fake_session_maker() as session:
+            await session.execute(delete(SensorData))
+            await session.commit()
+
+        sensor: Sensor = await self._get_sensor()
+        await create_sensor_permission(token, sensor, read=True)
+
+        start: datetime = datetime(2024, 1, 1)
+        async with async_fake_session_maker() as session:
+            for index in range(30):
+                session.add(
+                    SensorData(
+                        sensor_id=sensor.id,
+                        temperature=50.0 if index == 17 else 20.0,
+                        humidity=50.0,
+                        pressure=1000.0,
+                        voltage=None,
+                        timestamp=start + timedelta(minutes=index),
+                    )
+                )
+            await session.commit()
+
+        response: httpx.Response = self.client.get(await self._get_path(), headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+
+        data = response.json()
+        assert len(data) == 5
+        assert data[0]["timestamp"] == start.isoformat()
+        assert data[-1]["timestamp"] == (start + timedelta(minutes=29)).isoformat()
+        assert 50.0 in [entry["temperature"] for entry in data]
+        assert all(entry["sensor_id"] == sensor.id for entry in data)
+
+
+class TestGetSensorDataAggregated(_TestGetSensorBase):
+
+    @property
+    def _get_sensor_endpoint(self) -> str:
+        return "data/aggregated?start=2024-01-01T00:00:00&end=2024-01-01T03:00:00&bucket=1h"
+
+    @property
+    def _get_sensor_type(self) -> SensorTypeModel:
+        return SensorTypeModel.ENVIRONMENTAL
+
+    @property
+    def _run_get(self) -> bool:
+        # We have a custom get command here
+        return False
+
+    async def _create_measurements(self, sensor: Sensor, measurements: list[tuple[datetime, float, float | None]]):
+        async with async_fake_session_maker() as session:
+            for model in (SensorData, SensorDataHourly, SensorDataDaily, SensorDataMonthly):
+                await session.execute(delete(model))
+            rows: list[dict] = [
+                {
+                    "sensor_id": sensor.id,
+                    "temperature": temperature,
+                    "humidity": 50.0,
+                    "pressure": 1000.0,
+                    "voltage": voltage,
+                    "timestamp": timestamp,
+                }
+                for timestamp, temperature, voltage in measurements
+            ]
+            session.add_all([SensorData(**row) for row in rows])
+            await update_rollups(session, rows)
+            await session.commit()
+
+    # The aligned start is answered from the hourly rollup, the unaligned one from the raw data.
+    @pytest.mark.parametrize("start", ["2024-01-01T00:00:00", "2023-12-31T23:59:30"])
+    @pytest.mark.asyncio
+    async def test_get_sensor_data_aggregated(self, token: str, start: str):
+        """
+        Asserts the api is returning the minimum, average and maximum per bucket.
+        """
+        sensor: Sensor = await self._get_sensor()
+        await create_sensor_permission(token, sensor, read=True)
+        await self._create_measurements(
+            sensor,
+            [
+                (datetime(2024, 1, 1, 0, 0), 10.0, 3.3),
+                (datetime(2024, 1, 1, 0, 30), 20.0, None),
+                (datetime(2024, 1, 1, 0, 59), 30.0, 3.1),
+                (datetime(2024, 1, 1, 2, 15), 5.0, None),
+                # Outside the requested time range
+                (datetime(2024, 1, 1, 3, 0), 100.0, 3.0),
+            ],
+        )
+
+        response: httpx.Response = self.client.get(
+            f"sensor/{sensor.id}/data/aggregated?start={start}&end=2024-01-01T03:00:00&bucket=1h",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert response.status_code == 200
+
+        buckets = response.json()
+        assert [bucket["timestamp"] for bucket in buckets] == ["2024-01-01T00:00:00Z", "2024-01-01T02:00:00Z"]
+        assert [bucket["count"] for bucket in buckets] == [3, 1]
+        assert buckets[0]["temperature"] == {"min": 10.0, "avg": 20.0, "max": 30.0}
+        assert buckets[0]["humidity"] == {"min": 50.0, "avg": 50.0, "max": 50.0}
+        assert buckets[0]["voltage"] == {"min": 3.1, "avg": 3.2, "max": 3.3}
+        assert buckets[1]["voltage"] is None
+
+    @pytest.mark.asyncio
+    async def test_get_sensor_data_aggregated_batched_upserts(self, token: str, mocker: MockerFixture):
+        """
+        Asserts the rollups are correct if the periods of the new rows are upserted in several batches.
+        """
+        mocker.patch("api.utils.rollups.UPSERT_BATCH_SIZE", 2)
+        sensor: Sensor = await self._get_sensor()
+        await create_sensor_permission(token, sensor, read=True)
+        await self._create_measurements(sensor, [(datetime(2024, 1, 1, hour), float(hour), None) for hour in range(5)])
+
+        response: httpx.Response = self.client.get(
+            f"sensor/{sensor.id}/data/aggregated?start=2024-01-01T00:00:00&end=2024-01-01T05:00:00&bucket=1h",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert response.status_code == 200
+        assert [bucket["temperature"]["avg"] for bucket in response.json()] == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+    @pytest.mark.asyncio
+    async def test_get_sensor_data_aggregated_months(self, token: str):
+        """
+        Asserts the api is returning calendar month buckets from the monthly rollup.
+        """
+        sensor: Sensor = await self._get_sensor()
+        await create_sensor_permission(token, sensor, read=True)
+        await self._create_measurements(
+            sensor,
+            [
+                (datetime(2024, 1, 15), 10.0, 3.0),
+                (datetime(2024, 2, 29, 23, 59), 20.0, None),
+                (datetime(2024, 3, 1), 30.0, 4.0),
+                (datetime(2024, 5, 1), 40.0, None),
+            ],
+        )
+
+        response: httpx.Response = self.client.get(
+            f"sensor/{sensor.id}/data/aggregated?start=2024-01-01T00:00:00&end=2024-05-01T00:00:00&bucket=2mo",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert response.status_code == 200
+
+        buckets = response.json()
+        assert [bucket["timestamp"] for bucket in buckets] == ["2024-01-01T00:00:00Z", "2024-03-01T00:00:00Z"]
+        assert [bucket["count"] for bucket in buckets] == [2, 1]
+        assert buckets[0]["temperature"] == {"min": 10.0, "avg": 15.0, "max": 20.0}
+        assert buckets[0]["voltage"] == {"min": 3.0, "avg": 3.0, "max": 3.0}
+        assert buckets[1]["temperature"] == {"min": 30.0, "avg": 30.0, "max": 30.0}
+
+    @pytest.mark.parametrize("bucket", ["0m", "5", "1y", "m5", "0mo"])
+    @pytest.mark.asyncio
+    async def test_get_sensor_data_aggregated_invalid_bucket(self, token: str, bucket: str):
+        """
+        Asserts the api is returning an error for malformed bucket sizes.
+        """
+        sensor: Sensor = await self._get_sensor()
+        await create_sensor_permission(token, sensor, read=True)
+
+        response: httpx.Response = self.client.get(
+            f"sensor/{sensor.id}/data/aggregated?start=2024-01-01T00:00:00&bucket={bucket}",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert_HTTPException_EQ(response, INVALID_BUCKET)
+
+    @pytest.mark.asyncio
+    async def test_get_sensor_data_aggregated_too_many_buckets(self, token: str):
+        """
+        Asserts the api is returning an error if the time range contains too many buckets.
+        """
+        sensor: Sensor = await self._get_sensor()
+        await create_sensor_permission(token, sensor, read=True)
+
+        response: httpx.Response = self.client.get(
+            f"sensor/{sensor.id}/data/aggregated?start=2000-01-01T00:00:00&bucket=1s",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert_HTTPException_EQ(response, TOO_MANY_BUCKETS)
+
+
+class TestExportSensorData(_TestGetSensorBase):
+
+    @property
+    def _get_sensor_endpoint(self) -> str:
+        return "data/export"
+
+    @property
+    def _get_sensor_type(self) -> SensorTypeModel:
+        return SensorTypeModel.ENVIRONMENTAL
+
+    @property
+    def _run_get(self) -> bool:
+        # We have a custom get command here
+        return False
+
+    async def _create_history(self, sensor: Sensor) -> None:
+        async with async_fake_session_maker() as session:
+            await session.execute(delete(SensorData))
+            for minute, voltage in enumerate([3.3, None, 3.1]):
+                session.add(
+                    SensorData(
+                        sensor_id=sensor.id,
+                        temperature=minute + 0.5,
+                        humidity=50.0,
+                        pressure=1000.0,
+                        voltage=voltage,
+                        timestamp=datetime(2024, 1, 1, 0, minute),
+                    )
+                )
+            await session.commit()
+
+    @pytest.mark.asyncio
+    async def test_export_sensor_data_ndjson(self, token: str):
+        """
+        Asserts the api is streaming the history in the requested time range as NDJSON.
+        """
+        sensor: Sensor = await self._get_sensor()
+        await create_sensor_permission(token, sensor, read=True)
+        await self._create_history(sensor)
+
+        response: httpx.Response = self.client.get(
+            f"sensor/{sensor.id}/data/export?start=2024-01-01T00:01:00", headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+
+        rows: list[dict] = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["temperature"] for row in rows] == [1.5, 2.5]
+        assert [row["voltage"] for row in rows] == [None, 3.1]
+        assert rows[0]["timestamp"] == "2024-01-01T00:01:00"
+        assert all(row["sensor_id"] == sensor.id for row in rows)
+
+        # Bounds with an offset select the same rows as the naive (UTC) ones.
+        response = self.client.get(
+            f"sensor/{sensor.id}/data/export?start=2024-01-01T01:01:00%2B01:00&end=2024-01-01T00:03:00",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert [json.loads(line)["temperature"] for line in response.text.splitlines()] == [1.5, 2.5]
+
+    @pytest.mark.asyncio
+    async def test_export_sensor_data_csv(self, token: str):
+        """
+        Asserts the api is streaming the history as CSV file with a header.
+        """
+        sensor: Sensor = await self._get_sensor()
+        await create_sensor_permission(token, sensor, read=True)
+        await self._create_history(sensor)
+
+        response: httpx.Response = self.client.get(
+            f"sensor/{sensor.id}/data/export?format=csv", headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+
+        rows: list[dict] = list(csv.DictReader(io.StringIO(response.text)))
+        assert [row["temperature"] for row in rows] == ["0.5", "1.5", "2.5"]
+        assert [row["voltage"] for row in rows] == ["3.3", "", "3.1"]
+
+    @pytest.mark.asyncio
+    async def test_export_sensor_data_arrow(self, token: str):
+        """
+        Asserts the api is exporting the history as Arrow IPC stream.
+        """
+        sensor: Sensor = await self._get_sensor()
+        await create_sensor_permission(token, sensor, read=True)
+        await self._create_history(sensor)
+
+        response: httpx.Response = self.client.get(
+            f"sensor/{sensor.id}/data/export?format=arrow&end=2024-01-01T00:02:00",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert response.status_code == 200
+
+        table: pa.Table = pa.ipc.open_stream(response.content).read_all()
+        assert table.column("temperature").to_pylist() == [0.5, 1.5]
+        assert table.column("voltage").to_pylist() == [3.3, None]
+        assert table.schema.field("timestamp").type == pa.timestamp("us", tz="UTC")
+
+    @pytest.mark.asyncio
+    async def test_export_sensor_data_parquet(self, token: str):
+        """
+        Asserts the api is exporting the history as Parquet file.
+        """
+        sensor: Sensor = await self._get_sensor()
+        await create_sensor_permission(token, sensor, read=True)
+        await self._create_history(sensor)
+
+        response: httpx.Response = self.client.get(
+            f"sensor/{sensor.id}/data/export?format=parquet", headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200
+
+        table: pa.Table = pq.read_table(pa.BufferReader(response.content))
+        assert table.column("temperature").to_pylist() == [0.5, 1.5, 2.5]
+        assert table.column("sensor_id").to_pylist() == [sensor.id] * 3
+
+
 class TestGetSensorDataDaily(_TestGetSensorBase):
 
     @property
@@ -216,11 +834,13 @@ class TestGetSensorDataDaily(_TestGetSensorBase):
         temps = random.sample(range(100), 2)
 
         async with async_fake_session_maker() as session:
+            await session.execute(delete(SensorDataDaily))
             for temp in temps:
                 data: SensorData = SensorData(
                     sensor_id=sensor.id, temperature=temp, humidity=54.32, pressure=1234, voltage=3.21
                 )
                 session.add(data)
+                await update_rollups(session, [data.model_dump()])
                 await session.commit()
 
         response: httpx.Response = self.client.get(
@@ -229,6 +849,48 @@ class TestGetSensorDataDaily(_TestGetSensorBase):
         assert response.status_code == 200
         assert response.json()[0]["temperature"] == round(sum(temps) / len(temps), 2)
 
+    @pytest.mark.asyncio
+    async def test_get_sensor_data_daily_rollup(self, token: str):
+        """
+        Asserts that data created through the api is merged into the daily rollup.
+        """
+        sensor: Sensor = await create_sensor()
+        await create_sensor_permission(token, sensor, read=True, write=True)
+        async with async_fake_session_maker() as session:
+            await session.execute(delete(SensorDataDaily))
+            await session.commit()
+
+        batch: list[dict[str, Any]] = [
+            {"temperature": 10.0, "humidity": 50.0, "pressure": 1000.0, "voltage": None, "timestamp": timestamp}
+            for timestamp in ["2024-01-01T10:00:00", "2024-01-02T10:00:00", "2024-01-02T11:00:00"]
+        ]
+        batch[2]["temperature"], batch[2]["voltage"] = 20.0, 3.3
+        response: httpx.Response = self.client.post(
+            f"/sensor/{sensor.id}/data/batch", headers={"Authorization": f"Bearer {token}"}, json=batch
+        )
+        assert response.status_code == 201
+        response = self.client.post(
+            f"/sensor/{sensor.id}/data/batch",
+            headers={"Authorization": f"Bearer {token}"},
+            json=[batch[0] | {"temperature": 0.0}],
+        )
+        assert response.status_code == 201
+
+        async with async_fake_session_maker() as session:
+            result = await session.execute(select(SensorDataDaily).order_by(SensorDataDaily.period_start))
+            rollups: list[SensorDataDaily] = list(result.scalars().all())
+        assert [rollup.count for rollup in rollups] == [2, 2]
+        assert [(rollup.temperature_min, rollup.temperature_max) for rollup in rollups] == [(0.0, 10.0), (10.0, 20.0)]
+        assert [(rollup.voltage_count, rollup.voltage_min) for rollup in rollups] == [(0, None), (1, 3.3)]
+
+        response = self.client.get(
+            f"/sensor/{sensor.id}/data/daily?amount=5", headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.json() == [
+            {"timestamp": "2024-01-01", "temperature": 5.0},
+            {"timestamp": "2024-01-02", "temperature": 15.0},
+        ]
+
 
 class TestCreateSensorState(_TestCreateSensorBase):
 
@@ -261,3 +923,145 @@ class TestGetSensorState(_TestGetSensorBase):
 
     async def _get_data(self):
         return [SensorState(sensor_id=(await self._get_sensor()).id, state=True, voltage=3.21)]
+
+
+class TestExportSensorState(_TestGetSensorBase):
+
+    @property
+    def _get_sensor_endpoint(self) -> str:
+        return "state/export"
+
+    @property
+    def _get_sensor_type(self) -> SensorTypeModel:
+        return SensorTypeModel.STATE
+
+    @property
+    def _run_get(self) -> bool:
+        # We have a custom get command here
+        return False
+
+    @pytest.mark.asyncio
+    async def test_export_sensor_state_ndjson(self, token: str):
+        """
+        Asserts the api is streaming the state history as NDJSON.
+        """
+        sensor: Sensor = await self._get_sensor()
+        await create_sensor_permission(token, sensor, read=True)
+        async with async_fake_session_maker() as session:
+            await session.execute(delete(SensorState))
+            session.add_all([SensorState(sensor_id=sensor.id, state=state, voltage=3.0) for state in (True, False)])
+            await session.commit()
+
+        response: httpx.Response = self.client.get(
+            f"sensor/{sensor.id}/state/export", headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200
+        assert [json.loads(line)["state"] for line in response.text.splitlines()] == [True, False]
+
+    @pytest.mark.asyncio
+    async def test_export_sensor_state_parquet_empty(self, token: str):
+        """
+        Asserts the api is returning a valid Parquet file if there is no history.
+        """
+        sensor: Sensor = await self._get_sensor()
+        await create_sensor_permission(token, sensor, read=True)
+        async with async_fake_session_maker() as session:
+            await session.execute(delete(SensorState))
+            await session.commit()
+
+        response: httpx.Response = self.client.get(
+            f"sensor/{sensor.id}/state/export?format=parquet", headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200
+
+        table: pa.Table = pq.read_table(pa.BufferReader(response.content))
+        assert table.num_rows == 0
+        assert table.schema.field("state").type == pa.bool_()
+
+
+class TestGetSensorStatePagination(_TestGetSensorBase):
+
+    @property
+    def _get_sensor_endpoint(self) -> str:
+        return "state?amount=2"
+
+    @property
+    def _get_sensor_type(self) -> SensorTypeModel:
+        return SensorTypeModel.STATE
+
+    @property
+    def _run_get(self) -> bool:
+        # We have a custom get command here
+        return False
+
+    async def _create_states(self, token: str, amount: int) -> tuple[Sensor, list[int]]:
+        sensor: Sensor = await self._get_sensor()
+        await create_sensor_permission(token, sensor, read=True)
+        async with async_fake_session_maker() as session:
+            await session.execute(delete(SensorState))
+            states: list[SensorState] = [SensorState(sensor_id=sensor.id, state=True, voltage=i) for i in range(amount)]
+            session.add_all(states)
+            await session.commit()
+            return sensor, [state.id for state in states]
+
+    @pytest.mark.asyncio
+    async def test_get_sensor_state_cursor(self, token: str):
+        """
+        Asserts the api is walking back through the whole history by following the `X-Next-Cursor` header.
+        """
+        sensor, ids = await self._create_states(token, 5)
+
+        pages: list[list[int]] = []
+        path: str = f"sensor/{sensor.id}/state?amount=2"
+        while True:
+            response: httpx.Response = self.client.get(path, headers={"Authorization": f"Bearer {token}"})
+            assert response.status_code == 200
+            pages.append([state["id"] for state in response.json()])
+            if NEXT_CURSOR_HEADER not in response.headers:
+                break
+            path = f"sensor/{sensor.id}/state?amount=2&cursor={response.headers[NEXT_CURSOR_HEADER]}"
+
+        assert pages == [ids[3:], ids[1:3], ids[:1]]
+
+    @pytest.mark.asyncio
+    async def test_get_sensor_state_after_id(self, token: str):
+        """
+        Asserts the api is returning the states directly after the given id and a cursor to continue forward.
+        """
+        sensor, ids = await self._create_states(token, 5)
+
+        response: httpx.Response = self.client.get(
+            f"sensor/{sensor.id}/state?amount=2&after_id={ids[0]}", headers={"Authorization": f"Bearer {token}"}
+        )
+        assert [state["id"] for state in response.json()] == ids[1:3]
+
+        response = self.client.get(
+            f"sensor/{sensor.id}/state?amount=2&cursor={response.headers[NEXT_CURSOR_HEADER]}",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert [state["id"] for state in response.json()] == ids[3:]
+
+    @pytest.mark.asyncio
+    async def test_get_sensor_state_before_id(self, token: str):
+        """
+        Asserts the api is returning the states directly before the given id.
+        """
+        sensor, ids = await self._create_states(token, 5)
+
+        response: httpx.Response = self.client.get(
+            f"sensor/{sensor.id}/state?amount=2&before_id={ids[2]}", headers={"Authorization": f"Bearer {token}"}
+        )
+        assert [state["id"] for state in response.json()] == ids[:2]
+
+    @pytest.mark.parametrize("query", ["cursor=invalid", "cursor=eDox", "before_id=1&after_id=1"])
+    @pytest.mark.asyncio
+    async def test_get_sensor_state_invalid_cursor(self, token: str, query: str):
+        """
+        Asserts the api is returning an error for malformed cursors or conflicting pagination parameters.
+        """
+        sensor, _ = await self._create_states(token, 1)
+
+        response: httpx.Response = self.client.get(
+            f"sensor/{sensor.id}/state?{query}", headers={"Authorization": f"Bearer {token}"}
+        )
+        assert_HTTPException_EQ(response, INVALID_CURSOR)
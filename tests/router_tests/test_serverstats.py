@@ -110,3 +110,60 @@ class TestGetServerStatsHistory(_TestGetAuthentication):
         )
 
         assert_HTTPException_EQ(response, NO_SERVERSTATS_DATA)
+
+
+class TestGetCacheStats(_TestGetAuthentication):
+
+    async def _get_path(self) -> str:
+        return "/server/stats/caches"
+
+    @pytest.mark.asyncio
+    async def test_normal_user(self, token: str):
+        """
+        Asserts the api is returning an error when the route is called with wrong authentication.
+        """
+        response: httpx.Response = self.client.get(await self._get_path(), headers={"Authorization": f"Bearer {token}"})
+        assert_HTTPException_EQ(response, MISSING_PRIVILEGES)
+
+    @pytest.mark.asyncio
+    async def test_get_cache_stats(self, superuser_token: str):
+        """
+        Asserts the api is returning the counters of the user cache.
+        """
+        stats: list[dict] = []
+        for _ in range(2):
+            response: httpx.Response = self.client.get(
+                await self._get_path(), headers={"Authorization": f"Bearer {superuser_token}"}
+            )
+            assert response.status_code == 200
+            stats.append(response.json()["users"])
+
+        # The first request loaded the user from the database, the second one from the cache.
+        assert stats[1]["size"] == 1
+        assert stats[1]["misses"] == stats[0]["misses"]
+        assert stats[1]["hits"] == stats[0]["hits"] + 1
+
+
+class TestGetIngestStats(_TestGetAuthentication):
+
+    async def _get_path(self) -> str:
+        return "/server/stats/ingest"
+
+    @pytest.mark.asyncio
+    async def test_normal_user(self, token: str):
+        """
+        Asserts the api is returning an error when the route is called with wrong authentication.
+        """
+        response: httpx.Response = self.client.get(await self._get_path(), headers={"Authorization": f"Bearer {token}"})
+        assert_HTTPException_EQ(response, MISSING_PRIVILEGES)
+
+    @pytest.mark.asyncio
+    async def test_get_ingest_stats(self, superuser_token: str):
+        """
+        Asserts the api is returning the counters of the ingest buffer.
+        """
+        response: httpx.Response = self.client.get(
+            await self._get_path(), headers={"Authorization": f"Bearer {superuser_token}"}
+        )
+        assert response.status_code == 200
+        assert set(response.json()) == {"pending", "written_rows", "retries", "lost_rows"}
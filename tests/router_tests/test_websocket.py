@@ -2,13 +2,16 @@ import asyncio
 from typing import Any
 
 import pytest
-from fastapi import WebSocketDisconnect
+from fastapi import WebSocketDisconnect, status
 from fastapi.testclient import TestClient
+from pytest_mock import MockerFixture
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.main import app
 from api.models.database_models import Sensor, SensorData
 from api.utils.database import get_engine
 from api.utils.websocket_connection_handler import get_websocket_handler
+from api.utils.websocket_encoding import BINARY_SUBPROTOCOL
 from tests.utils.fake_db import override_get_engine
 from tests.utils.fixtures import superuser_token, token
 from tests.utils.sensor_utils import create_sensor
@@ -47,10 +50,12 @@ async def test_ws_connect(superuser_token: str):
     task = asyncio.get_event_loop().create_task(get_websocket_handler().event_loop())
 
     sensor: Sensor = await create_sensor(name="TestSensorWS")
+    # Let the handler send the events queued by other tests before connecting.
+    await ws_handler._message_queue.join()
 
     with client.websocket_connect("/ws", headers={"Authorization": f"Bearer {superuser_token}"}) as websocket:
         data = websocket.receive_json()
-        assert data == {"message": "Hello World!"}
+        assert data == {"message": "Hello World!", "epoch": ws_handler.epoch, "resync": False}
 
         data: dict[str, Any] = {
             "id": -1,
@@ -73,14 +78,66 @@ async def test_ws_connect(superuser_token: str):
     task.cancel()
 
 
+def test_ws_session_released(token: str, mocker: MockerFixture):
+    """
+    Asserts the database session is closed once the connection is added, not only when the socket closes.
+    """
+    close_spy = mocker.spy(AsyncSession, "close")
+    with client.websocket_connect("/ws", headers={"Authorization": f"Bearer {token}"}) as websocket:
+        assert websocket.receive_json()["message"] == "Hello World!"
+        assert close_spy.call_count == 1
+
+
 # ToDo Investigate performance issue
 def test_ws_connect_double_connection(token: str):
     with client.websocket_connect("/ws", headers={"Authorization": f"Bearer {token}"}) as websocket:
         data = websocket.receive_json()
-        assert data == {"message": "Hello World!"}
+        assert data["message"] == "Hello World!"
+
+        with client.websocket_connect("/ws", headers={"Authorization": f"Bearer {token}"}) as second_websocket:
+            data = second_websocket.receive_json()
+            assert data["message"] == "Hello World!"
+
+
+def test_ws_subscribe(superuser_token: str):
+    with client.websocket_connect("/ws", headers={"Authorization": f"Bearer {superuser_token}"}) as websocket:
+        assert websocket.receive_json()["message"] == "Hello World!"
+
+        websocket.send_json({"action": "subscribe", "sensor_ids": [1, 2], "min_interval": 10})
+        assert websocket.receive_json() == {
+            "all_sensors": False,
+            "sensor_ids": [1, 2],
+            "sensor_types": [],
+            "min_interval": 10,
+        }
 
-        try:
-            with client.websocket_connect("/ws", headers={"Authorization": f"Bearer {token}"}) as _:
-                pass
-        except WebSocketDisconnect as exception:
-            assert exception.code == 1008
+        websocket.send_json({"action": "unsubscribe", "sensor_ids": [2]})
+        assert websocket.receive_json()["sensor_ids"] == [1]
+
+        websocket.send_json({"action": "publish"})
+        assert websocket.receive_json()["detail"][0]["loc"] == ["action"]
+
+
+def test_ws_connect_binary_subprotocol(superuser_token: str):
+    with client.websocket_connect(
+        "/ws", headers={"Authorization": f"Bearer {superuser_token}"}, subprotocols=[BINARY_SUBPROTOCOL]
+    ) as websocket:
+        assert websocket.accepted_subprotocol == BINARY_SUBPROTOCOL
+        assert websocket.receive_json()["message"] == "Hello World!"
+
+
+def test_ws_connection_binary_message(token: str):
+    """
+    Asserts a binary message of the client closes the connection with 1003 and frees the slot of the user.
+    """
+    ws_handler = get_websocket_handler()
+    with client.websocket_connect("/ws", headers={"Authorization": f"Bearer {token}"}) as websocket:
+        websocket.receive_json()
+        user_id: int = next(iter(ws_handler._connections))
+        # The endpoint only expects text messages.
+        websocket.send_bytes(b"subscribe")
+        with pytest.raises(WebSocketDisconnect) as exception:
+            websocket.receive_json()
+        assert exception.value.code == status.WS_1003_UNSUPPORTED_DATA
+
+    assert user_id not in ws_handler._connections
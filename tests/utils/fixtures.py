@@ -2,7 +2,7 @@ import pytest_asyncio
 from sqlmodel import select
 
 from api.models.database_models import DBUser
-from api.utils.security import create_access_token, get_password_hash
+from api.utils.security import create_access_token, get_password_hash, get_user_cache
 from tests.utils.fake_db import async_fake_session_maker, initialize_fake_database
 
 
@@ -15,6 +15,8 @@ async def token() -> str:
         Returns the token fo the created user
     """
     await initialize_fake_database()
+    # Tests may delete and recreate users, so cached users could have outdated ids.
+    get_user_cache().clear()
     test_username: str = "test_user"
     async with async_fake_session_maker() as session:
         # Only create the user if not already existing.
@@ -38,6 +40,8 @@ async def superuser_token() -> str:
         Returns the token fo the created superuser
     """
     await initialize_fake_database()
+    # Tests may delete and recreate users, so cached users could have outdated ids.
+    get_user_cache().clear()
     test_username: str = "test_superuser"
     async with async_fake_session_maker() as session:
         # Only create the user if not already existing.
@@ -2,17 +2,19 @@ from typing import Any, Type
 
 import httpx
 import pytest
+from fastapi.testclient import TestClient
 from pytest_lazy_fixtures import lf
+from pytest_mock import MockerFixture
 from sqlmodel import delete, select
 
-from api.models.database_models import DatabaseModelBase, Sensor, SensorPermission
+from api.models.database_models import DatabaseModelBase, Sensor, SensorPermission, to_utc
 from api.models.enum_models import SensorTypeModel
 from api.utils.http_exceptions import INVALID_SENSOR_TYPE, MISSING_PRIVILEGES
 from tests.utils.assertions import assert_HTTPException_EQ
 from tests.utils.authentication_tests import _TestGetAuthentication, _TestPostAuthentication
-from tests.utils.fake_db import async_fake_session_maker
+from tests.utils.fake_db import async_fake_session_maker, override_get_engine
 from tests.utils.fixtures import token
-from tests.utils.sensor_utils import create_sensor, create_sensor_permission
+from tests.utils.sensor_utils import clear_sensor_permissions, create_sensor, create_sensor_permission
 
 
 class _TestSensorMixin:
@@ -79,9 +81,7 @@ class _TestCreateSensorBase(_TestPostAuthentication, _TestSensorMixin):
         """
         Asserts that the creation fails if the user has no write permissions for the sensor.
         """
-        async with async_fake_session_maker() as session:
-            await session.execute(delete(SensorPermission))
-            await session.commit()
+        await clear_sensor_permissions()
 
         response: httpx.Response = self.client.post(
             await self._get_path(), headers={"Authorization": f"Bearer {token}"}, json=self._get_data
@@ -112,6 +112,55 @@ class _TestCreateSensorBase(_TestPostAuthentication, _TestSensorMixin):
 
         assert response.json() == sensor_data.model_dump(mode="json")
 
+    @pytest.mark.asyncio
+    async def test_create_sensor_base_buffered(self, token: str, mocker: MockerFixture):
+        """
+        Assert that a buffered write waits until the row was group committed and returns the created row.
+        """
+        mocker.patch("api.utils.ingest_buffer.get_engine", override_get_engine)
+        await create_sensor_permission(token, await self._get_sensor(), write=True)
+
+        response: httpx.Response = self.client.post(
+            f"{await self._get_path()}?mode=buffered", headers={"Authorization": f"Bearer {token}"}, json=self._get_data
+        )
+        assert response.status_code == 201
+        assert response.json().get("id") is not None
+
+        async with async_fake_session_maker() as session:
+            sensor_data: DatabaseModelBase | None = await session.get(self._get_sql_model, response.json().get("id"))
+        assert sensor_data is not None
+        # SQLite drops the timezone, the API returns the UTC timestamp of the buffered row.
+        sensor_data.timestamp = to_utc(sensor_data.timestamp)
+        assert response.json() == sensor_data.model_dump(mode="json")
+
+    @pytest.mark.asyncio
+    async def test_create_sensor_base_accepted(self, token: str, mocker: MockerFixture):
+        """
+        Assert that an accepted write returns 202 immediately and the row is flushed at the latest on shutdown.
+        """
+        mocker.patch("api.utils.ingest_buffer.get_engine", override_get_engine)
+        mocker.patch("api.main.get_engine", override_get_engine)
+        mocker.patch("api.main.dispose_database")
+        # The websocket event loop is not needed and would bind its queue to the event loop of the TestClient.
+        mocker.patch("api.utils.websocket_connection_handler.WebsocketHandler.event_loop")
+        await create_sensor_permission(token, await self._get_sensor(), write=True)
+        async with async_fake_session_maker() as session:
+            await session.execute(delete(self._get_sql_model))
+            await session.commit()
+
+        with TestClient(self.client.app) as client:
+            response: httpx.Response = client.post(
+                f"{await self._get_path()}?mode=accepted",
+                headers={"Authorization": f"Bearer {token}"},
+                json=self._get_data,
+            )
+            assert response.status_code == 202
+            assert response.json().get("id") is None
+
+        async with async_fake_session_maker() as session:
+            result = await session.execute(select(self._get_sql_model))
+            assert len(result.scalars().all()) == 1
+
 
 class _TestGetSensorBase(_TestGetAuthentication, _TestSensorMixin):
     # ToDo Add test to check error when sensor is not existing
@@ -154,9 +203,7 @@ class _TestGetSensorBase(_TestGetAuthentication, _TestSensorMixin):
         """
         Asserts the request fails when the user does not have permissions to read the data.
         """
-        async with async_fake_session_maker() as session:
-            await session.execute(delete(SensorPermission))
-            await session.commit()
+        await clear_sensor_permissions()
 
         response: httpx.Response = self.client.get(await self._get_path(), headers={"Authorization": f"Bearer {token}"})
         assert_HTTPException_EQ(response, MISSING_PRIVILEGES)
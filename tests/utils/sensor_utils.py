@@ -2,7 +2,9 @@ from sqlmodel import delete
 
 from api.models.database_models import DBUser, Sensor, SensorPermission
 from api.models.enum_models import SensorTypeModel
+from api.utils.permissions import get_permission_index
 from api.utils.security import get_current_user
+from api.utils.sensor_utils import get_sensor_registry
 from tests.utils.fake_db import async_fake_session_maker
 from tests.utils.fixtures import token
 
@@ -14,6 +16,18 @@ async def clear_sensors():
     async with async_fake_session_maker() as session:
         await session.execute(delete(Sensor))
         await session.commit()
+    # SQLite reuses the ids of deleted sensors.
+    get_sensor_registry().clear()
+
+
+async def clear_sensor_permissions():
+    """
+    Clears all `SensorPermission`s from the testing database and the `PermissionIndex`.
+    """
+    async with async_fake_session_maker() as session:
+        await session.execute(delete(SensorPermission))
+        await session.commit()
+    get_permission_index().clear()
 
 
 async def create_sensor(
@@ -67,9 +81,8 @@ async def create_sensor_permission(token: str, sensor: Sensor, *, write: bool =
         write (bool): The write permission that should be set.
         read (bool): The read permission that should be set.
     """
+    await clear_sensor_permissions()
     async with async_fake_session_maker() as session:
-        await session.execute(delete(SensorPermission))
-        await session.commit()
         # We need to user from the token to create the correct sensor permission.
         user: DBUser = await get_current_user(token, session)
 
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from api.models.database_models import SensorDataBatchCreate
+from api.utils.aggregation import parse_bucket, select_tier
+from api.utils.rollups import DAILY, HOURLY, RollupTier, aggregate_rows
+
+
+@pytest.mark.parametrize(
+    "bucket, start, end, tier",
+    [
+        # The coarsest tier that divides the bucket is used
+        (timedelta(days=7), datetime(2024, 1, 1), datetime(2024, 2, 1), DAILY),
+        (timedelta(hours=6), datetime(2024, 1, 1), datetime(2024, 2, 1), HOURLY),
+        # A time range that cuts a day in half falls back to the hourly tier
+        (timedelta(days=1), datetime(2024, 1, 1, 12), datetime(2024, 2, 1), HOURLY),
+        # An end in the future does not have to be aligned
+        (timedelta(days=1), datetime(2024, 1, 1), datetime.now() + timedelta(days=1, minutes=1), DAILY),
+        # Buckets smaller than an hour or unaligned time ranges need the raw data
+        (timedelta(minutes=30), datetime(2024, 1, 1), datetime(2024, 2, 1), None),
+        (timedelta(hours=1), datetime(2024, 1, 1, 0, 30), datetime(2024, 2, 1), None),
+    ],
+)
+def test_select_tier(bucket: timedelta, start: datetime, end: datetime, tier: RollupTier | None):
+    """
+    Asserts that the coarsest rollup tier, which answers the query exactly, is selected.
+    """
+    start, end = start.replace(tzinfo=timezone.utc), end.replace(tzinfo=timezone.utc)
+    assert select_tier(bucket, start, end) is tier
+
+
+def test_parse_bucket_months():
+    """
+    Asserts that month buckets are parsed as calendar months and `m` still means minutes.
+    """
+    assert parse_bucket("3mo").months == 3
+    assert parse_bucket("3mo").duration is None
+    assert parse_bucket("3m").duration == timedelta(minutes=3)
+
+
+def test_aggregate_rows_sorted():
+    """
+    Asserts that the aggregated rows are sorted by sensor and period, so concurrent upserts lock rows in one order.
+    """
+    rows: list[dict] = [
+        {"sensor_id": sensor_id, "timestamp": datetime(2024, 1, day, tzinfo=timezone.utc), "voltage": None}
+        | {"temperature": 20.0, "humidity": 50.0, "pressure": 1000.0}
+        for sensor_id, day in [(2, 2), (1, 3), (2, 1), (1, 1)]
+    ]
+    periods: list[dict] = aggregate_rows(rows, DAILY.period_start)
+    assert [(period["sensor_id"], period["period_start"].day) for period in periods] == [(1, 1), (1, 3), (2, 1), (2, 2)]
+
+
+def test_batch_timestamps_to_utc():
+    """
+    Asserts that client supplied timestamps are normalized to UTC, naive timestamps are interpreted as UTC.
+    """
+    values: dict = {"temperature": 20.0, "humidity": 50.0, "pressure": 1000.0, "voltage": None}
+    naive: SensorDataBatchCreate = SensorDataBatchCreate(**values, timestamp="2024-01-01T23:30:00")
+    aware: SensorDataBatchCreate = SensorDataBatchCreate(**values, timestamp="2024-01-02T01:30:00+02:00")
+
+    assert naive.timestamp == datetime(2024, 1, 1, 23, 30, tzinfo=timezone.utc)
+    assert aware.timestamp.utcoffset() == timedelta(0)
+    assert DAILY.period_start(naive.timestamp) == DAILY.period_start(aware.timestamp)
@@ -0,0 +1,20 @@
+import io
+
+import pytest
+from pytest_mock import MockerFixture
+
+from api.utils.bulk_import import iter_lines
+
+
+@pytest.mark.asyncio
+async def test_iter_lines_across_chunks(mocker: MockerFixture):
+    """
+    Asserts that lines and multibyte characters split across read chunks are reassembled correctly.
+    """
+    mocker.patch("api.utils.bulk_import.READ_SIZE", 3)
+    file = io.BytesIO("a,b\r\n°C,123456\n\nlast".encode())
+
+    async def read(size: int) -> bytes:
+        return file.read(size)
+
+    assert [line async for line in iter_lines(read)] == ["a,b", "°C,123456", "", "last"]
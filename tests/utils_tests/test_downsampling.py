@@ -0,0 +1,30 @@
+import numpy as np
+
+from api.utils.downsampling import lttb
+
+
+def test_lttb_keeps_spikes():
+    """
+    Asserts that LTTB keeps the first and last point as well as short spikes.
+    """
+    x: np.ndarray = np.arange(1000, dtype=np.float64)
+    y: np.ndarray = np.sin(x / 50)
+    y[500] = 25.0
+
+    selected: np.ndarray = lttb(x, y, 50)
+
+    assert len(selected) == 50
+    assert selected[0] == 0
+    assert selected[-1] == 999
+    assert 500 in selected
+    assert np.all(np.diff(selected) > 0)
+
+
+def test_lttb_below_threshold():
+    """
+    Asserts that all points are returned if there are not more points than requested.
+    """
+    x: np.ndarray = np.arange(10, dtype=np.float64)
+
+    assert list(lttb(x, x, 10)) == list(range(10))
+    assert list(lttb(x, x, 20)) == list(range(10))
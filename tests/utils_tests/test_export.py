@@ -0,0 +1,46 @@
+from datetime import datetime, timezone
+
+import pyarrow as pa
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from api.models.database_models import SensorState
+from api.utils.export import arrow_schema, copy_query, export_query, parse_copy_csv
+
+
+def test_copy_query():
+    """
+    Asserts that timestamps are selected as microseconds since the epoch, all other columns unchanged.
+    """
+    query = copy_query(SensorState, export_query(SensorState, 1, None, None))
+    sql: str = str(query.compile(dialect=asyncpg.dialect()))
+
+    assert "EXTRACT(epoch FROM sensorstate.timestamp)" in sql
+    assert [column.name for column in query.selected_columns] == [
+        column.name for column in SensorState.__table__.columns
+    ]
+
+
+def test_parse_copy_csv():
+    """
+    Asserts that the COPY CSV output of Postgres is parsed into the Arrow schema of the export.
+    """
+    schema: pa.Schema = arrow_schema(SensorState)
+    table: pa.Table = parse_copy_csv(schema, b"1,t,,1704067200000000,2\n2,f,3.3,1704067201500000,2\n")
+
+    assert table.schema == schema
+    assert table.to_pylist() == [
+        {
+            "id": 1,
+            "state": True,
+            "voltage": None,
+            "timestamp": datetime(2024, 1, 1, tzinfo=timezone.utc),
+            "sensor_id": 2,
+        },
+        {
+            "id": 2,
+            "state": False,
+            "voltage": 3.3,
+            "timestamp": datetime(2024, 1, 1, 0, 0, 1, 500000, tzinfo=timezone.utc),
+            "sensor_id": 2,
+        },
+    ]
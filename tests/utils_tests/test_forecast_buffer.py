@@ -1,40 +1,15 @@
-import asyncio
-import copy
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 import pytest
 
 from api.models.forecast_models import Forecast
-from api.utils.forecast_buffer import ForecastBuffer, ForecastBufferObject
+from api.utils.forecast_buffer import ForecastBuffer, get_forecast_size
 from tests.utils.forecast_dump import forecast_json_dump
 
 lat, lon = "10", "10"
 forecast: Forecast = Forecast(**forecast_json_dump)
 
 
-@pytest.mark.asyncio
-async def test_forecast_buffer_object():
-    """
-    Asserts the forecast buffer object works as expected
-    """
-    buffer_object1: ForecastBufferObject = ForecastBufferObject(lat, lon, forecast, timedelta(minutes=10))
-    buffer_object2: ForecastBufferObject = copy.deepcopy(buffer_object1)
-
-    # Assert equal works as expected
-    assert buffer_object1 == buffer_object2
-    buffer_object2.lat = "20"
-    assert buffer_object1 != buffer_object2
-
-    # Assert latlon is correctly returned
-    assert buffer_object1.latlon == f"{lat};{lon}"
-
-    # Assert is_expired works as expected
-    assert not buffer_object1.is_expired
-    buffer_object1.valid_until = datetime.utcnow()
-    await asyncio.sleep(0.1)
-    assert buffer_object1.is_expired
-
-
 @pytest.mark.asyncio
 async def test_forecast_buffer():
     """
@@ -45,14 +20,42 @@ async def test_forecast_buffer():
     # Assert the correct forecast is returned if requested
     buffer.add(lat, lon, forecast)
     assert buffer.get(lat, lon) == forecast
+    assert buffer.get(lon, lat + "0") is None
+    assert buffer.stats.hits == 1
+    assert buffer.stats.misses == 1
 
     # Assert that expired entries get ignored
-    buffer.cache[0].valid_until = datetime.utcnow()
-    await asyncio.sleep(0.1)
-    assert buffer.get(lat, lon) is None
-    assert len(buffer) == 0
-
-    # Assert that the buffer does not get larger than the defined max_size
-    for _ in range(buffer.max_size + 1):
-        buffer.add(lat, lon, forecast)
+    expired_buffer: ForecastBuffer = ForecastBuffer(time_until_expired=timedelta(seconds=-1))
+    expired_buffer.add(lat, lon, forecast)
+    assert expired_buffer.get(lat, lon) is None
+    assert len(expired_buffer) == 0
+
+
+def test_forecast_buffer_lru():
+    """
+    Assert that the buffer does not get larger than the defined max_size and evicts the least recently used entry.
+    """
+    buffer: ForecastBuffer = ForecastBuffer(size=3)
+    for index in range(buffer.max_size):
+        buffer.add(str(index), lon, forecast)
+    assert buffer.get("0", lon) == forecast
+
+    buffer.add("3", lon, forecast)
+
     assert len(buffer) == buffer.max_size
+    assert buffer.get("0", lon) == forecast
+    assert buffer.get("1", lon) is None
+    assert buffer.stats.evictions == 1
+
+
+def test_forecast_buffer_max_bytes():
+    """
+    Assert that the buffer can be bounded by the approximate size of the forecasts.
+    """
+    buffer: ForecastBuffer = ForecastBuffer(max_bytes=get_forecast_size(forecast) * 2)
+    for index in range(3):
+        buffer.add(str(index), lon, forecast)
+
+    assert len(buffer) == 2
+    assert buffer.get("0", lon) is None
+    assert buffer.stats.weight == get_forecast_size(forecast) * 2
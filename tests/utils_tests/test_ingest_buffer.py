@@ -0,0 +1,127 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlmodel import delete, select
+
+from api.models.database_models import Sensor, SensorData
+from api.utils.ingest_buffer import IngestBuffer
+from tests.utils.fake_db import async_fake_session_maker, fake_engine, initialize_fake_database, override_get_engine
+from tests.utils.sensor_utils import create_sensor
+
+
+async def prepare_database() -> Sensor:
+    """
+    Creates a new sensor in the testing database and removes all existing `SensorData`.
+
+    Returns:
+        The created `Sensor`.
+    """
+    await initialize_fake_database()
+    async with async_fake_session_maker() as session:
+        await session.execute(delete(SensorData))
+        await session.commit()
+    return await create_sensor()
+
+
+async def count_sensor_data() -> int:
+    async with async_fake_session_maker() as session:
+        result = await session.execute(select(SensorData))
+        return len(result.scalars().all())
+
+
+def new_sensor_data(sensor: Sensor) -> SensorData:
+    return SensorData(sensor_id=sensor.id, temperature=1.23, humidity=54.32, pressure=1234, voltage=3.21)
+
+
+@pytest.mark.asyncio
+async def test_ingest_buffer_flush_on_max_rows(mocker: MockerFixture):
+    """
+    Asserts that all rows are written in a single flush as soon as `max_rows` rows are pending.
+    """
+    mocker.patch("api.utils.ingest_buffer.get_engine", override_get_engine)
+    add_events_mock = mocker.patch("api.utils.websocket_connection_handler.WebsocketHandler.add_events")
+    sensor: Sensor = await prepare_database()
+    buffer: IngestBuffer = IngestBuffer(max_rows=3, max_delay=timedelta(hours=1))
+
+    futures = [buffer.add(new_sensor_data(sensor)) for _ in range(3)]
+    assert len(buffer) == 0
+
+    rows: list[SensorData] = await asyncio.gather(*futures)
+    assert all(row.id is not None for row in rows)
+    assert await count_sensor_data() == 3
+    add_events_mock.assert_called_once_with(rows)
+
+
+@pytest.mark.asyncio
+async def test_ingest_buffer_flush_on_max_delay(mocker: MockerFixture):
+    """
+    Asserts that pending rows are written once `max_delay` has passed.
+    """
+    mocker.patch("api.utils.ingest_buffer.get_engine", override_get_engine)
+    mocker.patch("api.utils.websocket_connection_handler.WebsocketHandler.add_events")
+    sensor: Sensor = await prepare_database()
+    buffer: IngestBuffer = IngestBuffer(max_rows=100, max_delay=timedelta(milliseconds=10))
+
+    future = buffer.add(new_sensor_data(sensor))
+    assert len(buffer) == 1
+    assert not future.done()
+
+    row: SensorData = await asyncio.wait_for(future, 1)
+    assert row.id is not None
+    assert await count_sensor_data() == 1
+
+
+@pytest.mark.asyncio
+async def test_ingest_buffer_flush(mocker: MockerFixture):
+    """
+    Asserts that `flush` writes all pending rows immediately, e.g. during the shutdown of the application.
+    """
+    mocker.patch("api.utils.ingest_buffer.get_engine", override_get_engine)
+    mocker.patch("api.utils.websocket_connection_handler.WebsocketHandler.add_events")
+    sensor: Sensor = await prepare_database()
+    buffer: IngestBuffer = IngestBuffer(max_rows=100, max_delay=timedelta(hours=1))
+
+    for _ in range(2):
+        buffer.add(new_sensor_data(sensor))
+    await buffer.flush()
+
+    assert len(buffer) == 0
+    assert await count_sensor_data() == 2
+
+
+@pytest.mark.asyncio
+async def test_ingest_buffer_flush_error(mocker: MockerFixture):
+    """
+    Asserts that a flush failing after all retries is reported to every waiting request and counted as lost.
+    """
+    get_engine_mock = mocker.patch(
+        "api.utils.ingest_buffer.get_engine", side_effect=RuntimeError("Database unavailable")
+    )
+    buffer: IngestBuffer = IngestBuffer(max_rows=1, max_retries=2, retry_delay=timedelta(milliseconds=1))
+
+    with pytest.raises(RuntimeError):
+        await buffer.add(SensorData(sensor_id=1, temperature=1.23, humidity=54.32, pressure=1234, voltage=3.21))
+    assert get_engine_mock.call_count == 3
+    assert buffer.stats.retries == 2
+    assert buffer.stats.lost_rows == 1
+
+
+@pytest.mark.asyncio
+async def test_ingest_buffer_flush_retry(mocker: MockerFixture):
+    """
+    Asserts that a failed flush is retried, so a short database outage does not lose accepted rows.
+    """
+    mocker.patch("api.utils.ingest_buffer.get_engine", side_effect=[RuntimeError("Database unavailable"), fake_engine])
+    mocker.patch("api.utils.websocket_connection_handler.WebsocketHandler.add_events")
+    sensor: Sensor = await prepare_database()
+    buffer: IngestBuffer = IngestBuffer(max_rows=100, max_delay=timedelta(hours=1), retry_delay=timedelta(0))
+
+    buffer.add(new_sensor_data(sensor))
+    await buffer.flush()
+
+    assert await count_sensor_data() == 1
+    assert buffer.stats.retries == 1
+    assert buffer.stats.written_rows == 1
+    assert buffer.stats.lost_rows == 0
@@ -0,0 +1,78 @@
+import pytest
+from fastapi import HTTPException
+from pytest_mock import MockerFixture
+
+from api.models.database_models import DBUser, Sensor, SensorPermission
+from api.models.event_models import EventBusReconnected, PermissionChanged
+from api.utils.event_bus import InProcessEventBus
+from api.utils.http_exceptions import MISSING_PRIVILEGES
+from api.utils.permissions import (
+    PermissionIndex,
+    PermissionType,
+    get_permission_index,
+    get_user_read_permissions,
+    get_user_write_permissions,
+)
+from api.utils.security import get_current_user
+from tests.utils.fake_db import async_fake_session_maker
+from tests.utils.fixtures import token
+from tests.utils.sensor_utils import clear_sensor_permissions, create_sensor
+
+
+@pytest.mark.asyncio
+async def test_permission_index(token: str, mocker: MockerFixture):
+    """
+    Asserts the permissions of a user are loaded once and changes are applied to the index without reloading.
+    """
+    sensor: Sensor = await create_sensor()
+    await clear_sensor_permissions()
+    async with async_fake_session_maker() as session:
+        user: DBUser = await get_current_user(token, session)
+        session.add(SensorPermission(user_id=user.id, sensor_id=sensor.id, read=True, write=False))
+        await session.commit()
+
+        execute_spy = mocker.spy(session, "execute")
+        assert await get_user_read_permissions(session, user, sensor.id)
+        with pytest.raises(HTTPException) as exception:
+            await get_user_write_permissions(session, user, sensor.id)
+        assert exception.value == MISSING_PRIVILEGES
+        assert execute_spy.call_count == 1
+
+        index: PermissionIndex = get_permission_index()
+        index.update(user.id, sensor.id, read=False, write=True)
+        assert await get_user_write_permissions(session, user, sensor.id)
+        assert not await index.has_permission(session, user.id, sensor.id, PermissionType.READ)
+
+        index.remove(user.id, sensor.id)
+        assert not await index.has_permission(session, user.id, sensor.id, PermissionType.WRITE)
+        assert execute_spy.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_permission_index_event_bus(token: str, mocker: MockerFixture):
+    """
+    Asserts changes published on the event bus are applied by the indexes of all workers
+    and everything is reloaded once the bus reconnected.
+    """
+    sensor: Sensor = await create_sensor()
+    await clear_sensor_permissions()
+    event_bus: InProcessEventBus = InProcessEventBus()
+    indexes: list[PermissionIndex] = [PermissionIndex(event_bus=event_bus) for _ in range(2)]
+    async with async_fake_session_maker() as session:
+        user: DBUser = await get_current_user(token, session)
+        for index in indexes:
+            assert not await index.has_permission(session, user.id, sensor.id, PermissionType.READ)
+
+        await event_bus.publish([PermissionChanged(user_id=user.id, sensor_id=sensor.id, read=True)])
+        for index in indexes:
+            assert await index.has_permission(session, user.id, sensor.id, PermissionType.READ)
+
+        await event_bus.publish([PermissionChanged(user_id=user.id, sensor_id=sensor.id, deleted=True)])
+        for index in indexes:
+            assert not await index.has_permission(session, user.id, sensor.id, PermissionType.READ)
+
+        execute_spy = mocker.spy(session, "execute")
+        event_bus._deliver(EventBusReconnected())
+        for index in indexes:
+            assert not await index.has_permission(session, user.id, sensor.id, PermissionType.READ)
+        assert execute_spy.call_count == 2
@@ -1,4 +1,5 @@
 import datetime
+import threading
 
 import pytest
 from fastapi import HTTPException, WebSocketException
@@ -6,8 +7,9 @@ from pytest_mock import MockerFixture
 from sqlmodel import delete
 
 from api.models.database_models import DBUser
+from api.utils import security
 from api.utils.http_exceptions import INVALID_CREDENTIALS
-from api.utils.security import create_access_token, get_current_user, get_current_user_ws
+from api.utils.security import create_access_token, get_current_user, get_current_user_ws, get_user_cache
 from tests.utils.fake_db import async_fake_session_maker, initialize_fake_database
 
 
@@ -45,3 +47,49 @@ async def test_get_current_user_ws_invalid_token(token_data: dict, mocker: Mocke
 
         # assert jwt_decode_mock.assert_called_once()
         assert exception.value.code == 1008
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_cached(mocker: MockerFixture):
+    """
+    Asserts repeated requests with the same token are answered from the user cache until the user is invalidated.
+    """
+    await initialize_fake_database()
+    get_user_cache().clear()
+    async with async_fake_session_maker() as session:
+        await session.execute(delete(DBUser).where(DBUser.username == "cached_user"))
+        session.add(DBUser(username="cached_user", hashed_password=""))
+        await session.commit()
+
+        access_token = create_access_token(data={"sub": "cached_user"})
+        get_user_mock = mocker.spy(security, "get_user")
+        hits: int = get_user_cache().hits
+
+        for _ in range(3):
+            assert (await get_current_user(access_token, session)).username == "cached_user"
+        assert get_user_mock.call_count == 1
+
+        security.invalidate_cached_user("cached_user")
+        await get_current_user(access_token, session)
+        assert get_user_mock.call_count == 2
+        assert get_user_cache().hits == hits + 2
+
+
+@pytest.mark.asyncio
+async def test_password_hashing_off_event_loop(mocker: MockerFixture):
+    """
+    Asserts passwords are hashed and verified in the thread pool instead of the event loop thread.
+    """
+    threads: set[int] = set()
+    verify = security.pwd_context.verify
+
+    def verify_spy(*args):
+        threads.add(threading.get_ident())
+        return verify(*args)
+
+    mocker.patch.object(security.pwd_context, "verify", verify_spy)
+
+    hashed_password: str = await security.get_password_hash_async("test_password")
+    assert await security.verify_password_async("test_password", hashed_password)
+    assert not await security.verify_password_async("wrong_password", hashed_password)
+    assert threads and threading.get_ident() not in threads
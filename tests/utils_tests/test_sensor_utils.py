@@ -0,0 +1,40 @@
+import pytest
+from pytest_mock import MockerFixture
+
+from api.models.database_models import Sensor
+from api.models.enum_models import SensorTypeModel
+from api.utils.sensor_utils import get_is_valid_sensor_type, get_sensor_from_db, get_sensor_registry
+from tests.utils.fake_db import async_fake_session_maker
+from tests.utils.sensor_utils import clear_sensors, create_sensor
+
+
+@pytest.mark.asyncio
+async def test_sensor_registry(mocker: MockerFixture):
+    """
+    Asserts sensors are answered from the registry after it was loaded, without querying the database.
+    """
+    sensor: Sensor = await create_sensor(sensor_type=SensorTypeModel.STATE)
+    async with async_fake_session_maker() as session:
+        await get_sensor_registry().load(session)
+
+        get_spy = mocker.spy(session, "get")
+        cached_sensor: Sensor = await get_sensor_from_db(session, sensor.id)
+        assert cached_sensor.name == sensor.name
+        assert await get_is_valid_sensor_type(SensorTypeModel.STATE, cached_sensor)
+        assert get_spy.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_sensor_registry_miss():
+    """
+    Asserts unknown sensors (e.g. created by another worker) are loaded from the database on the first access.
+    """
+    await clear_sensors()
+    sensor: Sensor = Sensor(name="Sensor1", type=SensorTypeModel.ENVIRONMENTAL)
+    async with async_fake_session_maker() as session:
+        session.add(sensor)
+        await session.commit()
+        await session.refresh(sensor)
+
+        assert (await get_sensor_from_db(session, sensor.id)).id == sensor.id
+        assert get_sensor_registry().stats.size == 1
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from api.utils.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_single_flight():
+    """
+    Asserts concurrent calls for the same key share one call, while calls for other keys do not.
+    """
+    single_flight: SingleFlight[str, int] = SingleFlight()
+    calls: list[str] = []
+
+    async def function(key: str) -> int:
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    results: list[int] = await asyncio.gather(
+        *(single_flight.do(key, lambda key=key: function(key)) for key in ["a"] * 10 + ["b"] * 10)
+    )
+    assert sorted(calls) == ["a", "b"]
+    assert set(results) == {2}
+    assert len(single_flight) == 0
+
+    # Once finished, the next call does the work again.
+    assert await single_flight.do("a", lambda: function("a")) == 3
+
+
+@pytest.mark.asyncio
+async def test_single_flight_exception():
+    """
+    Asserts an exception is raised for all callers and the key is released afterward.
+    """
+    single_flight: SingleFlight[str, int] = SingleFlight()
+
+    async def function() -> int:
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream error")
+
+    results: list[int | BaseException] = await asyncio.gather(
+        *(single_flight.do("a", function) for _ in range(5)), return_exceptions=True
+    )
+    assert all(isinstance(result, ValueError) for result in results)
+    assert len(single_flight) == 0
+
+
+@pytest.mark.asyncio
+async def test_single_flight_cancelled_caller():
+    """
+    Asserts a cancelled caller does not cancel the call the other callers are waiting for.
+    """
+    single_flight: SingleFlight[str, int] = SingleFlight()
+
+    async def function() -> int:
+        await asyncio.sleep(0.01)
+        return 1
+
+    cancelled: asyncio.Task[int] = asyncio.ensure_future(single_flight.do("a", function))
+    waiting: asyncio.Task[int] = asyncio.ensure_future(single_flight.do("a", function))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+
+    assert await waiting == 1
+    assert cancelled.cancelled()
@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+from api.utils.ttl_cache import TTLCache
+
+
+def test_ttl_cache_lru_eviction():
+    """
+    Asserts the least recently used entry is evicted when the cache is full.
+    """
+    cache: TTLCache[str, int] = TTLCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats.model_dump() == {
+        "size": 2,
+        "max_size": 2,
+        "hits": 3,
+        "misses": 1,
+        "evictions": 1,
+        "weight": None,
+        "max_weight": None,
+    }
+
+
+def test_ttl_cache_expiry():
+    """
+    Asserts expired entries are not returned and removed.
+    """
+    cache: TTLCache[str, int] = TTLCache(ttl=timedelta(seconds=-1))
+    cache.set("a", 1)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_invalidate():
+    """
+    Asserts all entries matching the predicate are removed.
+    """
+    cache: TTLCache[tuple[str, int], int] = TTLCache()
+    cache.set(("a", 1), 1)
+    cache.set(("a", 2), 2)
+    cache.set(("b", 1), 3)
+
+    cache.invalidate(lambda key: key[0] == "a")
+
+    assert len(cache) == 1
+    assert cache.get(("b", 1)) == 3
+
+
+def test_ttl_cache_weight_eviction():
+    """
+    Asserts the least recently used entries are evicted when the summed weight exceeds the maximum.
+    """
+    cache: TTLCache[str, str] = TTLCache(max_weight=10, weigher=len)
+    cache.set("a", "1234")
+    cache.set("b", "1234")
+    cache.set("a", "123")
+    assert cache.weight == 7
+
+    cache.set("c", "12345")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "123"
+    assert cache.stats.weight == 8
+    assert cache.stats.max_weight == 10
+    assert cache.stats.evictions == 1
+
+    cache.invalidate(lambda key: key == "a")
+    assert cache.weight == 5
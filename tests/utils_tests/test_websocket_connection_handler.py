@@ -0,0 +1,457 @@
+import asyncio
+import json
+
+import pytest
+from pytest_mock import MockerFixture
+
+from api.models.database_models import DBUser, Sensor, SensorData
+from api.models.enum_models import SensorTypeModel, WebsocketAction, WebsocketOverflowPolicy
+from api.models.event_models import EventBusReconnected, PermissionChanged
+from api.models.websocket_models import WebsocketSubscription, WebsocketSubscriptionState
+from api.utils.event_bus import InProcessEventBus
+from api.utils.security import get_current_user
+from api.utils.websocket_connection_handler import WebsocketConnection, WebsocketHandler
+from api.utils.websocket_encoding import decode_event
+from tests.utils.fake_db import async_fake_session_maker
+from tests.utils.fixtures import superuser_token, token
+from tests.utils.sensor_utils import create_sensor_permission, create_sensors
+
+
+class FakeWebSocket:
+    """
+    Records the messages sent to a connection.
+    """
+
+    def __init__(self):
+        self.messages: list[str | bytes] = []
+        self.close_code: int | None = None
+
+    async def send_text(self, data: str) -> None:
+        self.messages.append(data)
+
+    async def send_bytes(self, data: bytes) -> None:
+        self.messages.append(data)
+
+    async def close(self, code: int) -> None:
+        self.close_code = code
+
+
+@pytest.mark.asyncio
+async def test_subscription_index(token: str, superuser_token: str):
+    """
+    Asserts connections are subscribed to the sensors they may read and permission changes are applied.
+    """
+    sensors: list[Sensor] = await create_sensors()
+    await create_sensor_permission(token, sensors[0], read=True)
+    handler: WebsocketHandler = WebsocketHandler(max_connections_per_user=2)
+
+    async with async_fake_session_maker() as session:
+        user: DBUser = await get_current_user(token, session)
+        superuser: DBUser = await get_current_user(superuser_token, session)
+        phone: WebsocketConnection = await handler.add(session, user, FakeWebSocket())
+        display: WebsocketConnection = await handler.add(session, user, FakeWebSocket())
+        dashboard: WebsocketConnection = await handler.add(session, superuser, FakeWebSocket())
+        assert not await handler.add(session, user, FakeWebSocket())
+
+    assert handler.get_subscribers(sensors[0].id) == {phone, display, dashboard}
+    assert handler.get_subscribers(sensors[1].id) == {dashboard}
+
+    handler.update_permission(user.id, sensors[1].id, read=True)
+    handler.update_permission(user.id, sensors[0].id, read=False)
+    assert handler.get_subscribers(sensors[0].id) == {dashboard}
+    assert handler.get_subscribers(sensors[1].id) == {phone, display, dashboard}
+
+    assert handler.remove(phone)
+    assert handler.get_subscribers(sensors[1].id) == {display, dashboard}
+    assert handler.remove(display)
+    assert handler.remove(dashboard)
+    assert handler.get_subscribers(sensors[1].id) == set()
+
+
+@pytest.mark.asyncio
+async def test_subscription_index_event_bus(token: str):
+    """
+    Asserts permission changes published on the event bus are applied by the handlers of all workers
+    and connections are closed once the bus reconnected, as changes may have been missed.
+    """
+    sensors: list[Sensor] = await create_sensors()
+    await create_sensor_permission(token, sensors[0], read=True)
+    event_bus: InProcessEventBus = InProcessEventBus()
+    handlers: list[WebsocketHandler] = [WebsocketHandler(event_bus=event_bus) for _ in range(2)]
+
+    async with async_fake_session_maker() as session:
+        user: DBUser = await get_current_user(token, session)
+        connections: list[WebsocketConnection] = [
+            await handler.add(session, user, FakeWebSocket()) for handler in handlers
+        ]
+
+    await event_bus.publish(
+        [
+            PermissionChanged(user_id=user.id, sensor_id=sensors[0].id, deleted=True),
+            PermissionChanged(user_id=user.id, sensor_id=sensors[1].id, read=True),
+        ]
+    )
+    for handler, connection in zip(handlers, connections):
+        assert handler.get_subscribers(sensors[0].id) == set()
+        assert handler.get_subscribers(sensors[1].id) == {connection}
+
+    event_bus._deliver(EventBusReconnected())
+    await asyncio.sleep(0)
+    for handler, connection in zip(handlers, connections):
+        assert connection.websocket.close_code == 1012
+        handler.remove(connection)
+
+
+@pytest.mark.asyncio
+async def test_subscription_index_device_key(superuser_token: str):
+    """
+    Asserts connections restricted by a device key are only subscribed to the sensors of the key.
+    """
+    sensors: list[Sensor] = await create_sensors()
+    handler: WebsocketHandler = WebsocketHandler()
+
+    async with async_fake_session_maker() as session:
+        superuser: DBUser = await get_current_user(superuser_token, session)
+        connection: WebsocketConnection = await handler.add(
+            session, superuser, FakeWebSocket(), frozenset({sensors[0].id})
+        )
+
+    assert handler.get_subscribers(sensors[0].id) == {connection}
+    assert handler.get_subscribers(sensors[1].id) == set()
+
+
+@pytest.mark.asyncio
+async def test_event_loop_sends_to_subscribers(token: str, superuser_token: str):
+    """
+    Asserts events are only sent to the connections subscribed to their sensor.
+    """
+    sensors: list[Sensor] = await create_sensors()
+    await create_sensor_permission(token, sensors[0], read=True)
+    handler: WebsocketHandler = WebsocketHandler()
+    user_websocket: FakeWebSocket = FakeWebSocket()
+    superuser_websocket: FakeWebSocket = FakeWebSocket()
+
+    connections: list[WebsocketConnection] = []
+    async with async_fake_session_maker() as session:
+        for user_token, websocket in ((token, user_websocket), (superuser_token, superuser_websocket)):
+            connections.append(await handler.add(session, await get_current_user(user_token, session), websocket))
+            connections[-1].start()
+
+    task = asyncio.create_task(handler.event_loop())
+    await handler.add_events(
+        [
+            SensorData(id=1, temperature=1.0, humidity=1.0, pressure=1.0, voltage=1.0, sensor_id=sensors[0].id),
+            SensorData(id=2, temperature=2.0, humidity=2.0, pressure=2.0, voltage=2.0, sensor_id=sensors[1].id),
+        ]
+    )
+    await handler._message_queue.join()
+    await asyncio.sleep(0)
+    task.cancel()
+    for connection in connections:
+        connection.stop()
+
+    assert [json.loads(message)["id"] for message in user_websocket.messages] == [1]
+    assert [json.loads(message)["id"] for message in superuser_websocket.messages] == [1, 2]
+
+
+@pytest.mark.parametrize(
+    "overflow_policy, expected_messages",
+    [
+        (WebsocketOverflowPolicy.DROP_OLDEST, ["b", "c"]),
+        (WebsocketOverflowPolicy.COALESCE, ["c", "b"]),
+        (WebsocketOverflowPolicy.DISCONNECT, []),
+    ],
+)
+@pytest.mark.asyncio
+async def test_connection_overflow(overflow_policy: WebsocketOverflowPolicy, expected_messages: list[str]):
+    """
+    Asserts a full outbound queue is handled according to the `WebsocketOverflowPolicy`.
+    """
+    websocket: FakeWebSocket = FakeWebSocket()
+    connection: WebsocketConnection = WebsocketConnection(
+        DBUser(id=1, username="slow", hashed_password=""), websocket, frozenset(), 2, overflow_policy
+    )
+    connection.send(1, "a")
+    connection.send(2, "b")
+    connection.send(1, "c")
+
+    connection.start()
+    await asyncio.sleep(0.01)
+    connection.stop()
+
+    assert websocket.messages == expected_messages
+    if overflow_policy is WebsocketOverflowPolicy.DISCONNECT:
+        assert websocket.close_code == 1013
+
+
+def test_connection_subscriptions():
+    """
+    Asserts a connection only wants the events it subscribed to once it sent a subscribe message.
+    """
+    connection: WebsocketConnection = WebsocketConnection(
+        DBUser(id=1, username="subscriber", hashed_password=""),
+        FakeWebSocket(),
+        frozenset(),
+        10,
+        WebsocketOverflowPolicy.DROP_OLDEST,
+    )
+    assert connection.wants(1, SensorTypeModel.ENVIRONMENTAL)
+    assert connection.wants(2, SensorTypeModel.STATE)
+
+    state: WebsocketSubscriptionState = connection.update_subscription(
+        WebsocketSubscription(action=WebsocketAction.SUBSCRIBE, sensor_ids=[1], sensor_types=[SensorTypeModel.STATE])
+    )
+    assert state == WebsocketSubscriptionState(
+        all_sensors=False, sensor_ids=[1], sensor_types=[SensorTypeModel.STATE], min_interval=0
+    )
+    assert connection.wants(1, SensorTypeModel.ENVIRONMENTAL)
+    assert not connection.wants(2, SensorTypeModel.ENVIRONMENTAL)
+    assert connection.wants(3, SensorTypeModel.STATE)
+
+    connection.update_subscription(WebsocketSubscription(action=WebsocketAction.UNSUBSCRIBE, sensor_ids=[1]))
+    assert not connection.wants(1, SensorTypeModel.ENVIRONMENTAL)
+
+
+def test_connection_rate_limit():
+    """
+    Asserts `min_interval` limits the events per sensor.
+    """
+    connection: WebsocketConnection = WebsocketConnection(
+        DBUser(id=1, username="subscriber", hashed_password=""),
+        FakeWebSocket(),
+        frozenset(),
+        10,
+        WebsocketOverflowPolicy.DROP_OLDEST,
+    )
+    connection.update_subscription(WebsocketSubscription(action=WebsocketAction.SUBSCRIBE, min_interval=10))
+    assert connection.wants(1, SensorTypeModel.ENVIRONMENTAL)
+    assert not connection.wants(1, SensorTypeModel.ENVIRONMENTAL)
+    assert connection.wants(2, SensorTypeModel.ENVIRONMENTAL)
+
+
+@pytest.mark.asyncio
+async def test_replay_missed_events(token: str, superuser_token: str):
+    """
+    Asserts events get sequential ids and reconnecting clients get the readable events newer than their last one.
+    """
+    sensors: list[Sensor] = await create_sensors()
+    await create_sensor_permission(token, sensors[0], read=True)
+    handler: WebsocketHandler = WebsocketHandler(replay_size=2)
+
+    task = asyncio.create_task(handler.event_loop())
+    await handler.add_events(
+        [
+            SensorData(id=index, temperature=1.0, humidity=1.0, pressure=1.0, voltage=1.0, sensor_id=sensor.id)
+            for index, sensor in enumerate([sensors[0], sensors[1], sensors[0], sensors[0]])
+        ]
+    )
+    await handler._message_queue.join()
+    task.cancel()
+
+    user_websocket: FakeWebSocket = FakeWebSocket()
+    superuser_websocket: FakeWebSocket = FakeWebSocket()
+    async with async_fake_session_maker() as session:
+        connections: list[WebsocketConnection] = [
+            await handler.add(
+                session, await get_current_user(token, session), user_websocket, last_event_id=1, epoch=handler.epoch
+            ),
+            await handler.add(
+                session,
+                await get_current_user(superuser_token, session),
+                superuser_websocket,
+                last_event_id=0,
+                epoch=handler.epoch,
+            ),
+        ]
+    for connection in connections:
+        connection.start()
+    await asyncio.sleep(0.01)
+    for connection in connections:
+        connection.stop()
+
+    # Only the latest two events of the first sensor are kept.
+    assert [json.loads(message)["event_id"] for message in user_websocket.messages] == [3, 4]
+    assert [json.loads(message)["event_id"] for message in superuser_websocket.messages] == [2, 3, 4]
+    assert [json.loads(message)["id"] for message in superuser_websocket.messages] == [1, 2, 3]
+    # The first event of the first sensor was missed by the superuser, but is no longer kept.
+    assert not connections[0].resync
+    assert connections[1].resync
+
+
+@pytest.mark.parametrize("overflow_policy", list(WebsocketOverflowPolicy))
+@pytest.mark.asyncio
+async def test_replay_bypasses_queue_size(superuser_token: str, overflow_policy: WebsocketOverflowPolicy):
+    """
+    Asserts all missed events of several sensors are replayed, even if they exceed the queue size.
+    """
+    sensors: list[Sensor] = await create_sensors()
+    handler: WebsocketHandler = WebsocketHandler(max_queue_size=1, overflow_policy=overflow_policy)
+
+    task = asyncio.create_task(handler.event_loop())
+    await handler.add_events(
+        [
+            SensorData(id=index, temperature=1.0, humidity=1.0, pressure=1.0, voltage=1.0, sensor_id=sensor.id)
+            for index, sensor in enumerate([sensors[0], sensors[1], sensors[0], sensors[1]])
+        ]
+    )
+    await handler._message_queue.join()
+    task.cancel()
+
+    websocket: FakeWebSocket = FakeWebSocket()
+    async with async_fake_session_maker() as session:
+        superuser: DBUser = await get_current_user(superuser_token, session)
+        connection: WebsocketConnection = await handler.add(
+            session, superuser, websocket, last_event_id=0, epoch=handler.epoch
+        )
+    assert connection.queued == 4
+    connection.start()
+    await asyncio.sleep(0.01)
+    connection.stop()
+
+    assert [json.loads(message)["id"] for message in websocket.messages] == [0, 1, 2, 3]
+    assert websocket.close_code is None
+    assert not connection.resync
+
+
+@pytest.mark.asyncio
+async def test_replay_other_epoch(superuser_token: str):
+    """
+    Asserts clients reconnecting with the event id of another worker / epoch are told to resync instead of replaying.
+    """
+    sensors: list[Sensor] = await create_sensors()
+    handler: WebsocketHandler = WebsocketHandler()
+    other_handler: WebsocketHandler = WebsocketHandler()
+    assert handler.epoch != other_handler.epoch
+
+    task = asyncio.create_task(handler.event_loop())
+    await handler.add_event(
+        SensorData(id=1, temperature=1.0, humidity=1.0, pressure=1.0, voltage=1.0, sensor_id=sensors[0].id)
+    )
+    await handler._message_queue.join()
+    task.cancel()
+
+    async with async_fake_session_maker() as session:
+        superuser: DBUser = await get_current_user(superuser_token, session)
+        connection: WebsocketConnection = await handler.add(
+            session, superuser, FakeWebSocket(), last_event_id=0, epoch=other_handler.epoch
+        )
+        assert connection.resync
+        assert connection.queued == 0
+
+        # A reconnect of the event bus starts a new epoch, as events of other workers were missed.
+        epoch: str = handler.epoch
+        await handler._event_bus.publish([EventBusReconnected()])
+        assert handler.epoch != epoch
+        assert (await handler.add(session, superuser, FakeWebSocket(), last_event_id=0, epoch=epoch)).resync
+
+
+@pytest.mark.asyncio
+async def test_binary_connection(superuser_token: str):
+    """
+    Asserts binary connections receive the events as binary frames, also when they are replayed.
+    """
+    sensors: list[Sensor] = await create_sensors()
+    handler: WebsocketHandler = WebsocketHandler()
+    text_websocket: FakeWebSocket = FakeWebSocket()
+    binary_websocket: FakeWebSocket = FakeWebSocket()
+    replay_websocket: FakeWebSocket = FakeWebSocket()
+    event: SensorData = SensorData(
+        id=1, temperature=1.0, humidity=1.0, pressure=1.0, voltage=1.0, sensor_id=sensors[0].id
+    )
+
+    async with async_fake_session_maker() as session:
+        superuser: DBUser = await get_current_user(superuser_token, session)
+        connections: list[WebsocketConnection] = [
+            await handler.add(session, superuser, text_websocket),
+            await handler.add(session, superuser, binary_websocket, binary=True),
+        ]
+        task = asyncio.create_task(handler.event_loop())
+        await handler.add_event(event)
+        await handler._message_queue.join()
+        task.cancel()
+        connections.append(
+            await handler.add(session, superuser, replay_websocket, last_event_id=0, binary=True, epoch=handler.epoch)
+        )
+
+    for connection in connections:
+        connection.start()
+    await asyncio.sleep(0.01)
+    for connection in connections:
+        connection.stop()
+
+    assert json.loads(text_websocket.messages[0])["event_id"] == 1
+    for websocket in (binary_websocket, replay_websocket):
+        event_id, decoded = decode_event(websocket.messages[0])
+        assert event_id == 1
+        assert decoded.id == event.id
+
+
+@pytest.mark.asyncio
+async def test_binary_connection_out_of_range_value(superuser_token: str):
+    """
+    Asserts values beyond the range of 32-bit floats are sent to binary connections, also when they are replayed.
+    """
+    sensors: list[Sensor] = await create_sensors()
+    handler: WebsocketHandler = WebsocketHandler()
+    binary_websocket: FakeWebSocket = FakeWebSocket()
+    replay_websocket: FakeWebSocket = FakeWebSocket()
+
+    async with async_fake_session_maker() as session:
+        superuser: DBUser = await get_current_user(superuser_token, session)
+        connections: list[WebsocketConnection] = [await handler.add(session, superuser, binary_websocket, binary=True)]
+        task = asyncio.create_task(handler.event_loop())
+        await handler.add_events(
+            [
+                SensorData(id=1, temperature=1e39, humidity=1.0, pressure=1.0, voltage=1.0, sensor_id=sensors[0].id),
+                SensorData(id=2, temperature=1.0, humidity=1.0, pressure=1.0, voltage=1.0, sensor_id=sensors[0].id),
+            ]
+        )
+        await handler._message_queue.join()
+        task.cancel()
+        connections.append(
+            await handler.add(session, superuser, replay_websocket, last_event_id=0, binary=True, epoch=handler.epoch)
+        )
+
+    for connection in connections:
+        connection.start()
+    await asyncio.sleep(0.01)
+    for connection in connections:
+        connection.stop()
+
+    for websocket in (binary_websocket, replay_websocket):
+        assert [decode_event(message)[1].temperature for message in websocket.messages] == [1e39, 1.0]
+
+
+@pytest.mark.asyncio
+async def test_event_loop_survives_failing_event(superuser_token: str, mocker: MockerFixture):
+    """
+    Asserts an event that can not be sent does not stop the events after it.
+    """
+    sensors: list[Sensor] = await create_sensors()
+    handler: WebsocketHandler = WebsocketHandler()
+    websocket: FakeWebSocket = FakeWebSocket()
+
+    def encode_event(event_id: int, event: SensorData) -> bytes:
+        if event.id == 1:
+            raise OverflowError("float too large to pack")
+        return str(event.id).encode()
+
+    mocker.patch("api.utils.websocket_connection_handler.encode_event", encode_event)
+    async with async_fake_session_maker() as session:
+        superuser: DBUser = await get_current_user(superuser_token, session)
+        connection: WebsocketConnection = await handler.add(session, superuser, websocket, binary=True)
+    task = asyncio.create_task(handler.event_loop())
+    await handler.add_events(
+        [
+            SensorData(id=index, temperature=1.0, humidity=1.0, pressure=1.0, voltage=1.0, sensor_id=sensors[0].id)
+            for index in (1, 2)
+        ]
+    )
+    await handler._message_queue.join()
+    assert not task.done()
+    task.cancel()
+
+    connection.start()
+    await asyncio.sleep(0.01)
+    connection.stop()
+    assert websocket.messages == [b"2"]
@@ -0,0 +1,54 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from api.models.database_models import SensorData, SensorState
+from api.utils.websocket_encoding import SENSOR_DATA_STRUCT, SENSOR_STATE_STRUCT, decode_event, encode_event
+
+TIMESTAMP: datetime = datetime(2024, 1, 1, 12, 0, 0, 123000, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize(
+    "event, size",
+    [
+        (
+            SensorData(
+                id=7, sensor_id=3, timestamp=TIMESTAMP, temperature=21.5, humidity=48.25, pressure=1013.5, voltage=3.3
+            ),
+            SENSOR_DATA_STRUCT.size,
+        ),
+        (
+            SensorData(
+                id=8, sensor_id=3, timestamp=TIMESTAMP, temperature=-4.0, humidity=90.0, pressure=998.0, voltage=None
+            ),
+            SENSOR_DATA_STRUCT.size,
+        ),
+        (SensorState(id=9, sensor_id=4, timestamp=TIMESTAMP, state=True, voltage=None), SENSOR_STATE_STRUCT.size),
+    ],
+)
+def test_encode_decode_event(event: SensorData | SensorState, size: int):
+    """
+    Asserts events are encoded to fixed size frames, a fraction of the JSON size, and decoded to the same values.
+    """
+    frame: bytes = encode_event(42, event)
+    assert len(frame) == size
+    assert len(frame) < len(event.model_dump_json()) / 2
+
+    event_id, decoded = decode_event(frame)
+    assert event_id == 42
+    assert type(decoded) is type(event)
+    for field, value in event.model_dump().items():
+        if isinstance(value, float):
+            assert getattr(decoded, field) == pytest.approx(value, rel=1e-6)
+        else:
+            assert getattr(decoded, field) == value
+
+
+def test_encode_naive_timestamp():
+    """
+    Asserts naive timestamps are encoded as UTC.
+    """
+    event: SensorState = SensorState(
+        id=1, sensor_id=1, timestamp=TIMESTAMP.replace(tzinfo=None), state=False, voltage=1
+    )
+    assert decode_event(encode_event(1, event))[1].timestamp == TIMESTAMP